@@ -1,52 +1,175 @@
-from typing import Union, Dict
+from typing import Union, Dict, List, Tuple
+from threading import Condition, Lock
+import heapq
+import numpy as np
 import pandas as pd
 
+from app.clients.HttpClient import HttpClient
+from app.clients.MultiTermMatcher import MultiTermMatcher
+from app.clients.PlaylistSnapshot import PlaylistSnapshot
+from app.clients.PlaylistTable import PlaylistTable
 from app.clients.TextTranslator import TextTranslator
+from app.clients.TranslationCache import TranslationCache
+from app.clients.TrigramIndex import TrigramIndex
 
 
 # -----------------------------------------------------------
-# Данный класс позволяет искать в pd.DataFrame,
-# состоящий из информации о каждом из видео в плейлисте,
+# Данный класс позволяет искать в таблице PlaylistTable,
+# состоящей из информации о каждом из видео в плейлисте,
 # по различным критериям:
 # по названию / по названию и описанию,
 # дословный поиск / поиск слов в любом порядке, по нику автора
 # и по двум языкам одновременно (на русском и английском),
 # находя соответствие хотя бы в одном из вариантов перевода.
+# При поиске по релевантности (ranked) видео, в которых есть
+# хотя бы одно из слов, оцениваются по BM25 (совпадения в названии
+# весят больше) и возвращаются только top_k лучших.
+# При поиске с опечатками (fuzzy) слова ищутся в любом порядке,
+# но каждое совпадает и с похожими словами (см. TokenIndex).
+# Поиск только по названию не распаковывает описания
+# (см. PlaylistSnapshot).
 # (Для этого требуется ввести путь до api-key для Detect Language API
 # (https://detectlanguage.com))
 # -----------------------------------------------------------
 
 class DataFrameSearcher:
-    """ Класс поиска плейлистов по pd.DataFrame. """
+    """ Класс поиска плейлистов по таблице PlaylistTable. """
 
     class NothingError(Exception):
         """ Класс исключения, информирующий о том,
-            что в pd.DataFrame не нашлось нужного плейлиста. """
+            что в таблице не нашлось нужного плейлиста. """
         message = \
             'По данному запросу ничего не нашлось.'
 
     def __init__(self,
-                 data_frame: Union[pd.DataFrame, None],
-                 dl_api_key_file_path: str):
+                 table: Union[PlaylistTable, None],
+                 dl_api_key_file_path: str,
+                 vectorized=True,
+                 indexed=True,
+                 translation_cache: Union[TranslationCache, None] = None,
+                 http_client: Union[HttpClient, None] = None):
         """
-        :param data_frame: таблица с данными о каждом из видео в плейлисте
-        ('title' - название, 'description' - описание, 'author' - ник автора)
+        :param table: таблица с данными о каждом из видео в плейлисте
         :param dl_api_key_file_path: путь к файлу,
             где лежит api-key для доступа к Detect Language API
+        :param vectorized: искать ли по колонкам целиком (default True),
+            иначе - построчно с помощью _verbatim_search,
+            _not_verbatim_search и _author_search
+        :param indexed: использовать ли индексы: обратный индекс по словам
+            для поиска слов в любом порядке и индекс по триграммам
+            для дословного поиска (default True)
+        :param translation_cache: кэш результатов запросов к API
+            для работы с языками (default None - без кэша)
+        :param http_client: HTTP клиент для запросов к API
+            для работы с языками (default None - свой клиент)
         """
-        self.df = data_frame
+        self.vectorized = vectorized
+        self.indexed = indexed
+        # неизменяемый снимок данных плейлиста
+        # (заменяется целиком при добавлении новых видео)
+        self.snapshot = None
+        if table is not None:
+            self.snapshot = PlaylistSnapshot(table, self.indexed)
+        # добавление новых видео происходит по очереди
+        self._append_lock = Lock()
+        # оповещение о добавлении новых видео и окончании загрузки
+        self._updated = Condition(self._append_lock)
+        # плейлист еще загружается (видео добавляются по мере загрузки)
+        self.loading = False
+        # сообщение об ошибке, если загрузку не удалось закончить
+        self.load_error: Union[str, None] = None
         # класс для переводов
         self.text_translator = \
-            TextTranslator.dl_api_key_from_file(dl_api_key_file_path)
+            TextTranslator.dl_api_key_from_file(dl_api_key_file_path,
+                                                cache=translation_cache,
+                                                http_client=http_client)
+
+    @property
+    def table(self) -> Union[PlaylistTable, None]:
+        """ Таблица с данными о каждом из видео в плейлисте. """
+        snapshot = self.snapshot
+        return snapshot.table if snapshot is not None else None
+
+    def append(self, table: PlaylistTable) -> None:
+        """
+        Функция добавления новых видео в конец плейлиста.
+        Создается новый снимок данных, а поиски, которые уже идут,
+            заканчиваются по старому.
+
+        :param table: таблица с данными о новых видео
+        """
+        with self._append_lock:
+            if self.snapshot is None:
+                self.snapshot = PlaylistSnapshot(table, self.indexed)
+            else:
+                self.snapshot = self.snapshot.extended(table)
+            self._updated.notify_all()
+
+    def finish_loading(self, error: Union[str, None] = None) -> None:
+        """
+        Функция окончания загрузки плейлиста.
+
+        :param error: сообщение об ошибке, если загрузку
+            не удалось закончить (default None)
+        """
+        with self._append_lock:
+            self.loading = False
+            self.load_error = error
+            self._updated.notify_all()
+
+    def wait_for_update(self, rows: int, timeout: float) -> None:
+        """
+        Функция ожидания новых видео или окончания загрузки плейлиста.
+
+        :param rows: сколько видео уже известно
+        :param timeout: сколько секунд ждать максимум
+        """
+        with self._append_lock:
+            self._updated.wait_for(
+                lambda: not self.loading or self._rows() != rows, timeout)
+
+    def _rows(self) -> int:
+        """
+        Функция подсчета загруженных видео.
+
+        :return: количество видео
+        """
+        snapshot = self.snapshot
+        return len(snapshot.table) if snapshot is not None else 0
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой данными плейлиста
+            (приблизительно).
+
+        :return: количество байт
+        """
+        snapshot = self.snapshot
+        return snapshot.memory_usage() if snapshot is not None else 0
+
+    def author_facet(self) -> List[Tuple[str, int]]:
+        """
+        Функция подсчета видео каждого автора в плейлисте.
+
+        :return: список (ник автора, сколько видео)
+            по убыванию количества видео
+        """
+        snapshot = self.snapshot
+        return snapshot.table.author_facet() if snapshot is not None else []
 
     def __call__(self,
                  code_words: str,
                  author_name=None,
                  search_by_description=False,
                  verbatim_search=True,
-                 bilingual_search=False) -> Dict:
+                 bilingual_search=False,
+                 ranked=False,
+                 top_k=20,
+                 fuzzy=False) -> Dict:
         """
         Основная функция поиска нужных видео по критериям.
+        Не изменяет общих данных, поэтому ее можно вызывать
+            одновременно из нескольких потоков.
 
         :param code_words: ключевые слова для поиска
         :param author_name: ник автора для поиска (default None)
@@ -56,56 +179,248 @@ class DataFrameSearcher:
             False - в любом порядке (default True)
         :param bilingual_search: надо ли искать
             по двум языкам (default False)
+        :param ranked: искать ли по релевантности (default False):
+            видео упорядочены по убыванию оценки, verbatim_search
+            не учитывается (только при vectorized и indexed
+            и непустых ключевых словах)
+        :param top_k: сколько лучших видео возвращать при поиске
+            по релевантности (default 20)
+        :param fuzzy: искать ли с опечатками (default False):
+            слова в любом порядке, verbatim_search не учитывается
+            (опечатки допускаются только при vectorized и indexed)
         :return:
             словарь dict(
-                'data_frame' : таблица pd.DataFrame только из нужных нам видео,
-                'translation' : перевод при двуязычном поиске (иначе - None)
+                'table' : таблица PlaylistTable только из нужных нам видео,
+                'translation' : перевод при двуязычном поиске (иначе - None),
+                'rows' : среди скольких первых видео плейлиста шел поиск
             )
         """
+        # поиск с опечатками - это поиск слов в любом порядке
+        if fuzzy:
+            verbatim_search = False
         translation = None
         # перевести ключевые слова при двуязычном поиске
         if bilingual_search:
             translation = self.text_translator(code_words)
 
-        if verbatim_search:
-            # дословный поиск
-            self.df['found_words'] = self.df.apply(
-                lambda video:
-                self._verbatim_search(video,
-                                      code_words,
-                                      search_by_description,
-                                      translation),
-                axis=1).astype('int')
+        # весь поиск идет по одному снимку данных
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.table.empty:
+            table = PlaylistTable.create_empty() if snapshot is None \
+                else snapshot.table
+        elif ranked and self.indexed and self.vectorized \
+                and code_words.strip() != '':
+            # поиск по релевантности
+            scores = self._scores(snapshot,
+                                  code_words,
+                                  search_by_description,
+                                  translation)
+            found_author = self._author_mask(snapshot, author_name)
+            scores[~found_author.to_numpy()] = 0
+            table = snapshot.table.take(self._top_k(scores, top_k))
+        elif self.vectorized:
+            # поиск по колонкам целиком
+            found_words = self._words_mask(snapshot,
+                                           code_words,
+                                           search_by_description,
+                                           verbatim_search,
+                                           translation,
+                                           fuzzy)
+            found_author = self._author_mask(snapshot, author_name)
+            # нахождение нужных видео
+            table = snapshot.table.take(
+                (found_words & found_author).to_numpy())
         else:
-            # поиск слов в любом порядке
-            self.df['found_words'] = self.df.apply(
-                lambda video:
-                self._not_verbatim_search(video,
-                                          code_words,
-                                          search_by_description,
-                                          translation),
-                axis=1).astype('int')
-
-        # поиск по автору
-        self.df['found_author'] = self.df.apply(
-            lambda video:
-            self._author_search(video, author_name),
-            axis=1).astype('int')
-
-        # нахождение нужных видео
-        cond = (self.df['found_words'] > 0) & (self.df['found_author'] > 0)
-        new_df = self.df[cond]
+            # описания распаковываются, только если по ним ищут
+            videos = snapshot.table.rows(search_by_description)
+            if verbatim_search:
+                # дословный поиск
+                found_words = np.fromiter(
+                    (self._verbatim_search(video,
+                                           code_words,
+                                           search_by_description,
+                                           translation)
+                     for video in videos),
+                    dtype=bool, count=len(snapshot.table))
+            else:
+                # поиск слов в любом порядке
+                found_words = np.fromiter(
+                    (self._not_verbatim_search(video,
+                                               code_words,
+                                               search_by_description,
+                                               translation)
+                     for video in videos),
+                    dtype=bool, count=len(snapshot.table))
+            # поиск по автору (описания не нужны)
+            found_author = np.fromiter(
+                (self._author_search(video, author_name)
+                 for video in snapshot.table.rows(descriptions=False)),
+                dtype=bool, count=len(snapshot.table))
+            # нахождение нужных видео
+            table = snapshot.table.take(found_words & found_author)
 
         # приводим перевод к одному регистру
         if translation is not None:
             translation = translation.lower()
         return {
             # таблица только из нужных нам видео
-            'data_frame': new_df,
+            'table': table,
             # перевод при двуязычном поиске (иначе - None)
-            'translation': translation
+            'translation': translation,
+            # среди скольких первых видео плейлиста шел поиск
+            'rows': len(snapshot.table) if snapshot is not None else 0
         }
 
+    def _words_mask(self,
+                    snapshot: PlaylistSnapshot,
+                    code_words: str,
+                    search_by_description: bool,
+                    verbatim_search: bool,
+                    translation=None,
+                    fuzzy=False) -> pd.Series:
+        """
+        Функция - аналог функций _verbatim_search и _not_verbatim_search,
+            но для поиска по колонкам целиком.
+
+        :param snapshot: снимок данных плейлиста
+        :param code_words: ключевые слова для поиска
+        :param search_by_description: надо ли искать по описанию
+        :param verbatim_search: тип поиска: True - дословный,
+            False - в любом порядке
+        :param translation: перевод текста,
+            если поиск по двум языкам (default None)
+        :param fuzzy: допускать ли опечатки при поиске по обратному
+            индексу (default False)
+        :return: маска видео, которые подходят под заданные условия
+        """
+        # если нет ключевых слов - подходит любое видео
+        if code_words == '':
+            return pd.Series(True, index=snapshot.index)
+
+        # поиск по описанию тоже
+        if search_by_description:
+            text, index, trigrams = snapshot.text()
+        else:
+            text = snapshot.title_lower
+            index, trigrams = snapshot.title_index, snapshot.title_trigrams
+        if verbatim_search:
+            # дословный поиск
+            mask = self._phrase_mask(text, trigrams, code_words.lower())
+            # поиск c переводом
+            if translation is not None:
+                mask |= \
+                    self._phrase_mask(text, trigrams, translation.lower())
+        elif index is not None:
+            # поиск слов в любом порядке по обратному индексу
+            found = index.mask_all(code_words.lower().split(), fuzzy)
+            # поиск по второму языку
+            if translation is not None:
+                found |= index.mask_all(translation.lower().split(), fuzzy)
+            mask = pd.Series(found, index=snapshot.index)
+        else:
+            # поиск слов в любом порядке (и по второму языку):
+            # общие слова запроса и перевода ищутся в строке один раз
+            matcher = MultiTermMatcher.from_query(code_words, translation)
+            mask = pd.Series(matcher.mask(text), index=text.index)
+        return mask
+
+    # во сколько раз совпадение в названии важнее, чем в описании
+    title_weight = 2.0
+
+    def _scores(self,
+                snapshot: PlaylistSnapshot,
+                code_words: str,
+                search_by_description: bool,
+                translation=None) -> np.ndarray:
+        """
+        Функция оценки релевантности каждого видео по BM25
+            по обратным индексам.
+
+        :param snapshot: снимок данных плейлиста
+        :param code_words: ключевые слова для поиска
+        :param search_by_description: надо ли искать по описанию
+        :param translation: перевод текста,
+            если поиск по двум языкам (default None)
+        :return: массив оценок видео (0 - ни одного слова)
+        """
+        words = code_words.lower().split()
+        # слова перевода тоже ищутся
+        if translation is not None:
+            words += translation.lower().split()
+        scores = self.title_weight * snapshot.title_index.bm25(words)
+        if search_by_description:
+            _, text_index, _ = snapshot.text()
+            scores += text_index.bm25(words)
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> list:
+        """
+        Функция выбора лучших видео с помощью кучи
+            (без сортировки всех найденных видео).
+        При равных оценках раньше идет видео, которое раньше в плейлисте.
+
+        :param scores: массив оценок видео
+        :param top_k: сколько видео выбрать
+        :return: номера строк лучших видео по убыванию оценки
+        """
+        rows = np.flatnonzero(scores > 0)
+        found = scores[rows].tolist()
+        best = heapq.nlargest(top_k, range(len(found)),
+                              key=found.__getitem__)
+        return rows[best].tolist()
+
+    def _author_mask(self,
+                     snapshot: PlaylistSnapshot,
+                     author_name: Union[str, None]) -> pd.Series:
+        """
+        Функция - аналог функции _author_search,
+            но для поиска по колонке целиком.
+        Ник ищется только среди различных авторов плейлиста,
+            а не в каждой строке.
+
+        :param snapshot: снимок данных плейлиста
+        :param author_name: ник автора для поиска
+        :return: маска видео, которые подходят под заданные условия
+        """
+        # если не задан автор - подходит любое видео
+        if author_name is None or author_name == '':
+            return pd.Series(True, index=snapshot.index)
+        return pd.Series(snapshot.table.author_mask(author_name.lower()),
+                         index=snapshot.index)
+
+    @classmethod
+    def _phrase_mask(cls,
+                     text: pd.Series,
+                     trigrams: Union[TrigramIndex, None],
+                     phrase: str) -> pd.Series:
+        """
+        Функция дословного поиска фразы в каждой строке колонки:
+            по индексу по триграммам, если он есть и фраза не слишком короткая,
+            иначе - по колонке целиком.
+
+        :param text: колонка с текстом в нижнем регистре
+        :param trigrams: индекс по триграммам для этой колонки (или None)
+        :param phrase: фраза для поиска в нижнем регистре
+        :return: маска строк, в которых есть фраза
+        """
+        if trigrams is not None:
+            found = trigrams.mask(phrase)
+            if found is not None:
+                return pd.Series(found, index=text.index)
+        return cls._contains(text, phrase)
+
+    @staticmethod
+    def _contains(text: pd.Series, words: str) -> pd.Series:
+        """
+        Функция поиска подстроки в каждой строке колонки.
+
+        :param text: колонка с текстом в нижнем регистре
+        :param words: подстрока для поиска
+        :return: маска строк, в которых есть подстрока
+        """
+        return text.str.contains(words, regex=False).astype('bool')
+
     @staticmethod
     def _verbatim_search(video,
                          code_words: str,
@@ -115,7 +430,7 @@ class DataFrameSearcher:
         Функция для дословного поиска.
         Определяет подходит ли конкретное видео под заданные условия.
 
-        :param video: строка в data_frame со всей информации о конкретном видео
+        :param video: словарь со всей информацией о конкретном видео
         :param code_words: ключевые слова для поиска
         :param search_by_description: надо ли искать по описанию
         :param translation: перевод текста,
@@ -148,7 +463,7 @@ class DataFrameSearcher:
         Функция поиска слов в любом порядке.
         Определяет подходит ли конкретное видео под заданные условия.
 
-        :param video: строка в data_frame со всей информации о конкретном видео
+        :param video: словарь со всей информацией о конкретном видео
         :param code_words: ключевые слова для поиска
         :param search_by_description:  надо ли искать по описанию
         :param translation: перевод текста,
@@ -192,7 +507,7 @@ class DataFrameSearcher:
         Функция поиска по автору.
         Определяет подходит ли конкретное видео под заданные условия.
 
-        :param video: строка в data_frame со всей информации о конкретном видео
+        :param video: словарь со всей информацией о конкретном видео
         :param author_name: ник автора для поиска
         :return: True - видео подходит, False - видео не подходит
         """
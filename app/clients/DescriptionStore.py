@@ -0,0 +1,127 @@
+from typing import Iterable, Iterator, List
+import zlib
+import numpy as np
+
+
+# -----------------------------------------------------------
+# Данный класс хранит описания видео в сжатом виде:
+# описания разбиты на блоки по block_size подряд идущих описаний,
+# каждый блок сжат zlib (описания в UTF-8 подряд
+# и смещения начала каждого описания в блоке).
+# Распаковываются только блоки с нужными описаниями
+# (например, с описаниями показываемых видео).
+# Хранилище не изменяется после создания: новые описания добавляются
+# созданием нового хранилища (extended), которое использует
+# все полные блоки старого.
+# -----------------------------------------------------------
+
+class DescriptionStore:
+    """ Класс сжатого хранилища описаний видео. """
+
+    # сколько описаний в одном блоке
+    block_size = 32
+    # уровень сжатия zlib
+    level = 6
+
+    def __init__(self, descriptions: Iterable[str] = ()):
+        """
+        :param descriptions: описания видео (по одному на строку таблицы)
+        """
+        self.blocks: List[bytes] = []  # сжатые блоки
+        # смещения описаний в каждом блоке (на одно больше, чем описаний)
+        self.bounds: List[np.ndarray] = []
+        self.size = 0  # количество описаний
+        self._add(list(descriptions))
+
+    def _add(self, descriptions: List[str]) -> None:
+        """
+        Функция добавления описаний новыми блоками
+            (последний блок должен быть полным).
+
+        :param descriptions: описания видео
+        """
+        for start in range(0, len(descriptions), self.block_size):
+            encoded = [description.encode('utf-8', 'surrogatepass')
+                       for description in
+                       descriptions[start:start + self.block_size]]
+            bounds = np.zeros(len(encoded) + 1, dtype=np.uint32)
+            np.cumsum([len(data) for data in encoded], out=bounds[1:])
+            self.blocks.append(zlib.compress(b''.join(encoded), self.level))
+            self.bounds.append(bounds)
+        self.size += len(descriptions)
+
+    def extended(self, descriptions: Iterable[str]) -> 'DescriptionStore':
+        """
+        Функция получения хранилища, дополненного новыми описаниями.
+        Текущее хранилище не изменяется: полные блоки используются обоими,
+            а неполный последний блок сжимается заново вместе с новыми.
+
+        :param descriptions: описания новых видео
+        :return: DescriptionStore
+        """
+        store = DescriptionStore.__new__(DescriptionStore)
+        store.blocks = list(self.blocks)
+        store.bounds = list(self.bounds)
+        store.size = self.size
+        descriptions = list(descriptions)
+        if store.blocks and len(store.bounds[-1]) - 1 < self.block_size:
+            # неполный последний блок
+            descriptions = self._block(len(store.blocks) - 1) + descriptions
+            store.blocks.pop()
+            store.size -= len(store.bounds.pop()) - 1
+        store._add(descriptions)
+        return store
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _block(self, block: int) -> List[str]:
+        """
+        Функция распаковки одного блока.
+
+        :param block: номер блока
+        :return: описания из блока
+        """
+        data = zlib.decompress(self.blocks[block])
+        bounds = self.bounds[block].tolist()
+        return [data[bounds[i]:bounds[i + 1]].decode('utf-8',
+                                                     'surrogatepass')
+                for i in range(len(bounds) - 1)]
+
+    def __getitem__(self, row: int) -> str:
+        """
+        Функция получения одного описания.
+
+        :param row: номер строки
+        :return: описание
+        """
+        block, position = divmod(int(row), self.block_size)
+        return self._block(block)[position]
+
+    def take(self, rows: Iterable[int]) -> List[str]:
+        """
+        Функция получения описаний нескольких строк:
+            каждый нужный блок распаковывается один раз.
+
+        :param rows: номера строк
+        :return: описания в том же порядке
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        blocks = dict()  # номер блока -> описания из блока
+        for block in np.unique(rows // self.block_size).tolist():
+            blocks[block] = self._block(block)
+        return [blocks[row // self.block_size][row % self.block_size]
+                for row in rows.tolist()]
+
+    def __iter__(self) -> Iterator[str]:
+        for block in range(len(self.blocks)):
+            yield from self._block(block)
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой сжатыми блоками.
+
+        :return: количество байт
+        """
+        return sum(len(block) for block in self.blocks) \
+            + sum(bounds.nbytes for bounds in self.bounds)
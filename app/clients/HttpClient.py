@@ -0,0 +1,132 @@
+from typing import Dict, Tuple, Union
+from urllib.parse import urlsplit
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# -----------------------------------------------------------
+# Данный класс - общий HTTP клиент для всех API сервисов:
+# > соединения переиспользуются (keep-alive) через пул requests.Session
+# > у каждого запроса есть таймаут (свой для каждого сервиса)
+# > при ответах 429 и 5xx, обрыве соединения или таймауте
+# запрос повторяется с экспоненциально растущей случайной задержкой
+# (или с задержкой из заголовка Retry-After)
+# > ответы запрашиваются в сжатом виде (gzip).
+# Если после всех повторов соединиться не удалось,
+# вызывается requests.RequestException.
+# -----------------------------------------------------------
+
+class HttpClient:
+    """ Класс HTTP клиента с пулом соединений и повторами запросов. """
+
+    # коды ответов, при которых запрос повторяется
+    retry_statuses = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, timeouts: Union[Dict[str, Tuple[float, float]],
+                                       None] = None,
+                 default_timeout=(3.05, 10), retries=3,
+                 backoff=0.5, max_backoff=8, pool_size=10):
+        """
+        :param timeouts: таймауты (на соединение, на ответ) в секундах
+            для каждого сервиса по имени хоста (default None)
+        :param default_timeout: таймауты для остальных сервисов
+            (default 3.05 секунды на соединение, 10 секунд на ответ)
+        :param retries: сколько раз повторять запрос (default 3)
+        :param backoff: задержка перед первым повтором в секундах
+            (default 0.5, потом увеличивается в 2 раза)
+        :param max_backoff: максимальная задержка в секундах (default 8)
+        :param pool_size: сколько соединений хранится
+            для каждого хоста (default 10)
+        """
+        self.timeouts = dict(timeouts) if timeouts is not None else dict()
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    def get(self, url: str, headers: Union[Dict, None] = None) \
+            -> requests.Response:
+        """
+        Функция GET запроса.
+
+        :param url: ссылка
+        :param headers: заголовки запроса (default None)
+        :return: Response
+        """
+        return self.request('GET', url, headers=headers)
+
+    def post(self, url: str, json=None, headers: Union[Dict, None] = None) \
+            -> requests.Response:
+        """
+        Функция POST запроса.
+
+        :param url: ссылка
+        :param json: тело запроса в формате json (default None)
+        :param headers: заголовки запроса (default None)
+        :return: Response
+        """
+        return self.request('POST', url, json=json, headers=headers)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Функция запроса с повторами.
+
+        :param method: метод запроса ('GET', 'POST' ...)
+        :param url: ссылка
+        :param kwargs: остальные параметры requests.Session.request
+        :return: Response (последний, если все повторы неудачные)
+        """
+        timeout = self.timeouts.get(urlsplit(url).hostname,
+                                    self.default_timeout)
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self.session.request(method, url,
+                                                timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in self.retry_statuses \
+                        or attempt >= self.retries:
+                    return response
+                retry_after = self._retry_after(response)
+                response.close()  # возвращаем соединение в пул
+            time.sleep(self._delay(attempt, retry_after))
+            attempt += 1
+
+    def _delay(self, attempt: int, retry_after=None) -> float:
+        """
+        Функция вычисления задержки перед повтором запроса
+            (случайная от 0 до backoff * 2^attempt).
+
+        :param attempt: номер неудачной попытки (с 0)
+        :param retry_after: задержка из заголовка Retry-After (default None)
+        :return: задержка в секундах
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.backoff * 2 ** attempt,
+                                     self.max_backoff))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Union[float, None]:
+        """
+        Функция получения задержки из заголовка Retry-After.
+
+        :param response: Response
+        :return: задержка в секундах или None, если ее нет
+        """
+        try:
+            return max(0.0, float(response.headers['Retry-After']))
+        except (KeyError, ValueError):
+            return None
@@ -0,0 +1,226 @@
+from collections import OrderedDict
+from itertools import count
+from queue import PriorityQueue
+from threading import Lock, Thread
+from typing import Callable, Dict, Hashable, Union
+import secrets
+import time
+
+
+# -----------------------------------------------------------
+# Данный класс позволяет выполнять долгие задачи (например, загрузку
+# плейлиста) в фоне на пуле потоков и узнавать их прогресс по id задачи.
+# Задача с тем же ключом (например, id плейлиста), что и у уже
+# выполняющейся задачи, не запускается второй раз -
+# возвращается уже выполняющаяся задача.
+# Задачи пользователей (INTERACTIVE) выполняются раньше
+# фоновых задач (BACKGROUND), которые ждут в очереди.
+# Законченные задачи хранятся, пока их не больше keep.
+# Потоки пула запускаются при первой задаче, поэтому создание класса
+# (например, при импорте модуля) не запускает потоков.
+# Считается, сколько задач удалось не запускать второй раз.
+# -----------------------------------------------------------
+
+class JobManager:
+    """ Класс выполнения фоновых задач. """
+
+    # приоритеты задач (меньше - раньше)
+    INTERACTIVE = 0  # задача пользователя
+    BACKGROUND = 1  # фоновая задача
+
+    class Job:
+        """ Класс фоновой задачи и ее прогресса. """
+
+        def __init__(self, key: Hashable, priority: int):
+            """
+            :param key: ключ задачи (одинаковые задачи не запускаются
+                одновременно)
+            :param priority: приоритет задачи
+            """
+            self.id = secrets.token_hex(8)
+            self.key = key
+            self.priority = priority
+            # 'queued' - ждет, 'running' - выполняется,
+            # 'done' - выполнена, 'failed' - не удалось выполнить
+            self.status = 'queued'
+            self.pages = 0  # сколько страниц загружено
+            self.total_pages: Union[int, None] = None  # сколько всего
+            self.rows = 0  # сколько видео разобрано
+            self.ready = False  # можно ли уже искать
+            self.error: Union[str, None] = None  # сообщение об ошибке
+            self.started_at: Union[float, None] = None
+            self.finished_at: Union[float, None] = None
+
+        @property
+        def finished(self) -> bool:
+            """ Закончена ли задача (успешно или нет). """
+            return self.status in ('done', 'failed')
+
+        def eta(self) -> Union[float, None]:
+            """
+            Функция оценки оставшегося времени
+                по средней скорости загрузки страниц.
+
+            :return: сколько секунд осталось
+                или None, если оценить нельзя
+            """
+            if self.finished:
+                return 0.0
+            if self.started_at is None or self.pages == 0 \
+                    or self.total_pages is None:
+                return None
+            elapsed = time.time() - self.started_at
+            left = max(self.total_pages - self.pages, 0)
+            return elapsed / self.pages * left
+
+        def to_dict(self) -> Dict:
+            """
+            Функция получения прогресса задачи.
+
+            :return: словарь с прогрессом задачи
+            """
+            return {
+                'id': self.id,
+                'status': self.status,
+                'pages': self.pages,
+                'total_pages': self.total_pages,
+                'rows': self.rows,
+                'eta': self.eta(),
+                'ready': self.ready,
+                'error': self.error
+            }
+
+    # сообщение об ошибке, если у исключения нет своего
+    default_error = 'Что-то пошло не так, попробуйте повторить действия.'
+
+    def __init__(self, workers=4, keep=100):
+        """
+        :param workers: сколько задач выполняется одновременно (default 4)
+        :param keep: сколько законченных задач хранится (default 100)
+        """
+        self.keep = keep
+        self.workers = workers
+        self._started = False  # запущены ли потоки пула
+        # очередь (приоритет, номер, задача, функция, аргументы)
+        self._queue = PriorityQueue()
+        self._sequence = count()  # задачи одного приоритета - по порядку
+        self._jobs = OrderedDict()  # id -> задача
+        self._active = dict()  # ключ -> незаконченная задача
+        self._waiting = dict()  # ключ -> (функция, аргументы) ждущей задачи
+        self._lock = Lock()
+        self.submitted = 0  # сколько задач было запущено
+        self.attached = 0  # сколько раз вернули уже выполняющуюся задачу
+
+    def submit(self, key: Hashable, function: Callable, *args,
+               priority=INTERACTIVE) -> Job:
+        """
+        Функция запуска задачи
+            (или получения уже выполняющейся задачи с тем же ключом).
+        Если такая задача еще ждет в очереди с меньшим приоритетом,
+            то ее приоритет повышается.
+
+        :param key: ключ задачи
+        :param function: функция задачи, первый аргумент - Job,
+            в котором она может сообщать о прогрессе
+            (и узнавать свой приоритет)
+        :param args: остальные аргументы функции
+        :param priority: приоритет задачи (default INTERACTIVE)
+        :return: Job
+        """
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                self.attached += 1
+                if priority < job.priority:
+                    # приоритет повышается и у выполняющейся задачи
+                    # (она может узнать об этом по job.priority)
+                    job.priority = priority
+                    if job.status == 'queued':
+                        # задача попадает в очередь второй раз
+                        # (с прежними функцией и аргументами)
+                        self._queue.put((priority, next(self._sequence),
+                                         job) + self._waiting[key])
+                return job
+            if not self._started:
+                self._started = True
+                for i in range(self.workers):
+                    Thread(target=self._work, name=f'job-{i}',
+                           daemon=True).start()
+            self.submitted += 1
+            job = self.Job(key, priority)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._waiting[key] = (function, args)
+            self._queue.put((priority, next(self._sequence),
+                             job, function, args))
+        return job
+
+    def get(self, job_id: str) -> Union[Job, None]:
+        """
+        Функция получения задачи по id.
+
+        :param job_id: id задачи
+        :return: Job или None, если задачи нет
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def metrics(self) -> Dict:
+        """
+        Функция получения статистики задач.
+
+        :return: словарь dict(
+                'submitted' : сколько задач было запущено,
+                'attached' : сколько раз вернули уже выполняющуюся задачу,
+                'active' : сколько задач сейчас не закончено
+            )
+        """
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'attached': self.attached,
+                'active': len(self._active)
+            }
+
+    def _work(self) -> None:
+        """ Функция потока из пула: выполнение задач из очереди. """
+        while True:
+            _, _, job, function, args = self._queue.get()
+            with self._lock:
+                # задача уже выполняется (была в очереди дважды)
+                if job.status != 'queued':
+                    continue
+                job.status = 'running'
+                del self._waiting[job.key]
+            self._run(job, function, args)
+
+    def _run(self, job: Job, function: Callable, args) -> None:
+        """
+        Функция выполнения задачи.
+
+        :param job: задача
+        :param function: функция задачи
+        :param args: остальные аргументы функции
+        """
+        job.started_at = time.time()
+        try:
+            function(job, *args)
+            job.status = 'done'
+        except Exception as error:
+            job.error = getattr(error, 'message', self.default_error)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                del self._active[job.key]
+                self._forget()
+
+    def _forget(self) -> None:
+        """
+        Функция удаления самых старых законченных задач,
+            пока их больше keep.
+        """
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.finished]
+        for job_id in finished[:max(len(finished) - self.keep, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,97 @@
+from typing import Union
+
+
+# -----------------------------------------------------------
+# Данный класс позволяет определить язык текста (русский или английский)
+# без запросов к API - по буквам, из которых он состоит:
+# > почти все буквы кириллические - русский
+# > почти все буквы латинские - английский
+# > для смешанного текста голосуют слова: частые служебные
+# слова ("и", "в", "the", "of" ...) весят больше всего,
+# а русские слова - больше английских, так как латинские слова
+# в русском тексте - это обычно названия, а не сам язык текста
+# (если служебных слов нет, язык смешанного текста неоднозначен).
+# Если текст содержит буквы других языков (украинские "і", "є",
+# латинские буквы с диакритикой и т.п.) или язык однозначно
+# определить нельзя - возвращается None, и надо использовать API.
+# -----------------------------------------------------------
+
+class LanguageDetector:
+    """ Класс определения языка текста без запросов к API. """
+
+    # буквы русского алфавита
+    russian_letters = frozenset('абвгдеёжзийклмнопрстуфхцчшщъыьэюя')
+    # буквы английского алфавита
+    english_letters = frozenset('abcdefghijklmnopqrstuvwxyz')
+    # частые служебные слова
+    russian_words = frozenset((
+        'и', 'в', 'во', 'не', 'на', 'с', 'со', 'что', 'как', 'а', 'по',
+        'к', 'но', 'из', 'у', 'за', 'от', 'о', 'об', 'для', 'это', 'так',
+        'же', 'все', 'или', 'до', 'при', 'без', 'про', 'мой', 'ты'
+    ))
+    english_words = frozenset((
+        'the', 'a', 'an', 'and', 'of', 'to', 'in', 'is', 'for', 'on',
+        'with', 'how', 'what', 'at', 'by', 'from', 'it', 'my', 'your',
+        'this', 'that', 'are', 'be', 'or', 'not', 'about', 'vs'
+    ))
+    # веса слов при голосовании
+    function_word_weight = 3  # частое служебное слово
+    russian_word_weight = 2  # обычное русское слово
+    # доля букв одного алфавита, при которой язык определен
+    script_share = 0.8
+
+    def __call__(self, text: str) -> Union[str, None]:
+        """
+        Основная функция определения языка.
+
+        :param text: текст для определения языка
+        :return: 'ru', 'en' или None, если язык определить нельзя
+        """
+        text = text.lower()
+        russian = english = 0
+        for char in text:
+            if char in self.russian_letters:
+                russian += 1
+            elif char in self.english_letters:
+                english += 1
+            elif char.isalpha():  # буква другого языка
+                return None
+        if russian + english == 0:  # нет букв
+            return None
+        if russian >= self.script_share * (russian + english):
+            return 'ru'
+        if english >= self.script_share * (russian + english):
+            return 'en'
+        return self._vote(text)
+
+    def _vote(self, text: str) -> Union[str, None]:
+        """
+        Функция определения языка смешанного текста голосованием слов.
+
+        :param text: текст в нижнем регистре
+        :return: 'ru', 'en' или None, если служебных слов нет
+            или голоса разделились
+        """
+        russian = english = 0
+        function_words = False  # есть ли служебные слова
+        for word in text.split():
+            word = ''.join(char for char in word if char.isalpha())
+            if word == '':
+                continue
+            if word in self.russian_words:
+                russian += self.function_word_weight
+                function_words = True
+            elif word in self.english_words:
+                english += self.function_word_weight
+                function_words = True
+            elif all(char in self.russian_letters for char in word):
+                russian += self.russian_word_weight
+            elif all(char in self.english_letters for char in word):
+                english += 1
+        if not function_words:
+            return None
+        if russian > english:
+            return 'ru'
+        if english > russian:
+            return 'en'
+        return None
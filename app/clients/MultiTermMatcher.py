@@ -0,0 +1,87 @@
+from typing import Iterable, List, Union
+import numpy as np
+
+
+# -----------------------------------------------------------
+# Данный класс проверяет, что в тексте есть все слова хотя бы
+# одной из групп (например, слова запроса и слова его перевода),
+# в любом порядке и как подстроки (word in text).
+# Он строится один раз для запроса:
+# > одинаковые слова разных групп ищутся в тексте один раз
+# (флаги найденных слов общие для всех групп)
+# > слово, которое содержится в другом слове той же группы,
+# не ищется: оно точно есть, если есть более длинное
+# > в группе сначала ищутся более длинные (более редкие) слова,
+# и проверка группы прекращается на первом ненайденном слове.
+# Поиск каждого слова - это поиск подстроки на C, поэтому
+# он быстрее автомата (Ахо-Корасик), обходящего текст в Python.
+# -----------------------------------------------------------
+
+class MultiTermMatcher:
+    """ Класс поиска всех слов хотя бы одной группы в тексте. """
+
+    def __init__(self, groups: List[List[str]]):
+        """
+        :param groups: группы слов в нижнем регистре
+            (пустая группа подходит под любой текст)
+        """
+        self.terms: List[str] = []  # все слова без повторов
+        ids = dict()  # слово -> номер в terms
+        self.groups = []  # группы номеров слов в порядке поиска
+        for words in groups:
+            words = set(words)
+            # слова, которые не содержатся в других словах группы
+            words = [word for word in words
+                     if not any(word in other and word != other
+                                for other in words)]
+            words.sort(key=len, reverse=True)
+            group = []
+            for word in words:
+                if word not in ids:
+                    ids[word] = len(self.terms)
+                    self.terms.append(word)
+                group.append(ids[word])
+            self.groups.append(tuple(group))
+
+    @staticmethod
+    def from_query(code_words: str,
+                   translation: Union[str, None] = None) \
+            -> 'MultiTermMatcher':
+        """
+        Функция построения класса по ключевым словам и их переводу.
+
+        :param code_words: ключевые слова
+        :param translation: перевод ключевых слов (default None)
+        :return: MultiTermMatcher
+        """
+        groups = [code_words.lower().split()]
+        if translation is not None:
+            groups.append(translation.lower().split())
+        return MultiTermMatcher(groups)
+
+    def __call__(self, text: str) -> bool:
+        """
+        Основная функция проверки текста.
+
+        :param text: текст в нижнем регистре
+        :return: True - все слова хотя бы одной группы есть в тексте
+        """
+        hits = [None] * len(self.terms)  # флаги найденных слов
+        for group in self.groups:
+            for term in group:
+                if hits[term] is None:
+                    hits[term] = self.terms[term] in text
+                if not hits[term]:
+                    break
+            else:  # найдены все слова группы
+                return True
+        return False
+
+    def mask(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Функция проверки каждого текста.
+
+        :param texts: тексты в нижнем регистре
+        :return: маска текстов, подходящих хотя бы под одну группу
+        """
+        return np.fromiter((self(text) for text in texts), dtype=bool)
@@ -0,0 +1,140 @@
+from typing import Dict, List, Union
+from hashlib import sha1
+from threading import Lock
+import json
+import os
+import time
+
+
+# -----------------------------------------------------------
+# Данный класс позволяет хранить на диске страницы ответов PlaylistItems
+# для каждого плейлиста вместе с их ETag,
+# чтобы при повторной загрузке плейлиста не скачивать его заново:
+# > пока данные свежие (не старше ttl) - они используются без запросов к API
+# > потом - страницы перепроверяются с помощью If-None-Match,
+# и при ответе 304 Not Modified используется сохраненная страница.
+# Размер кэша ограничен: при превышении max_bytes удаляются плейлисты,
+# к которым дольше всего не обращались.
+# -----------------------------------------------------------
+
+class PlaylistCache:
+    """ Класс кэша плейлистов на диске. """
+
+    def __init__(self, directory: str, ttl=60 * 60,
+                 max_bytes=256 * 1024 * 1024):
+        """
+        :param directory: путь к папке, где хранится кэш
+        :param ttl: сколько секунд данные считаются свежими (default 1 час)
+        :param max_bytes: максимальный размер кэша в байтах (default 256 MiB)
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, playlist_id: str) -> str:
+        """
+        Функция получения пути к файлу с данными плейлиста.
+
+        :param playlist_id: id плейлиста
+        :return: путь к файлу
+        """
+        name = sha1(playlist_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.json')
+
+    def get(self, playlist_id: str) -> Union[Dict, None]:
+        """
+        Функция получения сохраненных данных плейлиста.
+
+        :param playlist_id: id плейлиста
+        :return: словарь dict(
+                'playlist_id' : id плейлиста,
+                'fetched_at' : время загрузки (в секундах),
+                'pages' : список страниц dict(
+                    'page_token' : "номер" страницы (None - первая страница),
+                    'etag' : ETag страницы,
+                    'data' : ответ от PlaylistItems
+                )
+            )
+            или None, если плейлиста нет в кэше
+        """
+        path = self._path(playlist_id)
+        with self._lock:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    entry = json.load(f)
+                # запоминаем время последнего обращения
+                os.utime(path)
+            except (OSError, ValueError):
+                return None
+        if entry.get('playlist_id') != playlist_id:
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """
+        Функция проверки, можно ли использовать данные без запросов к API.
+
+        :param entry: сохраненные данные плейлиста
+        :return: True - данные свежие, False - данные надо перепроверить
+        """
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def put(self, playlist_id: str, pages: List[Dict]) -> None:
+        """
+        Функция сохранения данных плейлиста.
+
+        :param playlist_id: id плейлиста
+        :param pages: список страниц (как в get)
+        """
+        entry = {
+            'playlist_id': playlist_id,
+            'fetched_at': time.time(),
+            'pages': pages
+        }
+        path = self._path(playlist_id)
+        with self._lock:
+            # записываем во временный файл, чтобы не испортить старые данные
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def delete(self, playlist_id: str) -> None:
+        """
+        Функция удаления данных плейлиста.
+
+        :param playlist_id: id плейлиста
+        """
+        with self._lock:
+            try:
+                os.remove(self._path(playlist_id))
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """
+        Функция удаления плейлистов, к которым дольше всего не обращались,
+            пока размер кэша больше max_bytes.
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,188 @@
+from threading import Lock
+from typing import Tuple, Union
+import pandas as pd
+
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.TokenIndex import TokenIndex
+from app.clients.TrigramIndex import TrigramIndex
+
+
+# -----------------------------------------------------------
+# Данный класс хранит неизменяемый снимок данных плейлиста для поиска:
+# таблицу PlaylistTable, колонки в нижнем регистре и индексы по ним.
+# Снимок не изменяется после создания, поэтому по нему
+# можно одновременно искать из нескольких потоков.
+# Новые видео добавляются созданием нового снимка (extended),
+# который использует неизмененные части старого.
+# Авторы хранятся кодами в таблице различных каналов
+# (которых в плейлисте обычно несколько десятков):
+# поиск по автору проверяет только различные каналы,
+# а количество видео каждого автора считается по кодам.
+# Колонка и индексы по названиям строятся сразу, а по названиям
+# и описаниям - только при первом поиске по описанию (text):
+# до этого описания остаются сжатыми, и поиск только по названиям
+# их не касается.
+# Тексты в нижнем регистре берутся из общих записей о видео
+# (VideoStore.Video): видео из нескольких плейлистов приводится
+# к нижнему регистру один раз, и колонки снимков этих плейлистов
+# ссылаются на одни и те же строки.
+# -----------------------------------------------------------
+
+class PlaylistSnapshot:
+    """ Класс неизменяемого снимка данных плейлиста. """
+
+    def __init__(self, table: PlaylistTable, indexed=True):
+        """
+        :param table: таблица с данными о каждом из видео в плейлисте
+        :param indexed: строить ли индексы: обратные индексы по словам
+            и индексы по триграммам (default True)
+        """
+        self.table = table
+        self.indexed = indexed
+        # колонка названий в нижнем регистре
+        self.title_lower = self._title_column(table)
+        # обратный индекс по словам и индекс по триграммам по названиям
+        self.title_index: Union[TokenIndex, None] = None
+        self.title_trigrams: Union[TrigramIndex, None] = None
+        if self.indexed:
+            self.title_index = TokenIndex(self.title_lower)
+            self.title_trigrams = TrigramIndex(self.title_lower)
+        # колонка названий и описаний в нижнем регистре и индексы по ней
+        # (строятся при первом поиске по описанию)
+        self._text: Union[Tuple, None] = None
+        self._text_lock = Lock()
+        # сколько памяти занимают таблица и данные по названиям
+        # и данные по названиям и описаниям (считается один раз)
+        self._memory: Union[int, None] = None
+        self._text_memory: Union[int, None] = None
+
+    @property
+    def index(self) -> pd.RangeIndex:
+        """ Номера строк таблицы (для масок видео). """
+        return self.title_lower.index
+
+    @staticmethod
+    def _title_column(table: PlaylistTable, offset=0) -> pd.Series:
+        """
+        Функция построения колонки названий в нижнем регистре.
+        Строится один раз, чтобы не приводить текст к нижнему регистру
+            при каждом запросе, а сами названия в нижнем регистре
+            берутся из общих записей о видео (VideoStore.Video).
+
+        :param table: таблица с данными о видео
+        :param offset: номер первой строки (default 0)
+        :return: колонка названий
+        """
+        return pd.Series([video.title_lower for video in table.videos],
+                         index=pd.RangeIndex(offset, offset + len(table)),
+                         dtype=object)
+
+    @staticmethod
+    def _text_column(title_lower: pd.Series,
+                     table: PlaylistTable) -> pd.Series:
+        """
+        Функция построения колонки названий и описаний в нижнем регистре
+            (описания распаковываются, только если текста еще нет
+            в общих записях о видео).
+
+        :param title_lower: колонка названий этих видео в нижнем регистре
+        :param table: таблица с данными об этих видео
+        :return: колонка названий и описаний
+        """
+        videos = table.videos
+        # описания нужны только видео, для которых текста еще нет
+        missing = [position for position, video in enumerate(videos)
+                   if not video.has_text]
+        descriptions = [None] * len(videos)
+        for position, description in zip(
+                missing, table.descriptions.take(table.index[missing])):
+            descriptions[position] = description
+        return pd.Series([video.text_lower(description)
+                          for video, description in zip(videos,
+                                                        descriptions)],
+                         index=title_lower.index, dtype=object)
+
+    def text(self) -> Tuple:
+        """
+        Функция получения данных для поиска по названиям и описаниям.
+        Строятся при первом вызове (один раз, даже если поиски
+            по описанию идут одновременно).
+
+        :return: (колонка названий и описаний в нижнем регистре,
+            обратный индекс по словам по ней (или None),
+            индекс по триграммам по ней (или None))
+        """
+        text = self._text
+        if text is not None:
+            return text
+        with self._text_lock:
+            if self._text is None:
+                text_lower = self._text_column(self.title_lower, self.table)
+                text_index = text_trigrams = None
+                if self.indexed:
+                    text_index = TokenIndex(text_lower)
+                    text_trigrams = TrigramIndex(text_lower)
+                self._text = (text_lower, text_index, text_trigrams)
+            return self._text
+
+    def extended(self, table: PlaylistTable) -> 'PlaylistSnapshot':
+        """
+        Функция получения снимка, дополненного новыми видео в конце.
+        Колонки в нижнем регистре и индексы строятся только для новых видео
+            и дополняют уже построенные.
+
+        :param table: таблица с данными о новых видео
+        :return: PlaylistSnapshot
+        """
+        title_lower = self._title_column(table, offset=len(self.table))
+
+        snapshot = PlaylistSnapshot.__new__(PlaylistSnapshot)
+        # новые каналы добавляются в конец таблицы каналов
+        snapshot.table = PlaylistTable.concat((self.table, table))
+        snapshot.indexed = self.indexed
+        snapshot.title_lower = pd.concat((self.title_lower, title_lower))
+        snapshot.title_index = snapshot.title_trigrams = None
+        if self.indexed:
+            snapshot.title_index = self.title_index.extended(title_lower)
+            snapshot.title_trigrams = self.title_trigrams.extended(title_lower)
+        snapshot._text = None
+        snapshot._text_lock = Lock()
+        snapshot._memory = snapshot._text_memory = None
+        # данные для поиска по описанию дополняются, если уже построены
+        text = self._text
+        if text is not None:
+            text_lower = self._text_column(title_lower, table)
+            old_lower, old_index, old_trigrams = text
+            snapshot._text = (
+                pd.concat((old_lower, text_lower)),
+                old_index.extended(text_lower) if self.indexed else None,
+                old_trigrams.extended(text_lower) if self.indexed else None)
+        return snapshot
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой таблицей,
+            колонками в нижнем регистре и индексами (приблизительно).
+        Память таблицы и данных по названиям (и по описаниям, когда они
+            построены) считается один раз.
+
+        :return: количество байт
+        """
+        if self._memory is None:
+            memory = self.table.memory_usage()
+            memory += int(self.title_lower.memory_usage(deep=True))
+            for index in (self.title_index, self.title_trigrams):
+                if index is not None:
+                    memory += index.memory_usage()
+            self._memory = memory
+        text = self._text
+        if text is None:
+            return self._memory
+        if self._text_memory is None:
+            text_lower, text_index, text_trigrams = text
+            memory = int(text_lower.memory_usage(deep=True))
+            for index in (text_index, text_trigrams):
+                if index is not None:
+                    memory += index.memory_usage()
+            self._text_memory = memory
+        return self._memory + self._text_memory
@@ -0,0 +1,329 @@
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+import sys
+import numpy as np
+
+from app.clients.DescriptionStore import DescriptionStore
+from app.clients.VideoStore import VideoStore
+
+
+# -----------------------------------------------------------
+# Данный класс компактно хранит данные о видео плейлиста по колонкам:
+# > номера видео в плейлисте - массив int32
+# > видео - ссылки на общие записи VideoStore.Video (id видео,
+# название и название в нижнем регистре), поэтому видео из нескольких
+# плейлистов хранится один раз, а таблица плейлиста - это ссылки на
+# записи и номера видео в плейлисте
+# > авторы - коды (int32) в таблице различных каналов
+# (id канала и ник автора хранятся один раз на канал)
+# > описания - в сжатом хранилище DescriptionStore,
+# общем для таблицы и всех выборок из нее
+# (описания нужны только при поиске по описанию и для показа видео).
+# Ссылки на видео, превью и автора не хранятся, а строятся по id
+# только для показываемых строк (row, to_dict).
+# Таблица не изменяется после создания: выборка строк (take)
+# и объединение таблиц (concat) создают новую таблицу.
+# Номера строк (index) сохраняются при выборке,
+# поэтому по ним можно понять, какие строки уже были показаны
+# и где лежат их описания в хранилище.
+# -----------------------------------------------------------
+
+class PlaylistTable:
+    """ Класс компактной таблицы с данными о видео плейлиста. """
+
+    # ссылки, которые строятся по id видео и id канала
+    video_url = 'https://www.youtube.com/watch?v={}'
+    img_url = 'https://img.youtube.com/vi/{}/0.jpg'
+    author_url = 'https://www.youtube.com/channel/{}'
+
+    def __init__(self, ind: np.ndarray, videos: np.ndarray,
+                 descriptions: DescriptionStore,
+                 author_codes: np.ndarray, channels: List[Tuple[str, str]],
+                 index: Union[np.ndarray, None] = None,
+                 extra: Union[Dict[str, np.ndarray], None] = None):
+        """
+        :param ind: номера видео в плейлисте
+        :param videos: записи о видео (VideoStore.Video)
+        :param descriptions: хранилище описаний видео
+            (описание строки - по ее номеру из index)
+        :param author_codes: номера авторов видео в channels
+            (-1 - автора нет)
+        :param channels: различные каналы (id канала, ник автора)
+        :param index: номера строк (default None - по порядку с 0)
+        :param extra: дополнительные колонки (default None - нет)
+        """
+        self.ind = ind
+        self.videos = videos
+        self.descriptions = descriptions
+        self.author_codes = author_codes
+        self.channels = channels
+        self.index = index if index is not None \
+            else np.arange(len(ind), dtype=np.int64)
+        self.extra = extra if extra is not None else dict()
+
+    @classmethod
+    def from_columns(cls, ind: List[int], video_ids: List[str],
+                     titles: List[str], descriptions: List[str],
+                     channel_ids: List[str], authors: List[str],
+                     store: Union[VideoStore, None] = None) \
+            -> 'PlaylistTable':
+        """
+        Функция создания таблицы из списков данных о видео.
+        Уже известные хранилищу видео не создаются заново,
+            а берутся из него.
+
+        :param ind: номера видео в плейлисте
+        :param video_ids: id видео
+        :param titles: названия видео
+        :param descriptions: описания видео
+        :param channel_ids: id каналов авторов видео
+        :param authors: ники авторов видео
+        :param store: общее хранилище записей о видео
+            (default None - свое хранилище только для этой таблицы)
+        :return: PlaylistTable
+        """
+        if store is None:
+            store = VideoStore()
+        codes = dict()  # (id канала, ник автора) -> номер канала
+        author_codes = np.fromiter(
+            (codes.setdefault(channel, len(codes))
+             for channel in zip(channel_ids, authors)),
+            dtype=np.int32, count=len(authors))
+        return cls(np.array(ind, dtype=np.int32),
+                   cls._objects(store.videos(video_ids, titles,
+                                             descriptions)),
+                   DescriptionStore(descriptions),
+                   author_codes,
+                   list(codes))
+
+    @classmethod
+    def create_empty(cls) -> 'PlaylistTable':
+        """
+        Функция создания таблицы без строк.
+
+        :return: PlaylistTable
+        """
+        return cls.from_columns([], [], [], [], [], [])
+
+    @staticmethod
+    def _objects(values: Iterable) -> np.ndarray:
+        """
+        Функция создания массива объектов
+            (np.array разворачивает вложенные списки, а этот - нет).
+
+        :param values: значения
+        :return: одномерный массив объектов
+        """
+        values = list(values)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def __len__(self) -> int:
+        return len(self.ind)
+
+    @property
+    def empty(self) -> bool:
+        """ Нет ли в таблице строк. """
+        return len(self) == 0
+
+    def take(self, rows: np.ndarray) -> 'PlaylistTable':
+        """
+        Функция выборки строк (номера строк сохраняются).
+
+        :param rows: позиции строк или маска строк
+        :return: PlaylistTable
+        """
+        return PlaylistTable(
+            self.ind[rows], self.videos[rows], self.descriptions,
+            self.author_codes[rows], self.channels, self.index[rows],
+            {name: column[rows] for name, column in self.extra.items()})
+
+    def with_column(self, name: str, values: Iterable) -> 'PlaylistTable':
+        """
+        Функция добавления дополнительной колонки.
+
+        :param name: название колонки
+        :param values: значения колонки
+        :return: PlaylistTable
+        """
+        extra = dict(self.extra)
+        extra[name] = self._objects(values)
+        return PlaylistTable(self.ind, self.videos, self.descriptions,
+                             self.author_codes, self.channels,
+                             self.index, extra)
+
+    def is_whole(self) -> bool:
+        """ Все ли строки хранилища описаний есть в таблице по порядку. """
+        return len(self) == len(self.descriptions) \
+            and np.array_equal(self.index, np.arange(len(self)))
+
+    def description_list(self) -> List[str]:
+        """
+        Функция получения описаний всех видео таблицы
+            (распаковываются только нужные блоки).
+
+        :return: описания по порядку строк
+        """
+        if self.is_whole():
+            return list(self.descriptions)
+        return self.descriptions.take(self.index)
+
+    @classmethod
+    def concat(cls, tables: Iterable['PlaylistTable']) -> 'PlaylistTable':
+        """
+        Функция объединения таблиц (строки нумеруются заново).
+        Таблицы каналов объединяются, а коды авторов пересчитываются.
+        Если первая таблица - целая (как при дополнении плейлиста),
+            то ее хранилище описаний дополняется, а не строится заново.
+
+        :param tables: таблицы
+        :return: PlaylistTable
+        """
+        tables = list(tables)
+        codes = dict()  # канал -> номер в объединенной таблице каналов
+        author_codes = []
+        for table in tables:
+            # последний элемент - для видео без автора (код -1)
+            remap = np.array([codes.setdefault(channel, len(codes))
+                              for channel in table.channels] + [-1],
+                             dtype=np.int32)
+            author_codes.append(remap[table.author_codes])
+        names = []  # дополнительные колонки всех таблиц
+        for table in tables:
+            names += [name for name in table.extra if name not in names]
+        extra = {name: np.concatenate(
+                    [table.extra.get(name, np.full(len(table), None))
+                     for table in tables])
+                 for name in names}
+        if tables[0].is_whole():
+            descriptions = tables[0].descriptions.extended(
+                description for table in tables[1:]
+                for description in table.description_list())
+        else:
+            descriptions = DescriptionStore(
+                description for table in tables
+                for description in table.description_list())
+        return cls(np.concatenate([table.ind for table in tables]),
+                   np.concatenate([table.videos for table in tables]),
+                   descriptions,
+                   np.concatenate(author_codes),
+                   list(codes),
+                   extra=extra)
+
+    def row(self, position: int) -> Dict:
+        """
+        Функция получения данных об одном видео (ссылки строятся по id).
+
+        :param position: позиция строки в таблице
+        :return: словарь (как в _row)
+        """
+        return self._row(position,
+                         self.descriptions[self.index[position]])
+
+    def _row(self, position: int, description: Union[str, None]) -> Dict:
+        """
+        Функция получения данных об одном видео по уже известному описанию.
+
+        :param position: позиция строки в таблице
+        :param description: описание видео
+        :return: словарь dict(
+                'ind' : номер видео в плейлисте,
+                'url' : ссылка на видео,
+                'img_url' : ссылка на изображение превью видео,
+                'title' : название видео,
+                'description' : описание видео,
+                'author_url' : ссылка на автора видео,
+                'author' : ник автора видео,
+                и дополнительные колонки
+            )
+        """
+        video = self.videos[position]
+        code = self.author_codes[position]
+        channel_id, author = self.channels[code] if code >= 0 else ('', '')
+        row = {
+            'ind': int(self.ind[position]),
+            'url': self.video_url.format(video.video_id),
+            'img_url': self.img_url.format(video.video_id),
+            'title': video.title,
+            'description': description,
+            'author_url': self.author_url.format(channel_id),
+            'author': author
+        }
+        for name, column in self.extra.items():
+            row[name] = column[position]
+        return row
+
+    def rows(self, descriptions=True) -> Iterator[Dict]:
+        """
+        Функция перебора строк таблицы.
+
+        :param descriptions: нужны ли описания (default True),
+            иначе - описания не распаковываются, а вместо них None
+        :return: итератор словарей (как в row)
+        """
+        if descriptions:
+            values = self.description_list()
+        else:
+            values = [None] * len(self)
+        return (self._row(position, description)
+                for position, description in enumerate(values))
+
+    def to_dict(self) -> Dict[int, Dict]:
+        """
+        Функция получения данных о всех видео таблицы.
+        Распаковываются только блоки с описаниями этих видео.
+
+        :return: словарь номер строки -> словарь (как в row)
+        """
+        return {int(self.index[position]): row
+                for position, row in enumerate(self.rows())}
+
+    def author_mask(self, author_name: str) -> np.ndarray:
+        """
+        Функция поиска видео по автору (независимо от регистра):
+            ник ищется только среди различных каналов,
+            а видео находятся по кодам авторов.
+
+        :param author_name: ник автора в нижнем регистре
+        :return: маска видео, у автора которых есть author_name
+        """
+        # последний элемент - для видео без автора (код -1)
+        found = np.fromiter((author_name in author.lower()
+                             for _, author in self.channels),
+                            dtype=bool, count=len(self.channels))
+        return np.append(found, False)[self.author_codes]
+
+    def author_facet(self) -> List[Tuple[str, int]]:
+        """
+        Функция подсчета видео каждого автора.
+
+        :return: список (ник автора, сколько видео)
+            по убыванию количества видео
+        """
+        codes = self.author_codes[self.author_codes >= 0]
+        counts = dict()  # ник автора -> сколько видео
+        for (_, author), count in zip(
+                self.channels,
+                np.bincount(codes, minlength=len(self.channels))):
+            if count > 0:
+                counts[author] = counts.get(author, 0) + int(count)
+        return sorted(counts.items(), key=lambda item: item[1],
+                      reverse=True)
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой таблицей (приблизительно).
+        Общие записи о видео считаются целиком (как если бы таблица
+            была единственной, которая на них ссылается).
+
+        :return: количество байт
+        """
+        memory = self.ind.nbytes + self.videos.nbytes \
+            + self.author_codes.nbytes + self.index.nbytes
+        memory += sum(video.memory_usage() for video in set(self.videos))
+        for column in self.extra.values():
+            memory += column.nbytes + sum(map(sys.getsizeof, column))
+        memory += self.descriptions.memory_usage()
+        for channel_id, author in self.channels:
+            memory += sys.getsizeof(channel_id) + sys.getsizeof(author)
+        return memory
@@ -0,0 +1,154 @@
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Union
+import json
+import os
+
+from app.clients.JobManager import JobManager
+
+
+# -----------------------------------------------------------
+# Данный класс заранее загружает популярные плейлисты,
+# чтобы первому пользователю после перезапуска приложения
+# (или после устаревания данных) не приходилось ждать загрузки:
+# > считается, сколько раз искали по каждому плейлисту
+# (счетчики сохраняются в файл, чтобы учитываться после перезапуска)
+# > при запуске и далее раз в interval секунд для top самых популярных
+# плейлистов запускаются фоновые задачи загрузки (BACKGROUND),
+# которые загружают плейлист или дополняют уже загруженный
+# > одновременно выполняется не больше concurrency таких задач,
+# поэтому для загрузок пользователей всегда остаются свободные потоки.
+# -----------------------------------------------------------
+
+class PlaylistWarmer:
+    """ Класс фоновой загрузки популярных плейлистов. """
+
+    def __init__(self, jobs: JobManager, load: Callable,
+                 path: Union[str, None] = None, top=10,
+                 interval=30 * 60, concurrency=2, max_tracked=1000):
+        """
+        :param jobs: фоновые задачи, в которых загружаются плейлисты
+        :param load: функция загрузки плейлиста
+            load(job, playlist_id, url_or_id, force_refresh)
+        :param path: путь к файлу, где хранятся счетчики поиска
+            (default None - счетчики только в памяти)
+        :param top: сколько самых популярных плейлистов загружать
+            (default 10)
+        :param interval: раз в сколько секунд обновлять плейлисты
+            (default 30 минут)
+        :param concurrency: сколько плейлистов может загружаться
+            одновременно (default 2)
+        :param max_tracked: для скольких плейлистов хранятся счетчики
+            (default 1000)
+        """
+        self.jobs = jobs
+        self.load = load
+        self.path = path
+        self.top = top
+        self.interval = interval
+        self.concurrency = concurrency
+        self.max_tracked = max_tracked
+        self._counts = dict()  # id плейлиста -> сколько раз искали
+        self._running: List[JobManager.Job] = []  # запущенные задачи
+        self._lock = Lock()
+        self._stop = Event()
+        self.rounds = 0  # сколько раз обновлялись плейлисты
+        self.refreshes = 0  # сколько задач загрузки запущено
+        if self.path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        """ Функция загрузки счетчиков из файла. """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._counts = dict(json.load(f))
+        except (OSError, ValueError):
+            return
+
+    def _save(self) -> None:
+        """ Функция сохранения счетчиков в файл. """
+        if self.path is None:
+            return
+        with self._lock:
+            counts = dict(self._counts)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(counts, f)
+        os.replace(tmp_path, self.path)
+
+    def hit(self, playlist_id: str) -> None:
+        """
+        Функция учета поиска по плейлисту.
+
+        :param playlist_id: id плейлиста
+        """
+        with self._lock:
+            self._counts[playlist_id] = self._counts.get(playlist_id, 0) + 1
+            if len(self._counts) > self.max_tracked:
+                # забываем наименее популярную половину плейлистов
+                ordered = sorted(self._counts, key=self._counts.get,
+                                 reverse=True)
+                for key in ordered[self.max_tracked // 2:]:
+                    del self._counts[key]
+
+    def popular(self) -> List[str]:
+        """
+        Функция получения самых популярных плейлистов.
+
+        :return: top id плейлистов, по которым искали больше всего
+        """
+        with self._lock:
+            return sorted(self._counts, key=self._counts.get,
+                          reverse=True)[:self.top]
+
+    def start(self) -> None:
+        """ Функция запуска потока, обновляющего плейлисты. """
+        Thread(target=self._work, name='warmer', daemon=True).start()
+
+    def stop(self) -> None:
+        """ Функция остановки потока, обновляющего плейлисты. """
+        self._stop.set()
+
+    def _work(self) -> None:
+        """ Функция потока обновления плейлистов. """
+        while not self._stop.is_set():
+            self.refresh()
+            self._save()
+            self._stop.wait(self.interval)
+
+    def refresh(self) -> None:
+        """
+        Функция обновления самых популярных плейлистов.
+        Новые задачи запускаются, только когда заканчиваются предыдущие,
+            чтобы одновременно было не больше concurrency задач.
+        """
+        self.rounds += 1
+        for playlist_id in self.popular():
+            while not self._stop.is_set():
+                self._running = [job for job in self._running
+                                 if not job.finished]
+                if len(self._running) < self.concurrency:
+                    break
+                self._stop.wait(0.5)
+            if self._stop.is_set():
+                return
+            self._running.append(
+                self.jobs.submit(playlist_id, self.load,
+                                 playlist_id, playlist_id, False,
+                                 priority=JobManager.BACKGROUND))
+            self.refreshes += 1
+
+    def metrics(self) -> Dict:
+        """
+        Функция получения статистики обновления плейлистов.
+
+        :return: словарь dict(
+                'popular' : самые популярные плейлисты,
+                'rounds' : сколько раз обновлялись плейлисты,
+                'refreshes' : сколько задач загрузки запущено
+            )
+        """
+        return {
+            'popular': self.popular(),
+            'rounds': self.rounds,
+            'refreshes': self.refreshes
+        }
@@ -0,0 +1,284 @@
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Union
+from zoneinfo import ZoneInfo
+import json
+import os
+import time
+
+
+# -----------------------------------------------------------
+# Данный класс ведет учет расхода дневной квоты YouTube Data API v3
+# (10,000 единиц в день, каждый запрос к Playlists и PlaylistItems
+# стоит 1 единицу, в том числе ответ 304 Not Modified).
+# Расход сохраняется в файл, чтобы учитываться после перезапуска
+# (не после каждого запроса, а не чаще раза в save_interval секунд
+# и в конце каждой загрузки).
+# Квота обновляется в полночь по тихоокеанскому времени
+# (America/Los_Angeles, с учетом перехода на летнее время).
+# Перед загрузкой проверяется, хватит ли оставшейся квоты:
+# фоновым загрузкам недоступен резерв для загрузок пользователей.
+# Проверка резервирует нужные единицы за загрузкой (Reservation),
+# поэтому одновременные загрузки не могут вместе превысить квоту:
+# запросы загрузки тратят ее резерв, а неиспользованный остаток
+# возвращается, когда загрузка заканчивается.
+# -----------------------------------------------------------
+
+class QuotaLedger:
+    """ Класс учета квоты YouTube Data API v3. """
+
+    class ExceededError(Exception):
+        """ Класс исключения, информирующий о том,
+            что для загрузки не хватит дневной квоты API. """
+        message = \
+            'Дневной лимит запросов к YouTube Data API почти исчерпан:' \
+            ' загрузка этого плейлиста его превысит.' \
+            ' <br>' \
+            ' Попробуйте загрузить плейлист завтра.'
+
+    class Reservation:
+        """ Класс квоты, зарезервированной за одной загрузкой.
+            Используется в with: в конце остаток резерва возвращается. """
+
+        def __init__(self, ledger: 'QuotaLedger', background=False):
+            """
+            :param ledger: учет квоты
+            :param background: фоновая ли загрузка (default False)
+            """
+            self.ledger = ledger
+            self.background = background
+            self.units = 0  # сколько зарезервированных единиц не потрачено
+
+        def add(self, cost: int) -> None:
+            """
+            Функция резервирования квоты на следующие запросы загрузки:
+                у загрузки должно остаться не меньше cost единиц резерва.
+
+            :param cost: сколько единиц потребуется
+            :return: вызывает ExceededError, если квоты не хватит
+            """
+            self.ledger._reserve(self, cost)
+
+        def spend(self, endpoint: str) -> None:
+            """
+            Функция учета запроса загрузки (тратит ее резерв).
+
+            :param endpoint: тип запроса ('playlists' или 'playlistItems')
+            """
+            self.ledger._spend(endpoint, 1, self)
+
+        def release(self) -> None:
+            """ Функция возврата неиспользованного резерва. """
+            self.ledger._release(self)
+
+        def __enter__(self) -> 'QuotaLedger.Reservation':
+            return self
+
+        def __exit__(self, *exc_info) -> None:
+            self.release()
+
+    # стоимость запроса в единицах квоты
+    costs = {'playlists': 1, 'playlistItems': 1}
+    # не чаще раза в сколько секунд расход сохраняется в файл
+    save_interval = 5
+    # часовой пояс, в котором обновляется квота
+    quota_timezone = ZoneInfo('America/Los_Angeles')
+
+    def __init__(self, path: Union[str, None] = None, daily_limit=10000,
+                 background_reserve=2000):
+        """
+        :param path: путь к файлу, где хранится расход
+            (default None - расход только в памяти)
+        :param daily_limit: дневная квота в единицах (default 10000)
+        :param background_reserve: сколько единиц квоты
+            не тратится на фоновые загрузки (default 2000)
+        """
+        self.path = path
+        self.daily_limit = daily_limit
+        self.background_reserve = background_reserve
+        self._lock = Lock()
+        self._day = self._today()
+        self._by_endpoint = dict()  # запрос -> потраченные единицы
+        self._reserved = 0  # сколько единиц зарезервировано загрузками
+        self._dirty = False  # есть ли несохраненный расход
+        self._saved_at = 0.0  # когда расход сохранялся последний раз
+        if self.path is not None:
+            self._load()
+
+    def _today(self) -> str:
+        """
+        Функция получения текущего дня квоты.
+
+        :return: дата в формате YYYY-MM-DD
+        """
+        return datetime.now(self.quota_timezone).strftime('%Y-%m-%d')
+
+    def _load(self) -> None:
+        """ Функция загрузки расхода из файла (только за текущий день). """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('day') == self._day:
+            self._by_endpoint = dict(data.get('by_endpoint', dict()))
+
+    def _save(self) -> None:
+        """ Функция сохранения расхода в файл. """
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if self.path is None:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'day': self._day, 'by_endpoint': self._by_endpoint},
+                      f)
+        os.replace(tmp_path, self.path)
+
+    def _roll(self) -> None:
+        """ Функция обнуления расхода, если начался новый день квоты. """
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._by_endpoint = dict()
+
+    def record(self, endpoint: str, count=1) -> None:
+        """
+        Функция учета сделанных запросов (не из загрузки с резервом).
+
+        :param endpoint: тип запроса ('playlists' или 'playlistItems')
+        :param count: сколько запросов сделано (default 1)
+        """
+        self._spend(endpoint, count)
+
+    def _spend(self, endpoint: str, count=1,
+               reservation: Union[Reservation, None] = None) -> None:
+        """
+        Функция учета сделанных запросов: они тратят резерв загрузки,
+            а расход сохраняется, если с прошлого сохранения
+            прошло save_interval секунд.
+
+        :param endpoint: тип запроса ('playlists' или 'playlistItems')
+        :param count: сколько запросов сделано (default 1)
+        :param reservation: резерв загрузки (default None - без резерва)
+        """
+        cost = self.costs.get(endpoint, 1) * count
+        with self._lock:
+            self._roll()
+            self._by_endpoint[endpoint] = \
+                self._by_endpoint.get(endpoint, 0) + cost
+            if reservation is not None:
+                spent = min(reservation.units, cost)
+                reservation.units -= spent
+                self._reserved -= spent
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def flush(self) -> None:
+        """ Функция сохранения еще не сохраненного расхода. """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def remaining(self) -> int:
+        """
+        Функция подсчета оставшейся квоты (без зарезервированной).
+
+        :return: сколько единиц осталось
+        """
+        with self._lock:
+            self._roll()
+            return self._available()
+
+    def _available(self) -> int:
+        """
+        Функция подсчета квоты, которую еще можно зарезервировать
+            (вызывается под блокировкой).
+
+        :return: сколько единиц осталось
+        """
+        return self.daily_limit - sum(self._by_endpoint.values()) \
+            - self._reserved
+
+    def check(self, cost: int, background=False) -> None:
+        """
+        Функция проверки, что квоты хватит на запросы (без резервирования).
+
+        :param cost: сколько единиц потребуется
+        :param background: фоновая ли загрузка (default False)
+        :return: вызывает ExceededError, если квоты не хватит
+        """
+        available = self.remaining()
+        if background:
+            available -= self.background_reserve
+        if cost > available:
+            raise self.ExceededError
+
+    def reserve(self, background=False) -> Reservation:
+        """
+        Функция создания резерва квоты для одной загрузки.
+
+        :param background: фоновая ли загрузка - ей недоступен
+            резерв для загрузок пользователей (default False)
+        :return: Reservation (пока без зарезервированных единиц)
+        """
+        return self.Reservation(self, background)
+
+    def _reserve(self, reservation: Reservation, cost: int) -> None:
+        """
+        Функция резервирования квоты за загрузкой: проверка
+            и резервирование идут под одной блокировкой.
+
+        :param reservation: резерв загрузки
+        :param cost: сколько единиц резерва должно быть у загрузки
+        :return: вызывает ExceededError, если квоты не хватит
+        """
+        with self._lock:
+            self._roll()
+            needed = cost - reservation.units
+            if needed <= 0:
+                return
+            available = self._available()
+            if reservation.background:
+                available -= self.background_reserve
+            if needed > available:
+                raise self.ExceededError
+            reservation.units += needed
+            self._reserved += needed
+
+    def _release(self, reservation: Reservation) -> None:
+        """
+        Функция возврата неиспользованного резерва загрузки
+            и сохранения ее расхода.
+
+        :param reservation: резерв загрузки
+        """
+        with self._lock:
+            self._reserved -= reservation.units
+            reservation.units = 0
+            if self._dirty:
+                self._save()
+
+    def usage(self) -> Dict:
+        """
+        Функция получения расхода квоты.
+
+        :return: словарь dict(
+                'day' : текущий день квоты,
+                'used' : сколько единиц потрачено,
+                'remaining' : сколько единиц осталось,
+                'reserved' : сколько единиц зарезервировано загрузками,
+                'by_endpoint' : сколько единиц потрачено на каждый запрос
+            )
+        """
+        with self._lock:
+            self._roll()
+            used = sum(self._by_endpoint.values())
+            return {
+                'day': self._day,
+                'used': used,
+                'remaining': self.daily_limit - used,
+                'reserved': self._reserved,
+                'by_endpoint': dict(self._by_endpoint)
+            }
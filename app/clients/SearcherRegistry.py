@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Union
+
+from app.clients.DataFrameSearcher import DataFrameSearcher
+
+
+# -----------------------------------------------------------
+# Данный класс хранит подготовленные классы поиска (DataFrameSearcher)
+# для нескольких плейлистов и пользователей одновременно.
+# Ключ - id плейлиста и (для приватных плейлистов) идентификатор
+# авторизованного с помощью OAuth пользователя.
+# Суммарная память ограничена: при превышении memory_budget
+# удаляются плейлисты, к которым дольше всего не обращались.
+# -----------------------------------------------------------
+
+class SearcherRegistry:
+    """ Класс хранения классов поиска по плейлистам. """
+
+    def __init__(self, memory_budget=512 * 1024 * 1024):
+        """
+        :param memory_budget: сколько байт могут занимать
+            все классы поиска вместе (default 512 MiB)
+        """
+        self.memory_budget = memory_budget
+        # (id плейлиста, пользователь) -> (класс поиска, занимаемая память)
+        self._searchers = OrderedDict()
+        self._memory = 0  # сколько байт занято сейчас
+        self._lock = Lock()
+
+    def get(self, playlist_id: str,
+            identity: Union[str, None] = None) \
+            -> Union[DataFrameSearcher, None]:
+        """
+        Функция получения класса поиска по плейлисту.
+
+        :param playlist_id: id плейлиста
+        :param identity: идентификатор пользователя OAuth
+            (default None - неприватный плейлист)
+        :return: DataFrameSearcher или None, если плейлист не загружен
+        """
+        key = (playlist_id, identity)
+        with self._lock:
+            if key not in self._searchers:
+                return None
+            # плейлист использовался последним
+            self._searchers.move_to_end(key)
+            return self._searchers[key][0]
+
+    def put(self, playlist_id: str, searcher: DataFrameSearcher,
+            identity: Union[str, None] = None) -> None:
+        """
+        Функция сохранения класса поиска по плейлисту.
+        Если класс поиска изменился (например, дополнен новыми видео),
+            то его надо сохранить заново, чтобы пересчитать память.
+
+        :param playlist_id: id плейлиста
+        :param searcher: класс поиска по плейлисту
+        :param identity: идентификатор пользователя OAuth
+            (default None - неприватный плейлист)
+        """
+        key = (playlist_id, identity)
+        memory = searcher.memory_usage()
+        with self._lock:
+            if key in self._searchers:
+                self._memory -= self._searchers.pop(key)[1]
+            self._searchers[key] = (searcher, memory)
+            self._memory += memory
+            self._evict()
+
+    def resize(self, searcher: DataFrameSearcher) -> None:
+        """
+        Функция пересчета памяти, занимаемой классом поиска
+            (например, после первого поиска по описанию,
+            для которого строятся новые индексы).
+
+        :param searcher: класс поиска по плейлисту
+        """
+        memory = searcher.memory_usage()
+        with self._lock:
+            for key, (stored, old_memory) in list(self._searchers.items()):
+                if stored is searcher and old_memory != memory:
+                    self._searchers[key] = (searcher, memory)
+                    self._memory += memory - old_memory
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Функция удаления плейлистов, к которым дольше всего не обращались,
+            пока занятая память больше memory_budget.
+        Последний сохраненный плейлист не удаляется.
+        """
+        while self._memory > self.memory_budget and len(self._searchers) > 1:
+            _, (_, memory) = self._searchers.popitem(last=False)
+            self._memory -= memory
+
+    def metrics(self) -> Dict:
+        """
+        Функция получения статистики загруженных плейлистов.
+
+        :return: словарь dict(
+                'playlists' : сколько плейлистов загружено,
+                'videos' : сколько в них видео,
+                'memory' : сколько байт они занимают,
+                'bytes_per_video' : сколько байт в среднем на видео
+            )
+        """
+        with self._lock:
+            searchers = [searcher for searcher, _ in self._searchers.values()]
+            memory = self._memory
+        videos = sum(len(searcher.table) for searcher in searchers
+                     if searcher.table is not None)
+        return {
+            'playlists': len(searchers),
+            'videos': videos,
+            'memory': memory,
+            'bytes_per_video': memory // videos if videos > 0 else 0
+        }
@@ -0,0 +1,203 @@
+from threading import Condition, Lock
+from typing import Callable, Dict, Hashable, Iterator, Union
+
+
+# -----------------------------------------------------------
+# Данный класс объединяет одновременные вызовы с одинаковым ключом
+# (например, загрузки одного плейлиста) функции, возвращающей итератор
+# (например, страницы плейлиста по мере загрузки): итератор перебирается
+# один раз, а каждый вызов получает все его элементы (или ту же ошибку)
+# по мере их появления, причем присоединившийся позже вызов сначала
+# получает уже полученные элементы.
+# Присоединившийся вызов может изменить выполняющийся
+# (например, повысить приоритет фоновой загрузки) - функцией join.
+# Следующий элемент получает тот вызов, которому он нужен первым,
+# поэтому перебор продолжается, даже если первый вызов закончился;
+# если закончились (или закрыты, в том числе до первого элемента)
+# все вызовы, то итератор закрывается.
+# Считается, сколько вызовов было и сколько из них не выполнялись.
+# -----------------------------------------------------------
+
+class SingleFlight:
+    """ Класс объединения одновременных вызовов. """
+
+    class _Call:
+        """ Класс выполняющегося вызова. """
+
+        def __init__(self, iterator: Iterator, args: tuple):
+            self.iterator = iterator
+            self.args = args  # аргументы функции
+            self.items = []  # уже полученные элементы
+            self.done = False  # закончился ли итератор
+            self.error = None  # ошибка итератора
+            self.advancing = False  # получает ли кто-то следующий элемент
+            self.consumers = 0  # сколько вызовов перебирают элементы
+            self.condition = Condition()
+
+    class _Consumer:
+        """ Класс итератора элементов общего вызова для одного вызова.
+            Вызов заканчивается, когда элементы закончились, при ошибке
+            и при закрытии итератора (close или удаление). """
+
+        def __init__(self, flight: 'SingleFlight', key: Hashable,
+                     call: 'SingleFlight._Call'):
+            self.flight = flight
+            self.key = key
+            self.call = call
+            self.position = 0  # номер следующего элемента
+            self.closed = False
+
+        def __iter__(self) -> 'SingleFlight._Consumer':
+            return self
+
+        def __next__(self):
+            if self.closed:
+                raise StopIteration
+            try:
+                return self.flight._next(self)
+            except BaseException:
+                self.close()
+                raise
+
+        def close(self) -> None:
+            """ Функция окончания вызова (элементы больше не нужны). """
+            if not self.closed:
+                self.closed = True
+                self.flight._leave(self.key, self.call)
+
+        def __del__(self):
+            self.close()
+
+    def __init__(self):
+        self._calls = dict()  # ключ -> выполняющийся вызов
+        self._lock = Lock()
+        self.calls = 0  # сколько было вызовов
+        self.executions = 0  # сколько раз функция выполнялась
+
+    def stream(self, key: Hashable, function: Callable, *args,
+               join: Union[Callable, None] = None) -> Iterator:
+        """
+        Функция вызова функции, возвращающей итератор.
+
+        :param key: ключ вызова
+        :param function: функция, возвращающая итератор
+            (генератор - чтобы ничего не делать до первого элемента)
+        :param args: аргументы функции
+        :param join: функция, которая вызывается с аргументами
+            выполняющегося вызова, если этот вызов к нему присоединился
+            (default None)
+        :return: итератор элементов (общих для одновременных вызовов)
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = \
+                    self._Call(function(*args), args)
+                self.executions += 1
+            elif join is not None:
+                join(*call.args)
+            call.consumers += 1
+        return self._Consumer(self, key, call)
+
+    def join(self, key: Hashable, join: Callable) -> bool:
+        """
+        Функция изменения выполняющегося вызова без присоединения к нему.
+
+        :param key: ключ вызова
+        :param join: функция, которая вызывается с аргументами
+            выполняющегося вызова
+        :return: True - вызов с этим ключом выполняется
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                join(*call.args)
+            return call is not None
+
+    def _next(self, consumer: _Consumer):
+        """
+        Функция получения следующего элемента общего итератора
+            одним вызовом.
+
+        :param consumer: итератор вызова
+        :return: элемент (вызывает StopIteration, если их больше нет)
+        """
+        call = consumer.call
+        while True:
+            with call.condition:
+                # следующий элемент уже получает другой вызов
+                while consumer.position == len(call.items) \
+                        and not call.done and call.advancing:
+                    call.condition.wait()
+                if consumer.position < len(call.items):
+                    consumer.position += 1
+                    return call.items[consumer.position - 1]
+                if call.done:
+                    if call.error is not None:
+                        raise call.error
+                    raise StopIteration
+                call.advancing = True
+            # этот вызов получает следующий элемент
+            try:
+                item = next(call.iterator)
+            except StopIteration:
+                self._finish(consumer.key, call, None)
+            except Exception as error:
+                self._finish(consumer.key, call, error)
+            else:
+                with call.condition:
+                    call.items.append(item)
+                    call.advancing = False
+                    call.condition.notify_all()
+
+    def _leave(self, key: Hashable, call: _Call) -> None:
+        """
+        Функция окончания одного вызова: если элементы больше
+            никому не нужны, то итератор закрывается.
+
+        :param key: ключ вызова
+        :param call: выполняющийся вызов
+        """
+        with self._lock:
+            call.consumers -= 1
+            abandoned = call.consumers == 0 and not call.done
+            if abandoned and self._calls.get(key) is call:
+                del self._calls[key]
+        if abandoned:
+            call.iterator.close()
+
+    def _finish(self, key: Hashable, call: _Call,
+                error: Union[Exception, None]) -> None:
+        """
+        Функция завершения общего итератора.
+
+        :param key: ключ вызова
+        :param call: выполняющийся вызов
+        :param error: ошибка итератора (None - итератор закончился)
+        """
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        with call.condition:
+            call.done = True
+            call.error = error
+            call.advancing = False
+            call.condition.notify_all()
+
+    def metrics(self) -> Dict:
+        """
+        Функция получения статистики вызовов.
+
+        :return: словарь dict(
+                'calls' : сколько было вызовов,
+                'executions' : сколько раз функция выполнялась,
+                'saved' : сколько выполнений удалось избежать
+            )
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'saved': self.calls - self.executions
+            }
@@ -1,6 +1,11 @@
 from urllib.parse import urlencode
+from typing import Union
 import requests
 
+from app.clients.HttpClient import HttpClient
+from app.clients.LanguageDetector import LanguageDetector
+from app.clients.TranslationCache import TranslationCache
+
 
 # -----------------------------------------------------------
 # Данный класс позволяет переводить текст с русского на английский
@@ -16,6 +21,10 @@ import requests
 # (https://mymemory.translated.net/doc/spec.php)
 # (Бесплатное анонимное использование c ограничением 1000 слов в день.
 # Доступ без api-key.)
+# Результаты запросов к обоим API могут храниться в TranslationCache.
+# Язык обычно определяется без запросов к API (LanguageDetector),
+# а Detect Language API используется, только если язык неоднозначен.
+# Запросы к API делаются через общий HttpClient.
 # -----------------------------------------------------------
 
 class TextTranslator:
@@ -37,24 +46,72 @@ class TextTranslator:
         message = \
             'Невозможно сделать перевод для данного текста.'
 
-    def __init__(self, detect_language_api_key: str):
+    def __init__(self, detect_language_api_key: str,
+                 cache: Union[TranslationCache, None] = None,
+                 offline_detection=True,
+                 http_client: Union[HttpClient, None] = None):
         """
         :param detect_language_api_key: api-key
             для доступа к Detect Language API
+        :param cache: кэш результатов запросов (default None - без кэша)
+        :param offline_detection: определять ли язык без запросов к API,
+            если это возможно (default True)
+        :param http_client: HTTP клиент для запросов к API
+            (default None - свой клиент)
         """
         self.detect_language_api_key = detect_language_api_key
+        self.cache = cache
+        self.language_detector = \
+            LanguageDetector() if offline_detection else None
+        self.http_client = \
+            http_client if http_client is not None else HttpClient()
 
     @staticmethod
-    def dl_api_key_from_file(api_key_file_path: str) -> 'TextTranslator':
+    def dl_api_key_from_file(api_key_file_path: str,
+                             cache: Union[TranslationCache, None] = None,
+                             http_client: Union[HttpClient, None] = None) \
+            -> 'TextTranslator':
         """
         Функция инициализации класса через путь к файлу, где лежит api-key.
 
         :param api_key_file_path: путь к файлу, где лежит api-key
+        :param cache: кэш результатов запросов (default None - без кэша)
+        :param http_client: HTTP клиент для запросов к API
+            (default None - свой клиент)
         :return: TextTranslator
         """
         with open(api_key_file_path) as f:
             detect_language_api_key = f.read()
-        return TextTranslator(detect_language_api_key=detect_language_api_key)
+        return TextTranslator(detect_language_api_key=detect_language_api_key,
+                              cache=cache, http_client=http_client)
+
+    def _cached(self, kind: str, text: str, function, *args) -> str:
+        """
+        Функция получения результата запроса с использованием кэша.
+        Отрицательный результат (NothingError) тоже сохраняется
+            (на более короткий срок), а ошибки API (UndefinedError) -
+            нет.
+
+        :param kind: тип запроса для кэша
+        :param text: текст запроса
+        :param function: функция, делающая запрос к API
+        :param args: дополнительные аргументы функции
+        :return: результат запроса
+        """
+        if self.cache is None:
+            return function(text, *args)
+        value = self.cache.get(kind, text)
+        if value is None:  # уже знаем, что результата нет
+            raise self.NothingError
+        if value is not self.cache.MISS:
+            return value
+        try:
+            value = function(text, *args)
+        except self.NothingError:
+            self.cache.put(kind, text, None)
+            raise
+        self.cache.put(kind, text, value)
+        return value
 
     def __call__(self, text: str) -> str:
         """
@@ -79,6 +136,20 @@ class TextTranslator:
         return self._get_translation(text, languages)
 
     def _detect_language(self, text: str) -> str:
+        """
+        Функция определения языка (без запросов к API, если возможно,
+            иначе - с использованием кэша).
+
+        :param text: текст для определения языка
+        :return: язык текста
+        """
+        if self.language_detector is not None:
+            language = self.language_detector(text)
+            if language is not None:
+                return language
+        return self._cached('detect', text, self._get_language)
+
+    def _get_language(self, text: str) -> str:
         """
         Функция определения языка, использующая Detect Language API.
 
@@ -104,9 +175,24 @@ class TextTranslator:
         url = 'https://ws.detectlanguage.com/0.2/detect'
         headers = {'Authorization': 'Bearer ' + self.detect_language_api_key}
         json = {'q': text}
-        return requests.post(url, json=json, headers=headers)
+        try:
+            return self.http_client.post(url, json=json, headers=headers)
+        except requests.RequestException:  # невозможно соединиться
+            raise self.UndefinedError
 
     def _get_translation(self, text: str, languages: str) -> str:
+        """
+        Функция перевода (с использованием кэша).
+
+        :param text: текст для перевода
+        :param languages: с какого на какой язык
+            надо переводить (ru|en или en|ru)
+        :return: переведенный текст
+        """
+        return self._cached('translate:' + languages, text,
+                            self._get_mymemory_translation, languages)
+
+    def _get_mymemory_translation(self, text: str, languages: str) -> str:
         """
         Функция перевода, использующая MyMemory API.
 
@@ -119,14 +205,19 @@ class TextTranslator:
         response = self._get_translation_response(text, languages)
         if response.status_code != 200:  # невозможно получить ответ
             raise self.UndefinedError
+        data = response.json()
+        # ошибки (например, закончился дневной лимит) приходят с кодом 200,
+        # а их текст - вместо перевода
+        if str(data.get('responseStatus')) != '200':
+            raise self.UndefinedError
         # получаем перевод
-        matches = response.json()['matches']
+        matches = data['matches']
         if len(matches) > 0:
             return matches[0]['translation']
         raise self.NothingError  # невозможно сделать перевод
 
-    @staticmethod
-    def _get_translation_response(text: str, languages: str) -> 'Response':
+    def _get_translation_response(self, text: str,
+                                  languages: str) -> 'Response':
         """
         Функция получения ответа для перевода от MyMemory API.
 
@@ -141,4 +232,7 @@ class TextTranslator:
             'langpair': languages
         }
         req_url = url + '?' + urlencode(params)  # делаем ссылку
-        return requests.get(req_url)
+        try:
+            return self.http_client.get(req_url)
+        except requests.RequestException:  # невозможно соединиться
+            raise self.UndefinedError
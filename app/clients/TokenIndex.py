@@ -0,0 +1,366 @@
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple, Union
+import math
+import re
+import sys
+import numpy as np
+
+from app.clients.TrigramIndex import TrigramIndex
+
+
+# -----------------------------------------------------------
+# Данный класс строит обратный индекс (слово -> отсортированный массив
+# номеров строк) по текстам в нижнем регистре
+# и позволяет искать строки, содержащие все слова в любом порядке.
+# Поиск сохраняет семантику подстроки (word in text):
+# слово без пробелов может встретиться только внутри одного
+# слова текста, поэтому достаточно найти все слова словаря,
+# содержащие искомое, и объединить их списки.
+# Для ранжирования по релевантности (BM25) в индексе хранятся
+# также количество вхождений слова в каждую строку и длины строк.
+# Для поиска с опечатками (fuzzy) слово совпадает также со словами
+# словаря, в которых есть часть (между знаками препинания),
+# отличающаяся от него не больше чем на typos(слово) правок
+# (расстояние Левенштейна): кандидаты находятся по индексу
+# по триграммам частей слов словаря (строится при первом таком
+# поиске, один раз, даже если поиски идут одновременно),
+# и расстояние считается только для них.
+# Индекс можно дополнить новыми строками (extended),
+# не перестраивая его целиком.
+# -----------------------------------------------------------
+
+class TokenIndex:
+    """ Класс обратного индекса по словам. """
+
+    # разделитель слов в строке словаря (не может встретиться в слове)
+    separator = '\n'
+    # параметры BM25: насыщение частоты слова и учет длины строки
+    bm25_k1 = 1.2
+    bm25_b = 0.75
+
+    def __init__(self, texts: Iterable[str]):
+        """
+        :param texts: тексты в нижнем регистре (по одному на строку таблицы)
+        """
+        self.size = 0  # количество строк
+        # слово -> отсортированный массив номеров строк
+        self.postings: Dict[str, np.ndarray] = dict()
+        # слово -> сколько раз оно встречается в этих строках
+        self.frequencies: Dict[str, np.ndarray] = dict()
+        # количество слов в каждой строке
+        self.lengths = np.empty(0, dtype=np.int32)
+        # словарь для поиска подстрок:
+        # все слова записываются в одну строку через разделитель,
+        # а начало каждого слова запоминается в offsets
+        self.tokens: List[str] = []
+        self.offsets: List[int] = []
+        self.vocabulary = ''
+        # индекс по триграммам частей слов словаря и номера слов
+        # для каждой части (для поиска с опечатками)
+        self._fuzzy: Union[Tuple[TrigramIndex, np.ndarray], None] = None
+        self._fuzzy_lock = Lock()
+        self._add(texts)
+
+    def _add(self, texts: Iterable[str]) -> None:
+        """
+        Функция добавления новых строк в индекс.
+
+        :param texts: тексты в нижнем регистре для новых строк
+        """
+        postings = defaultdict(list)
+        frequencies = defaultdict(list)
+        lengths = []
+        for i, text in enumerate(texts, start=self.size):
+            tokens = text.split()
+            for token, count in Counter(tokens).items():
+                postings[token].append(i)
+                frequencies[token].append(count)
+            lengths.append(len(tokens))
+            self.size = i + 1
+        self.lengths = np.concatenate(
+            (self.lengths, np.array(lengths, dtype=np.int32)))
+
+        new_tokens = []
+        for token, rows in postings.items():
+            rows = np.array(rows, dtype=np.int32)
+            counts = np.minimum(frequencies[token], 65535).astype(np.uint16)
+            if token in self.postings:
+                # новые строки идут после старых - порядок сохраняется
+                rows = np.concatenate((self.postings[token], rows))
+                counts = np.concatenate((self.frequencies[token], counts))
+            else:
+                new_tokens.append(token)
+            self.postings[token] = rows
+            self.frequencies[token] = counts
+
+        # дополняем словарь новыми словами
+        if len(new_tokens) == 0:
+            return
+        offset = len(self.vocabulary) + 1 if self.tokens else 0
+        for token in new_tokens:
+            self.offsets.append(offset)
+            offset += len(token) + 1
+        vocabulary = self.separator.join(new_tokens)
+        if self.tokens:
+            vocabulary = self.vocabulary + self.separator + vocabulary
+        self.tokens.extend(new_tokens)
+        self.vocabulary = vocabulary
+
+    def extended(self, texts: Iterable[str]) -> 'TokenIndex':
+        """
+        Функция получения индекса, дополненного новыми строками.
+        Текущий индекс не изменяется: неизмененные списки строк
+            используются обоими индексами.
+
+        :param texts: тексты в нижнем регистре для новых строк
+        :return: TokenIndex
+        """
+        index = TokenIndex.__new__(TokenIndex)
+        index.size = self.size
+        index.postings = dict(self.postings)
+        index.frequencies = dict(self.frequencies)
+        index.lengths = self.lengths
+        index.tokens = list(self.tokens)
+        index.offsets = list(self.offsets)
+        index.vocabulary = self.vocabulary
+        index._fuzzy = None
+        index._fuzzy_lock = Lock()
+        index._add(texts)
+        # индекс по триграммам дополняется новыми словами, если построен
+        fuzzy = self._fuzzy
+        if fuzzy is not None:
+            parts, part_tokens = self._parts(index.tokens, len(self.tokens))
+            index._fuzzy = (fuzzy[0].extended(parts),
+                            np.concatenate((fuzzy[1], part_tokens)))
+        return index
+
+    def matching_tokens(self, word: str) -> List[str]:
+        """
+        Функция поиска всех слов словаря, содержащих данное слово.
+
+        :param word: слово для поиска (без пробелов)
+        :return: список слов словаря
+        """
+        tokens = []
+        pos = self.vocabulary.find(word)
+        while pos != -1:
+            i = bisect_right(self.offsets, pos) - 1
+            tokens.append(self.tokens[i])
+            # следующее вхождение ищем уже в следующем слове
+            if i + 1 == len(self.offsets):
+                break
+            pos = self.vocabulary.find(word, self.offsets[i + 1])
+        return tokens
+
+    @staticmethod
+    def typos(word: str) -> int:
+        """
+        Функция получения допустимого количества опечаток в слове
+            (в коротких словах опечатки не допускаются,
+            иначе похожих слов слишком много).
+
+        :param word: слово
+        :return: количество опечаток
+        """
+        if len(word) <= 3:
+            return 0
+        if len(word) <= 7:
+            return 1
+        return 2
+
+    # знаки, разделяющие части слова при поиске с опечатками
+    part_separators = re.compile(r'[\W_]+')
+
+    @classmethod
+    def _parts(cls, tokens: List[str], start: int) \
+            -> Tuple[List[str], np.ndarray]:
+        """
+        Функция разбиения слов словаря на части между знаками препинания.
+        Части обрамляются пробелами, чтобы у начала и конца части
+            были свои триграммы (пробела внутри слова не бывает).
+
+        :param tokens: слова словаря
+        :param start: с какого слова начинать
+        :return: обрамленные части и номер слова для каждой части
+        """
+        parts, part_tokens = [], []
+        for i in range(start, len(tokens)):
+            for part in cls.part_separators.split(tokens[i]):
+                if part != '':
+                    parts.append(' ' + part + ' ')
+                    part_tokens.append(i)
+        return parts, np.array(part_tokens, dtype=np.int32)
+
+    def fuzzy_tokens(self, word: str) -> List[str]:
+        """
+        Функция поиска слов словаря, содержащих данное слово
+            или часть, отличающуюся от него не больше
+            чем на typos(word) правок.
+        Слово длины n после обрамления имеет n триграмм, а одна правка
+            меняет не больше трех из них, поэтому у похожей части
+            хотя бы n - 3 * typos(word) общих разных триграмм.
+
+        :param word: слово для поиска (без пробелов)
+        :return: список слов словаря
+        """
+        tokens = self.matching_tokens(word)
+        limit = self.typos(word)
+        if limit == 0:
+            return tokens
+        padded = ' ' + word + ' '
+        trigrams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        parts, part_tokens = self._fuzzy_index()
+        candidates = parts.similar(padded, len(trigrams) - 3 * limit)
+        found = set(tokens)
+        for i in candidates:
+            token = self.tokens[part_tokens[i]]
+            if token not in found and self._within_distance(
+                    word, parts.texts[i][1:-1], limit):
+                tokens.append(token)
+                found.add(token)
+        return tokens
+
+    def _fuzzy_index(self) -> Tuple[TrigramIndex, np.ndarray]:
+        """
+        Функция получения индекса по триграммам частей слов словаря.
+        Строится при первом вызове (один раз, даже если поиски
+            с опечатками идут одновременно).
+
+        :return: (индекс по триграммам частей, номера их слов)
+        """
+        fuzzy = self._fuzzy
+        if fuzzy is not None:
+            return fuzzy
+        with self._fuzzy_lock:
+            if self._fuzzy is None:
+                parts, part_tokens = self._parts(self.tokens, 0)
+                self._fuzzy = (TrigramIndex(parts), part_tokens)
+            return self._fuzzy
+
+    @staticmethod
+    def _within_distance(first: str, second: str, limit: int) -> bool:
+        """
+        Функция проверки, что расстояние Левенштейна между словами
+            не больше limit (считается только полоса шириной 2 * limit + 1
+            и прекращается, как только превышение очевидно).
+
+        :param first: первое слово
+        :param second: второе слово
+        :param limit: максимальное расстояние
+        :return: True - слова похожи, False - нет
+        """
+        if abs(len(first) - len(second)) > limit:
+            return False
+        big = limit + 1  # "бесконечность" за пределами полосы
+        previous = list(range(len(second) + 1))
+        for i in range(1, len(first) + 1):
+            current = [big] * (len(second) + 1)
+            if i <= limit:
+                current[0] = i
+            low = max(1, i - limit)
+            high = min(len(second), i + limit)
+            for j in range(low, high + 1):
+                cost = first[i - 1] != second[j - 1]
+                current[j] = min(previous[j] + 1,
+                                 current[j - 1] + 1,
+                                 previous[j - 1] + cost)
+            if min(current[low - 1:high + 1]) > limit:
+                return False
+            previous = current
+        return previous[len(second)] <= limit
+
+    def lookup(self, word: str, fuzzy=False) -> np.ndarray:
+        """
+        Функция получения строк, текст которых содержит данное слово.
+
+        :param word: слово для поиска (без пробелов)
+        :param fuzzy: допускать ли опечатки (default False)
+        :return: отсортированный массив номеров строк
+        """
+        tokens = self.fuzzy_tokens(word) if fuzzy \
+            else self.matching_tokens(word)
+        rows = [self.postings[token] for token in tokens]
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int32)
+        if len(rows) == 1:
+            return rows[0]
+        return np.unique(np.concatenate(rows))
+
+    def search_all(self, words: List[str], fuzzy=False) -> np.ndarray:
+        """
+        Функция поиска строк, содержащих все слова в любом порядке.
+        Списки строк пересекаются, начиная с самых коротких.
+
+        :param words: список слов для поиска
+        :param fuzzy: допускать ли опечатки (default False)
+        :return: отсортированный массив номеров строк
+        """
+        if len(words) == 0:  # подходит любая строка
+            return np.arange(self.size, dtype=np.int32)
+        rows = sorted((self.lookup(word, fuzzy) for word in set(words)),
+                      key=len)
+        result = rows[0]
+        for other in rows[1:]:
+            if result.size == 0:  # уже ничего не подходит
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def mask_all(self, words: List[str], fuzzy=False) -> np.ndarray:
+        """
+        Функция - аналог функции search_all, но возвращающая маску.
+
+        :param words: список слов для поиска
+        :param fuzzy: допускать ли опечатки (default False)
+        :return: маска строк, содержащих все слова
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.search_all(words, fuzzy)] = True
+        return mask
+
+    def bm25(self, words: List[str]) -> np.ndarray:
+        """
+        Функция подсчета релевантности каждой строки по BM25.
+        Слово запроса, как и при поиске, совпадает со всеми словами
+            словаря, которые его содержат: их вхождения складываются.
+
+        :param words: список слов запроса
+        :return: массив оценок строк (0 - ни одного слова запроса)
+        """
+        scores = np.zeros(self.size)
+        if self.size == 0:
+            return scores
+        # нормировка на длину строки (одна для всех слов запроса)
+        norm = self.bm25_k1 * (1 - self.bm25_b + self.bm25_b
+                               * self.lengths / max(self.lengths.mean(), 1))
+        for word in set(words):
+            tokens = self.matching_tokens(word)
+            if len(tokens) == 0:
+                continue
+            rows = np.concatenate([self.postings[token] for token in tokens])
+            counts = np.concatenate([self.frequencies[token]
+                                     for token in tokens])
+            # сколько раз слово встречается в каждой строке
+            frequency = np.bincount(rows, weights=counts,
+                                    minlength=self.size)
+            found = np.count_nonzero(frequency)  # в скольких строках
+            idf = math.log(1 + (self.size - found + 0.5) / (found + 0.5))
+            scores += idf * frequency * (self.bm25_k1 + 1) \
+                / (frequency + norm)
+        return scores
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой индексом (приблизительно).
+
+        :return: количество байт
+        """
+        return sum(rows.nbytes for rows in self.postings.values()) \
+            + sum(counts.nbytes for counts in self.frequencies.values()) \
+            + self.lengths.nbytes \
+            + sum(sys.getsizeof(token) for token in self.tokens) \
+            + sys.getsizeof(self.vocabulary) + 8 * len(self.offsets) \
+            + (self._fuzzy[0].memory_usage() + self._fuzzy[1].nbytes
+               if self._fuzzy is not None else 0)
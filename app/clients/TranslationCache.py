@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Union
+import sqlite3
+import time
+
+
+# -----------------------------------------------------------
+# Данный класс позволяет хранить результаты запросов к API для работы
+# с языками (определение языка и перевод), чтобы не тратить
+# ограниченное количество слов в день на повторные запросы.
+# Кэш двухуровневый:
+# > в памяти процесса - последние max_entries результатов
+# > в базе SQLite на диске - все результаты (сохраняются между запусками).
+# Сохраняются и отрицательные результаты (невозможно определить язык
+# или сделать перевод) - как None, но на более короткий срок.
+# Текст приводится к нижнему регистру, лишние пробелы убираются.
+# -----------------------------------------------------------
+
+class TranslationCache:
+    """ Класс кэша результатов определения языка и перевода. """
+
+    # результат не найден в кэше
+    MISS = object()
+
+    def __init__(self, path: Union[str, None] = None,
+                 ttl=7 * 24 * 60 * 60, max_entries=1024,
+                 negative_ttl=60 * 60):
+        """
+        :param path: путь к файлу базы SQLite
+            (default None - кэш только в памяти)
+        :param ttl: сколько секунд хранится результат (default 7 дней)
+        :param max_entries: сколько результатов хранится в памяти
+            (default 1024)
+        :param negative_ttl: сколько секунд хранится
+            отрицательный результат (default 1 час)
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # (тип запроса, текст) -> (результат, время сохранения)
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' kind TEXT NOT NULL,'
+                ' text TEXT NOT NULL,'
+                ' value TEXT,'
+                ' created REAL NOT NULL,'
+                ' PRIMARY KEY (kind, text))')
+            self._db.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Функция приведения текста к виду ключа кэша.
+
+        :param text: текст
+        :return: текст в нижнем регистре, слова через один пробел
+        """
+        return ' '.join(text.lower().split())
+
+    def get(self, kind: str, text: str):
+        """
+        Функция получения сохраненного результата.
+
+        :param kind: тип запроса ('detect' или 'translate:ru|en' и т.п.)
+        :param text: текст запроса
+        :return: результат (None - отрицательный результат)
+            или MISS, если результата нет или он устарел
+        """
+        key = (kind, self.normalize(text))
+        with self._lock:
+            if key in self._memory:
+                value, created = self._memory[key]
+                if time.time() - created < self._ttl(value):
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+            if self._db is None:
+                return self.MISS
+            row = self._db.execute(
+                'SELECT value, created FROM results'
+                ' WHERE kind = ? AND text = ?', key).fetchone()
+            if row is None or time.time() - row[1] >= self._ttl(row[0]):
+                return self.MISS
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def _ttl(self, value: Union[str, None]) -> float:
+        """
+        Функция получения срока хранения результата.
+
+        :param value: результат (None - отрицательный результат)
+        :return: сколько секунд хранится результат
+        """
+        return self.negative_ttl if value is None else self.ttl
+
+    def put(self, kind: str, text: str, value: Union[str, None]) -> None:
+        """
+        Функция сохранения результата.
+
+        :param kind: тип запроса ('detect' или 'translate:ru|en' и т.п.)
+        :param text: текст запроса
+        :param value: результат (None - отрицательный результат)
+        """
+        key = (kind, self.normalize(text))
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO results'
+                    ' (kind, text, value, created) VALUES (?, ?, ?, ?)',
+                    key + (value, created))
+                self._db.commit()
+
+    def _remember(self, key, value: Union[str, None], created: float) -> None:
+        """
+        Функция сохранения результата в памяти
+            с удалением тех, к которым дольше всего не обращались.
+
+        :param key: (тип запроса, текст)
+        :param value: результат
+        :param created: время сохранения
+        """
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,330 @@
+from typing import Iterable, List, Union
+import numpy as np
+
+
+# -----------------------------------------------------------
+# Данный класс строит индекс по триграммам (подстрокам из трех символов)
+# текстов в нижнем регистре и позволяет быстро искать строки,
+# содержащие фразу целиком (phrase in text).
+# Сначала по индексу находятся строки, содержащие все триграммы фразы
+# (кандидаты), а затем для них проверяется точное вхождение фразы.
+# Индекс состоит из частей (сегментов) для подряд идущих строк,
+# каждая часть хранится в numpy-массивах:
+# отсортированные коды триграмм и для каждой из них
+# отсортированный массив номеров строк (в одном общем массиве).
+# Новые строки добавляются новой частью (extended),
+# а маленькие части объединяются, чтобы их не становилось слишком много.
+# Также можно искать строки, похожие на фразу (similar):
+# содержащие хотя бы заданное количество ее триграмм.
+# -----------------------------------------------------------
+
+class _TrigramSegment:
+    """ Класс части индекса по триграммам для подряд идущих строк. """
+
+    # разделитель текстов при построении индекса
+    separator = '\x00'
+    # примерное количество символов в одном блоке при построении индекса
+    chunk_chars = 1 << 20
+
+    def __init__(self, texts: List[str], offset: int):
+        """
+        :param texts: тексты в нижнем регистре (по одному на строку таблицы)
+        :param offset: номер первой строки части в таблице
+        """
+        self.texts = texts
+        self.offset = offset
+        self.size = len(self.texts)  # количество строк
+        # символ -> его номер в алфавите текстов
+        self.char_ids = dict()
+        self.alphabet_size = 0
+        # отсортированные коды триграмм
+        self.trigrams = np.empty(0, dtype=np.int64)
+        # начало списка строк каждой триграммы в rows
+        self.starts = np.zeros(1, dtype=np.int64)
+        # номера строк для всех триграмм подряд
+        self.rows = np.empty(0, dtype=np.int32)
+        if self.size > 0:
+            self._build()
+
+    def _build(self) -> None:
+        """
+        Функция построения индекса.
+        Тексты обрабатываются блоками, чтобы ограничить память,
+            нужную для промежуточных массивов.
+        """
+        # границы блоков строк
+        bounds = [0]
+        chars = 0
+        for i, text in enumerate(self.texts):
+            chars += len(text) + 1
+            if chars >= self.chunk_chars or i + 1 == self.size:
+                bounds.append(i + 1)
+                chars = 0
+        blocks = list(zip(bounds[:-1], bounds[1:]))
+
+        # алфавит текстов (разделитель в него не входит)
+        alphabet = np.unique(np.concatenate(
+            [np.unique(self._block_codes(begin, end))
+             for begin, end in blocks]))
+        alphabet = alphabet[alphabet != ord(self.separator)]
+        self.char_ids = {chr(code): i for i, code in enumerate(alphabet)}
+        self.alphabet_size = len(alphabet)
+
+        # пары (триграмма, строка) каждого блока без повторов
+        # (коды триграмм хранятся в int32, если помещаются в него)
+        dtype = np.int32 if self.alphabet_size ** 3 < 2 ** 31 else np.int64
+        trigrams, rows = [], []
+        for begin, end in blocks:
+            block_trigrams, block_rows = \
+                self._build_block(begin, end, alphabet)
+            trigrams.append(block_trigrams.astype(dtype))
+            rows.append(block_rows)
+        trigrams = np.concatenate(trigrams)
+        rows = np.concatenate(rows)
+
+        # сортировка по триграммам (строки остаются отсортированными)
+        order = np.argsort(trigrams, kind='stable')
+        trigrams = trigrams[order]
+        self.rows = rows[order]
+        # начало каждой новой триграммы
+        starts = np.flatnonzero(np.diff(trigrams)) + 1
+        self.trigrams = trigrams[np.append(0, starts)] \
+            if len(trigrams) > 0 else trigrams
+        self.starts = \
+            np.concatenate(([0], starts, [len(trigrams)])).astype(np.int64)
+
+    def _block_codes(self, begin: int, end: int) -> np.ndarray:
+        """
+        Функция получения кодов символов блока строк,
+            записанных через разделитель.
+
+        :param begin: номер первой строки блока
+        :param end: номер строки после последней строки блока
+        :return: массив кодов символов
+        """
+        corpus = self.separator.join(self.texts[begin:end])
+        # одиночные суррогаты (бывают в ответах API) кодируются как есть
+        data = corpus.encode('utf-32-le', 'surrogatepass')
+        return np.frombuffer(data, dtype=np.uint32)
+
+    def _build_block(self, begin: int, end: int, alphabet: np.ndarray):
+        """
+        Функция получения всех пар (триграмма, строка) для блока строк.
+
+        :param begin: номер первой строки блока
+        :param end: номер строки после последней строки блока
+        :param alphabet: отсортированные коды символов алфавита текстов
+        :return: массивы кодов триграмм и номеров строк,
+            отсортированные по триграммам, а затем по строкам
+        """
+        texts = self.texts[begin:end]
+        codes = self._block_codes(begin, end)
+        # номер каждого символа в алфавите
+        chars = np.searchsorted(alphabet, codes).astype(np.int64)
+        separators = codes == ord(self.separator)
+        if len(chars) < 3:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        # номер строки для каждого символа
+        lengths = np.fromiter((len(text) + 1 for text in texts),
+                              dtype=np.int64, count=len(texts))
+        row_of = np.repeat(np.arange(begin, end, dtype=np.int64),
+                           lengths)[:len(chars)]
+
+        # коды всех триграмм, не содержащих разделитель
+        size = self.alphabet_size
+        valid = ~(separators[:-2] | separators[1:-1] | separators[2:])
+        trigrams = \
+            ((chars[:-2] * size + chars[1:-1]) * size + chars[2:])[valid]
+        rows = row_of[:-2][valid] - begin
+
+        # сортируем пары (триграмма, строка) и убираем повторы
+        count = end - begin
+        if size ** 3 * count < 2 ** 62:
+            pairs = np.unique(trigrams * count + rows)
+            trigrams = pairs // count
+            rows = pairs % count
+        else:
+            order = np.lexsort((rows, trigrams))
+            trigrams = trigrams[order]
+            rows = rows[order]
+            new = np.ones(len(order), dtype=bool)
+            new[1:] = (trigrams[1:] != trigrams[:-1]) \
+                | (rows[1:] != rows[:-1])
+            trigrams = trigrams[new]
+            rows = rows[new]
+        return trigrams, (rows + begin).astype(np.int32)
+
+    def candidates(self, phrase: str) -> np.ndarray:
+        """
+        Функция получения строк части, содержащих все триграммы фразы.
+
+        :param phrase: фраза для поиска в нижнем регистре
+            (не короче трех символов и без разделителя)
+        :return: отсортированный массив номеров строк в таблице
+        """
+        ids = []
+        for char in phrase:
+            if char not in self.char_ids:  # символа нет ни в одном тексте
+                return np.empty(0, dtype=np.int32)
+            ids.append(self.char_ids[char])
+        size = self.alphabet_size
+        trigrams = {(ids[i] * size + ids[i + 1]) * size + ids[i + 2]
+                    for i in range(len(ids) - 2)}
+
+        # списки строк для каждой триграммы
+        postings = []
+        for trigram in trigrams:
+            i = np.searchsorted(self.trigrams, trigram)
+            if i == len(self.trigrams) or self.trigrams[i] != trigram:
+                return np.empty(0, dtype=np.int32)
+            postings.append(self.rows[self.starts[i]:self.starts[i + 1]])
+        # пересекаем, начиная с самых коротких
+        postings.sort(key=len)
+        result = postings[0]
+        for other in postings[1:]:
+            if result.size == 0:  # уже ничего не подходит
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result + self.offset
+
+    def shared(self, phrase: str):
+        """
+        Функция подсчета, сколько разных триграмм фразы
+            содержит каждая строка части.
+
+        :param phrase: фраза в нижнем регистре (без разделителя)
+        :return: массивы номеров строк в таблице (отсортированный)
+            и количества триграмм фразы в них
+        """
+        ids = [self.char_ids.get(char) for char in phrase]
+        size = self.alphabet_size
+        # триграммы с символами не из алфавита ни в одной строке нет
+        trigrams = {(ids[i] * size + ids[i + 1]) * size + ids[i + 2]
+                    for i in range(len(ids) - 2)
+                    if None not in ids[i:i + 3]}
+        postings = []
+        for trigram in trigrams:
+            i = np.searchsorted(self.trigrams, trigram)
+            if i < len(self.trigrams) and self.trigrams[i] == trigram:
+                postings.append(
+                    self.rows[self.starts[i]:self.starts[i + 1]])
+        if len(postings) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        rows, counts = np.unique(np.concatenate(postings),
+                                 return_counts=True)
+        return rows + self.offset, counts
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой массивами части индекса.
+
+        :return: количество байт
+        """
+        return self.trigrams.nbytes + self.starts.nbytes + self.rows.nbytes
+
+
+class TrigramIndex:
+    """ Класс индекса по триграммам. """
+
+    def __init__(self, texts: Iterable[str]):
+        """
+        :param texts: тексты в нижнем регистре (по одному на строку таблицы)
+        """
+        self.texts = list(texts)
+        self.size = len(self.texts)  # количество строк
+        # части индекса
+        self.segments = [_TrigramSegment(self.texts, 0)]
+
+    def extended(self, texts: Iterable[str]) -> 'TrigramIndex':
+        """
+        Функция получения индекса, дополненного новыми строками.
+        Текущий индекс не изменяется: его части используются обоими индексами.
+        Последние части объединяются, пока предпоследняя
+            не станет хотя бы вдвое больше последней.
+
+        :param texts: тексты в нижнем регистре для новых строк
+        :return: TrigramIndex
+        """
+        index = TrigramIndex.__new__(TrigramIndex)
+        index.texts = self.texts + list(texts)
+        index.size = len(index.texts)
+        segments = list(self.segments)
+        offset = self.size
+        size = index.size - self.size
+        if size == 0:  # нечего добавлять
+            index.segments = segments
+            return index
+        while segments and segments[-1].size < 2 * size:
+            offset = segments.pop().offset
+            size = index.size - offset
+        segments.append(_TrigramSegment(index.texts[offset:], offset))
+        index.segments = segments
+        return index
+
+    def candidates(self, phrase: str) -> Union[np.ndarray, None]:
+        """
+        Функция получения строк, содержащих все триграммы фразы.
+
+        :param phrase: фраза для поиска в нижнем регистре
+        :return: отсортированный массив номеров строк
+            или None, если фраза слишком короткая для поиска по индексу
+        """
+        if len(phrase) < 3 or _TrigramSegment.separator in phrase:
+            return None
+        return np.concatenate([segment.candidates(phrase)
+                               for segment in self.segments])
+
+    def search(self, phrase: str) -> Union[np.ndarray, None]:
+        """
+        Функция поиска строк, содержащих фразу целиком.
+
+        :param phrase: фраза для поиска в нижнем регистре
+        :return: отсортированный массив номеров строк
+            или None, если фраза слишком короткая для поиска по индексу
+        """
+        candidates = self.candidates(phrase)
+        if candidates is None:
+            return None
+        # проверка точного вхождения для кандидатов
+        return np.array([i for i in candidates if phrase in self.texts[i]],
+                        dtype=np.int32)
+
+    def mask(self, phrase: str) -> Union[np.ndarray, None]:
+        """
+        Функция - аналог функции search, но возвращающая маску.
+
+        :param phrase: фраза для поиска в нижнем регистре
+        :return: маска строк, содержащих фразу,
+            или None, если фраза слишком короткая для поиска по индексу
+        """
+        rows = self.search(phrase)
+        if rows is None:
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def similar(self, phrase: str, min_shared: int) -> np.ndarray:
+        """
+        Функция поиска строк, похожих на фразу:
+            содержащих хотя бы min_shared разных триграмм фразы.
+
+        :param phrase: фраза в нижнем регистре
+        :param min_shared: сколько триграмм фразы должно быть в строке
+        :return: отсортированный массив номеров строк
+        """
+        if _TrigramSegment.separator in phrase:
+            return np.empty(0, dtype=np.int32)
+        found = []
+        for segment in self.segments:
+            rows, counts = segment.shared(phrase)
+            found.append(rows[counts >= min_shared])
+        return np.concatenate(found)
+
+    def memory_usage(self) -> int:
+        """
+        Функция подсчета памяти, занимаемой массивами индекса.
+
+        :return: количество байт
+        """
+        return sum(segment.memory_usage() for segment in self.segments)
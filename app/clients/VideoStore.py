@@ -0,0 +1,170 @@
+from threading import Lock
+from typing import Dict, Iterable, List, Union
+import hashlib
+import sys
+import weakref
+
+
+# -----------------------------------------------------------
+# Данный класс хранит общие для всего процесса записи о видео
+# (Video) по id видео (resourceId.videoId):
+# у каналов с курсами одни и те же видео лежат в нескольких
+# пересекающихся плейлистах ("все лекции", "группа 1", ...),
+# и таблицы этих плейлистов ссылаются на одну запись,
+# а не хранят свою копию названия.
+# В записи хранятся также названия и описания в нижнем регистре
+# (строятся при первом поиске по ним), поэтому при поиске по нескольким
+# плейлистам текст каждого видео приводится к нижнему регистру один раз.
+# Записи хранятся по слабым ссылкам: запись удаляется,
+# когда видео нет ни в одной таблице.
+# Если название или описание видео изменилось, то создается
+# новая запись (таблицы со старыми данными ссылаются на старую);
+# описание сравнивается по криптографическому хэшу (blake2b),
+# чтобы разные описания с одинаковым hash() не считались одним.
+# -----------------------------------------------------------
+
+class VideoStore:
+    """ Класс общего хранилища записей о видео. """
+
+    class Video:
+        """ Класс записи о видео. """
+
+        __slots__ = ('video_id', 'title', 'description_digest',
+                     '_title_lower', '_text_lower', '__weakref__')
+
+        def __init__(self, video_id: str, title: str, description: str):
+            """
+            :param video_id: id видео
+            :param title: название видео
+            :param description: описание видео (хранится только его хэш,
+                а само описание - в сжатом хранилище таблицы)
+            """
+            self.video_id = video_id
+            self.title = title
+            self.description_digest = self.digest(description)
+            self._title_lower: Union[str, None] = None
+            self._text_lower: Union[str, None] = None
+
+        def same(self, title: str, description: str) -> bool:
+            """
+            Функция проверки, что данные видео не изменились.
+
+            :param title: название видео
+            :param description: описание видео
+            :return: True - название и описание те же
+            """
+            return self.title == title \
+                and self.description_digest == self.digest(description)
+
+        @staticmethod
+        def digest(description: str) -> bytes:
+            """
+            Функция получения хэша описания.
+
+            :param description: описание видео
+            :return: 16 байт хэша blake2b
+            """
+            return hashlib.blake2b(
+                description.encode('utf-8', 'surrogatepass'),
+                digest_size=16).digest()
+
+        @property
+        def title_lower(self) -> str:
+            """ Название в нижнем регистре (строится один раз). """
+            if self._title_lower is None:
+                self._title_lower = self.title.lower()
+            return self._title_lower
+
+        @property
+        def has_text(self) -> bool:
+            """ Построены ли уже название и описание в нижнем регистре. """
+            return self._text_lower is not None
+
+        def text_lower(self, description: Union[str, None]) -> str:
+            """
+            Функция получения названия и описания в нижнем регистре
+                (строится один раз).
+
+            :param description: описание видео
+                (может быть None, если текст уже построен)
+            :return: название и описание через "###"
+            """
+            if self._text_lower is None:
+                self._text_lower = \
+                    self.title_lower + "###" + description.lower()
+            return self._text_lower
+
+        def memory_usage(self, texts=False) -> int:
+            """
+            Функция подсчета памяти, занимаемой записью.
+
+            :param texts: считать ли тексты в нижнем регистре
+                (default False - их считают колонки снимков плейлистов)
+            :return: количество байт
+            """
+            memory = sys.getsizeof(self) + sys.getsizeof(self.video_id) \
+                + sys.getsizeof(self.title) \
+                + sys.getsizeof(self.description_digest)
+            if texts:
+                for text in (self._title_lower, self._text_lower):
+                    if text is not None and text is not self.title:
+                        memory += sys.getsizeof(text)
+            return memory
+
+    def __init__(self):
+        # id видео -> запись (пока видео есть хотя бы в одной таблице)
+        self._videos = weakref.WeakValueDictionary()
+        self._lock = Lock()
+        self.created = 0  # сколько записей создано
+        self.reused = 0  # сколько раз использована уже созданная запись
+
+    def videos(self, video_ids: Iterable[str], titles: Iterable[str],
+               descriptions: Iterable[str]) -> List['VideoStore.Video']:
+        """
+        Функция получения записей о видео: для уже известных видео
+            с теми же данными возвращаются их записи, для остальных -
+            создаются новые.
+
+        :param video_ids: id видео
+        :param titles: названия видео
+        :param descriptions: описания видео
+        :return: записи в том же порядке
+        """
+        videos = []
+        with self._lock:
+            for video_id, title, description in zip(video_ids, titles,
+                                                    descriptions):
+                video = self._videos.get(video_id)
+                if video is not None and video.same(title, description):
+                    self.reused += 1
+                else:
+                    video = self.Video(video_id, title, description)
+                    self._videos[video_id] = video
+                    self.created += 1
+                videos.append(video)
+        return videos
+
+    def __len__(self) -> int:
+        return len(self._videos)
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Функция получения статистики хранилища.
+
+        :return: словарь dict(
+                'videos' : сколько записей хранится сейчас,
+                'created' : сколько записей создано,
+                'reused' : сколько раз использована уже созданная запись,
+                'memory' : сколько байт занимают записи
+            )
+        """
+        with self._lock:
+            videos = list(self._videos.values())
+            created, reused = self.created, self.reused
+        return {
+            'videos': len(videos),
+            'created': created,
+            'reused': reused,
+            'memory': sum(video.memory_usage(texts=True)
+                          for video in videos)
+        }
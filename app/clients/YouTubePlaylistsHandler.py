@@ -1,18 +1,30 @@
 from urllib.parse import urlencode
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from queue import Queue, Full
+from threading import Event, Lock, Thread
 import requests
-import pandas as pd
-from typing import Dict
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Tuple, Union
 import googleapiclient.discovery
 import google.oauth2.credentials
-from flask import session
 import os
 
+from app.clients.HttpClient import HttpClient
+from app.clients.PlaylistCache import PlaylistCache
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.QuotaLedger import QuotaLedger
+from app.clients.SingleFlight import SingleFlight
+from app.clients.VideoStore import VideoStore
+
 
 # -----------------------------------------------------------
 # Данный класс позволяет получать основную информацию о каждом видео
-# из неприватного плейлиста YouTube в формате pd.DataFrame:
-# номер видео в плейлисте, ссылку на видео, ссылку на изображение превью видео,
-# название видео, описание видео, ник автора видео.
+# из неприватного плейлиста YouTube в формате PlaylistTable:
+# номер видео в плейлисте, id видео (по нему строятся ссылки на видео
+# и на изображение превью видео), название видео, описание видео,
+# id канала и ник автора видео.
 # Класс использует один API сервис:
 # YouTube Data API v3
 # (https://developers.google.com/youtube/v3/getting-started)
@@ -22,6 +34,23 @@ import os
 # (https://developers.google.com/youtube/v3/docs/playlists)
 # (Бесплатное использование c ограничениями 10,000 запросов в день.
 # Доступ по api-key.)
+# Загруженные страницы плейлиста могут храниться в PlaylistCache,
+# чтобы не тратить запросы на повторные загрузки,
+# а плейлисты, в которые видео добавляются только в конец,
+# можно дополнять, загружая только измененные страницы (update).
+# Запросы к API делаются через общий HttpClient.
+# Страницы загружаются в отдельном потоке, пока уже загруженные
+# страницы разбираются (_iter_pages), а видео можно получать
+# по мере загрузки страниц (stream).
+# Одновременные загрузки одного плейлиста объединяются в одну
+# (в том числе с дополнением этого плейлиста).
+# Можно искать сразу по всем плейлистам канала (channel): они
+# загружаются параллельно, а видео из нескольких плейлистов
+# попадают в таблицу один раз со списком плейлистов и номеров в них.
+# Расход квоты учитывается в QuotaLedger, и загрузка не начинается
+# (или прерывается после первой страницы), если квоты на нее не хватит.
+# Видео хранятся в общем VideoStore: таблицы плейлистов с одними
+# и теми же видео ссылаются на одни записи о них.
 # -----------------------------------------------------------
 
 class YouTubePlaylistsHandler:
@@ -45,6 +74,32 @@ class YouTubePlaylistsHandler:
             ' проверьте свой api-key,' \
             ' попробуйте повторить свои действия или подождать.'
 
+    @staticmethod
+    def is_channel(url_or_id: str) -> bool:
+        """
+        Функция проверки, что дана ссылка или id канала, а не плейлиста.
+
+        :param url_or_id: ссылка или id
+        :return: True - канал, False - плейлист
+        """
+        return '/channel/' in url_or_id \
+            or (url_or_id.startswith('UC') and len(url_or_id) == 24)
+
+    @staticmethod
+    def get_channel_id(channel_url_or_id: str) -> str:
+        """
+        Функция получения id канала по ссылке
+            (https://www.youtube.com/channel/<id>).
+
+        :param channel_url_or_id: ссылка или id канала
+        :return: id канала
+        """
+        channel_id = channel_url_or_id
+        if '/channel/' in channel_url_or_id:
+            channel_id = channel_url_or_id.split('/channel/')[-1]
+            channel_id = channel_id.split('/')[0].split('?')[0]
+        return channel_id
+
     @staticmethod
     def get_playlist_id(playlist_url_or_id: str) -> str:
         """
@@ -58,24 +113,54 @@ class YouTubePlaylistsHandler:
             playlist_id = playlist_url_or_id.split('=')[-1]
         return playlist_id
 
-    def __init__(self, youtube_api_key: str, client_secret=None):
+    def __init__(self, youtube_api_key: str, client_secret=None,
+                 cache: Union[PlaylistCache, None] = None,
+                 http_client: Union[HttpClient, None] = None,
+                 quota: Union[QuotaLedger, None] = None,
+                 video_store: Union[VideoStore, None] = None):
         """
         :param youtube_api_key: api-key для доступа к YouTube Data API v3
         :param client_secret: путь к файлу, где лежит client_secret для OAuth
+        :param cache: кэш загруженных плейлистов (default None - без кэша)
+        :param http_client: HTTP клиент для запросов к API
+            (default None - свой клиент)
+        :param quota: учет расхода квоты API (default None - без учета)
+        :param video_store: общее хранилище записей о видео
+            (default None - свое хранилище)
         """
         self.youtube_api_key = youtube_api_key
         self.client_secret = client_secret
-        self.df_searcher = None  # класс для поиска по плейлисту
-        self.work_playlist_id = None  # id плейлиста с которым работает класс
+        self.cache = cache
+        self.quota = quota
+        self.http_client = \
+            http_client if http_client is not None else HttpClient()
+        self.video_store = \
+            video_store if video_store is not None else VideoStore()
+        # классы для работы с запросами OAuth для каждого пользователя
+        # (учетные данные -> (класс, блокировка))
+        self._oauth_services = OrderedDict()
+        self._oauth_services_lock = Lock()
+        # одновременные загрузки одного плейлиста (без OAuth)
+        self.single_flight = SingleFlight()
 
     @staticmethod
-    def yt_api_key_from_file(api_key_file_path: str, client_secret=None) \
+    def yt_api_key_from_file(api_key_file_path: str, client_secret=None,
+                             cache: Union[PlaylistCache, None] = None,
+                             http_client: Union[HttpClient, None] = None,
+                             quota: Union[QuotaLedger, None] = None,
+                             video_store: Union[VideoStore, None] = None) \
             -> 'YouTubePlaylistsHandler':
         """
         Функция инициализации класса через путь к файлу, где лежит api-key.
 
         :param api_key_file_path: путь к файлу, где лежит api-key
         :param client_secret: путь к файлу, где лежит client_secret для OAuth
+        :param cache: кэш загруженных плейлистов (default None - без кэша)
+        :param http_client: HTTP клиент для запросов к API
+            (default None - свой клиент)
+        :param quota: учет расхода квоты API (default None - без учета)
+        :param video_store: общее хранилище записей о видео
+            (default None - свое хранилище)
         :return: YouTubePlaylistsHandler
         """
         with open(api_key_file_path) as f:
@@ -83,43 +168,287 @@ class YouTubePlaylistsHandler:
         if client_secret is not None and not os.path.exists(client_secret):
             client_secret = None
         return YouTubePlaylistsHandler(youtube_api_key=youtube_api_key,
-                                       client_secret=client_secret)
+                                       client_secret=client_secret,
+                                       cache=cache,
+                                       http_client=http_client,
+                                       quota=quota,
+                                       video_store=video_store)
 
-    def __call__(self, playlist_url_or_id: str, oauth=False) -> pd.DataFrame:
+    def __call__(self, playlist_url_or_id: str,
+                 credentials: Union[Dict, None] = None,
+                 force_refresh=False) -> PlaylistTable:
         """
         Основная функция получения информации о видео в плейлисте.
 
         :param playlist_url_or_id:  ссылка или id плейлиста
-        :param oauth: авторизирован ли пользователь (default False)
-        :return: pd.DataFrame с основной информацией,
-            о каждом видео из плейлиста:
-            'ind' - номера видео в плейлисте
-            'url' - ссылки на видео
-            'img_url' - ссылки на изображения превью видео
-            'title' - названия видео
-            'description' - описания видео
-            'author_url' - ссылки на авторов видео
-            'author' - ники авторов видео
+        :param credentials: учетные данные OAuth из сеанса пользователя,
+            если он авторизован (default None - не авторизован)
+        :param force_refresh: надо ли загрузить плейлист заново,
+            не используя кэш (default False)
+        :return: PlaylistTable с основной информацией,
+            о каждом видео из плейлиста (строки - как в PlaylistTable.row)
         """
         # получение id плейлиста
         playlist_id = self.get_playlist_id(playlist_url_or_id)
-        if oauth:
+        if credentials is not None:
             # пользователь авторизован
-            data_frame = self._oauth_get_all_data_frame(playlist_id)
+            table = self._oauth_get_all_table(playlist_id, credentials)
         else:
             # пользователь не авторизован
-            self._check_playlist(playlist_id)  # проверка доступности плейлиста
-            data_frame = self._get_all_data_frame(playlist_id)
-        # обновляем id плейлиста, с которым работает класс
-        self.work_playlist_id = playlist_id
-        # таблица pd.DataFrame с информации о видео в плейлисте
-        return data_frame
+            table = self._get_all_table(playlist_id, force_refresh)
+        # таблица PlaylistTable с информации о видео в плейлисте
+        return table
 
-    def _check_playlist(self, playlist_id: str) -> None:
+    def stream(self, playlist_url_or_id: str, force_refresh=False,
+               progress: Union[Callable[[int, int], None], None] = None,
+               background=False) -> Iterator[PlaylistTable]:
+        """
+        Функция - аналог функции __call__ (без OAuth),
+            но возвращающая видео по мере загрузки страниц плейлиста.
+
+        :param playlist_url_or_id:  ссылка или id плейлиста
+        :param force_refresh: надо ли загрузить плейлист заново,
+            не используя кэш (default False)
+        :param progress: функция, которая вызывается после каждой страницы
+            с количеством загруженных страниц
+            и количеством видео в плейлисте (default None)
+        :param background: фоновая ли загрузка - ей недоступен
+            резерв квоты для загрузок пользователей (default False)
+        :return: итератор таблиц PlaylistTable (как в __call__)
+            с видео с каждой страницы плейлиста по порядку
+        """
+        playlist_id = self.get_playlist_id(playlist_url_or_id)
+        curr = 0  # текущий номер в плейлисте
+        pages = 0  # сколько страниц загружено
+        for page in self._shared_pages(playlist_id, force_refresh,
+                                       background):
+            info = self._create_info()
+            info['curr'] = curr
+            self._get_info(info, page['data'])
+            curr = info['curr']
+            pages += 1
+            if progress is not None:
+                progress(pages,
+                         page['data']['pageInfo']['totalResults'])
+            yield self._info_to_table(info)
+
+    def update(self, playlist_url_or_id: str,
+               df_searcher: 'DataFrameSearcher', background=False) -> bool:
+        """
+        Функция дополнения уже загруженного плейлиста новыми видео.
+        Сохраненные в кэше страницы сравниваются с pageInfo.totalResults,
+            первой и последней страницей плейлиста,
+            и загружаются только новые видео в конце плейлиста.
+        Если плейлист изменился не только в конце, то он загружается
+            заново в кэш (или его страницы берутся из уже идущей загрузки).
+
+        :param playlist_url_or_id: ссылка или id плейлиста
+        :param df_searcher: класс для поиска по этому плейлисту,
+            построенный по сохраненным в кэше данным
+        :param background: фоновая ли загрузка - ей недоступен
+            резерв квоты для загрузок пользователей (default False)
+        :return: True - df_searcher дополнен новыми видео,
+            False - плейлист изменился не только в конце
+            (или нет сохраненных данных) и его надо загрузить заново
+            (из кэша, если он уже загружен заново)
+        """
+        if self.cache is None:
+            return False
+        playlist_id = self.get_playlist_id(playlist_url_or_id)
+        entry = self.cache.get(playlist_id)
+        if entry is None:
+            return False
+        old_pages = entry['pages']
+        # df_searcher должен быть построен по сохраненным данным
+        if df_searcher.table is None \
+                or len(df_searcher.table) != self._count_videos(old_pages):
+            return False
+        if self.cache.is_fresh(entry):  # данные свежие
+            return True
+
+        # страницы дополняются (и сохраняются в кэш) общей загрузкой,
+        # поэтому одновременные загрузки плейлиста не загружают их еще раз
+        pages = list(self._shared_pages(playlist_id, background=background,
+                                        sync=True))
+        # плейлист изменился не только в конце
+        if len(pages) < len(old_pages) \
+                or not all(self._is_prefix(old_page, page)
+                           for old_page, page in zip(old_pages, pages)):
+            return False
+
+        info = self._create_info()
+        # продолжаем нумерацию видео в плейлисте
+        info['curr'] = sum(len(page['data']['items']) for page in old_pages)
+        # новые видео на последней сохраненной странице
+        old_items = old_pages[-1]['data']['items']
+        last_items = pages[len(old_pages) - 1]['data']['items']
+        self._get_info(info, {'items': last_items[len(old_items):]})
+        # новые страницы
+        for page in pages[len(old_pages):]:
+            self._get_info(info, page['data'])
+
+        if len(info['indexes']) > 0:
+            df_searcher.append(self._info_to_table(info))
+        return True
+
+    # сколько плейлистов канала загружается одновременно
+    channel_workers = 4
+
+    def channel(self, channel_url_or_id: str, force_refresh=False,
+                progress: Union[Callable[[int, int], None], None] = None,
+                background=False) -> PlaylistTable:
+        """
+        Функция получения информации о видео во всех плейлистах канала.
+        Плейлисты загружаются параллельно (не больше channel_workers
+            одновременно), видео из нескольких плейлистов
+            попадают в таблицу один раз.
+        Если какой-то плейлист не загрузился (кроме пустых и удаленных),
+            то остальные не начинают загружаться, а ошибка
+            возвращается сразу.
+
+        :param channel_url_or_id: ссылка или id канала
+        :param force_refresh: надо ли загрузить плейлисты заново,
+            не используя кэш (default False)
+        :param progress: функция, которая вызывается после каждого
+            плейлиста с количеством загруженных страниц
+            и количеством страниц во всех плейлистах (default None)
+        :param background: фоновая ли загрузка - ей недоступен
+            резерв квоты для загрузок пользователей (default False)
+        :return: PlaylistTable (как в __call__) с дополнительными
+            колонками (PlaylistTable.extra):
+            'playlist_id' - id первого плейлиста с видео
+                ('ind' - номер видео в нем)
+            'sources' - все плейлисты с видео:
+                список (id плейлиста, название плейлиста, номер видео)
+        """
+        channel_id = self.get_channel_id(channel_url_or_id)
+        playlists = self._get_channel_playlists(channel_id, background)
+        total_pages = sum(self._count_pages(playlist['videos'])
+                          for playlist in playlists)
+        pages = 0  # сколько страниц загружено
+
+        def load(playlist_id: str) -> Union[PlaylistTable, None]:
+            """ Загрузка плейлиста (None - плейлист недоступен). """
+            try:
+                return self._get_all_table(playlist_id, force_refresh,
+                                           background)
+            except self.CannotGetError:  # пустой или удаленный плейлист
+                return None
+
+        tables = [None] * len(playlists)
+        executor = ThreadPoolExecutor(max_workers=self.channel_workers,
+                                      thread_name_prefix='channel')
+        # задача загрузки -> номер плейлиста на канале
+        futures = {executor.submit(load, playlist['id']): i
+                   for i, playlist in enumerate(playlists)}
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                tables[i] = future.result()
+                pages += self._count_pages(playlists[i]['videos'])
+                if progress is not None:
+                    progress(pages, total_pages)
+        except Exception:
+            # канал все равно не загрузится: еще не начатые загрузки
+            # отменяются, чтобы не тратить на них квоту,
+            # а ошибка возвращается сразу, не дожидаясь идущих
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        # плейлисты собираются по порядку на канале
+        return self._merge_playlists(playlists, tables)
+
+    def _get_channel_playlists(self, channel_id: str,
+                               background=False) -> List[Dict]:
+        """
+        Функция получения списка плейлистов канала с помощью Playlists.
+
+        :param channel_id: id канала
+        :param background: фоновая ли загрузка (default False)
+        :return: список словарей dict(
+                'id' : id плейлиста,
+                'title' : название плейлиста,
+                'videos' : количество видео в плейлисте
+            )
+        """
+        url = 'https://www.googleapis.com/youtube/v3/playlists'
+        params = {
+            'channelId': channel_id,
+            'part': 'snippet, contentDetails',
+            'maxResults': 50,
+            'key': self.youtube_api_key
+        }
+        playlists = []
+        with self._reserve_quota(background) as reservation:
+            while True:
+                self._check_quota(1, reservation)
+                req_url = url + '?' + urlencode(params)  # делаем ссылку
+                try:
+                    response = self.http_client.get(req_url)
+                except requests.RequestException:  # невозможно соединиться
+                    raise self.UndefinedError
+                self._spend_quota('playlists', reservation)
+                if response.status_code in self.http_client.retry_statuses:
+                    raise self.UndefinedError
+                if response.status_code != 200:  # невозможно получить доступ
+                    raise self.CannotGetError
+                data = response.json()
+                for item in data['items']:
+                    playlists.append({
+                        'id': item['id'],
+                        'title': item['snippet']['title'],
+                        'videos': item['contentDetails']['itemCount']
+                    })
+                if 'nextPageToken' not in data:
+                    break
+                params['pageToken'] = data['nextPageToken']
+        # у канала нет неприватных плейлистов
+        if len(playlists) == 0:
+            raise self.CannotGetError
+        return playlists
+
+    @staticmethod
+    def _merge_playlists(playlists: List[Dict],
+                         tables: List[Union[PlaylistTable, None]]) \
+            -> PlaylistTable:
+        """
+        Функция объединения плейлистов канала в одну таблицу:
+            видео, которое есть в нескольких плейлистах,
+            остается только в первом из них, но помнит все.
+
+        :param playlists: плейлисты канала (как в _get_channel_playlists)
+        :param tables: таблицы плейлистов
+            (None - плейлист недоступен)
+        :return: PlaylistTable (как в channel)
+        """
+        parts = []
+        sources = dict()  # id видео -> плейлисты с видео
+        for playlist, table in zip(playlists, tables):
+            if table is None or table.empty:
+                continue
+            first = []  # встречается ли видео впервые
+            for video, ind in zip(table.videos, table.ind.tolist()):
+                first.append(video.video_id not in sources)
+                sources.setdefault(video.video_id, []).append(
+                    (playlist['id'], playlist['title'], ind))
+            part = table.take(np.array(first, dtype=bool))
+            parts.append(part.with_column('playlist_id',
+                                          [playlist['id']] * len(part)))
+        if len(parts) == 0:  # во всех плейлистах нет видео
+            raise YouTubePlaylistsHandler.CannotGetError
+        merged = PlaylistTable.concat(parts)
+        return merged.with_column('sources',
+                                  [sources[video.video_id]
+                                   for video in merged.videos])
+
+    def _check_playlist(self, playlist_id: str,
+                        reservation: Union[QuotaLedger.Reservation,
+                                           None] = None) -> None:
         """
         Проверка доступности плейлиста с помощью Playlists.
 
         :param playlist_id: id плейлиста
+        :param reservation: резерв квоты загрузки (default None)
         :return вызывает ошибку, если плейлист недоступен
         """
         url = 'https://www.googleapis.com/youtube/v3/playlists'
@@ -129,43 +458,445 @@ class YouTubePlaylistsHandler:
             'key': self.youtube_api_key
         }
         req_url = url + '?' + urlencode(params)  # делаем ссылку
-        response = requests.get(req_url)
+        try:
+            response = self.http_client.get(req_url)
+        except requests.RequestException:  # невозможно соединиться
+            raise self.UndefinedError
+        self._spend_quota('playlists', reservation)
+        # API недоступен (даже после повторов)
+        if response.status_code in self.http_client.retry_statuses:
+            raise self.UndefinedError
         # невозможно получить доступ
         if response.status_code != 200 \
                 or response.json()['pageInfo']['totalResults'] == 0:
             raise self.CannotGetError
 
-    def _get_all_data_frame(self, playlist_id: str) -> pd.DataFrame:
+    def _get_all_table(self, playlist_id: str,
+                       force_refresh=False,
+                       background=False) -> PlaylistTable:
         """
         Функция получения основной информации
-            о каждом видео из плейлиста в формате pd.DataFrame.
+            о каждом видео из плейлиста в формате PlaylistTable.
 
         :param playlist_id: id плейлиста
-        :return: pd.DataFrame с основной информацией,
+        :param force_refresh: надо ли загрузить плейлист заново,
+            не используя кэш (default False)
+        :param background: фоновая ли загрузка (default False)
+        :return: PlaylistTable с основной информацией,
             о каждом видео из плейлиста
         """
-        status_ok = True
         # создаем словарь информации
         info = self._create_info()
-        # получение первой страницы
-        response = self._get_page_response(playlist_id)
-        # сбор информации с первой страницы
-        status_ok &= self._get_info(info, response)
-
-        # проход по всем страницами плейлиста
-        while 'nextPageToken' in response.json():
-            # получение номера следующей страницы
-            page_token = response.json()['nextPageToken']
-            response = self._get_page_response(playlist_id, page_token)
-            status_ok &= self._get_info(info, response)
-
-        if not status_ok:  # что-то пошло не так
+        # сбор информации со страниц по мере их загрузки
+        for page in self._shared_pages(playlist_id, force_refresh,
+                                       background):
+            self._get_info(info, page['data'])
+        # получаем таблицу PlaylistTable
+        return self._info_to_table(info)
+
+    def _shared_pages(self, playlist_id: str, force_refresh=False,
+                      background=False, sync=False) -> Iterator[Dict]:
+        """
+        Функция получения всех страниц плейлиста по мере их загрузки,
+            общих для одновременных загрузок этого плейлиста
+            (stream, __call__, плейлисты канала и фоновые загрузки):
+            страницы загружаются один раз (_load_pages),
+            а присоединившиеся загрузки получают их из нее.
+        Загрузка заново (force_refresh) не присоединяется к загрузке,
+            которая может взять страницы из кэша (и наоборот),
+            а загрузка пользователя, присоединившаяся к фоновой,
+            делает ее загрузкой пользователя (_promote_load).
+        Дополнение плейлиста (update) - такая же загрузка:
+            к нему присоединяются загрузки плейлиста, и наоборот.
+
+        :param playlist_id: id плейлиста
+        :param force_refresh: надо ли загрузить плейлист заново,
+            не используя кэш (default False)
+        :param background: фоновая ли загрузка (default False)
+        :param sync: дополнить ли сохраненные в кэше страницы
+            (_sync_load_pages), если загрузка еще не идет (default False)
+        :return: итератор страниц (как в _iter_pages)
+        """
+        load = {'background': background, 'reservation': None}
+        function = self._sync_load_pages if sync else self._load_pages
+        return self.single_flight.stream(
+            (playlist_id, force_refresh), function,
+            playlist_id, force_refresh, load,
+            join=None if background else self._promote_load)
+
+    def promote(self, playlist_url_or_id: str, force_refresh=False) -> bool:
+        """
+        Функция повышения уже идущей фоновой загрузки плейлиста
+            до загрузки пользователя (например, если пользователь
+            ждет фоновую задачу загрузки).
+
+        :param playlist_url_or_id: ссылка или id плейлиста
+        :param force_refresh: загружается ли плейлист заново
+            (default False)
+        :return: True - загрузка плейлиста идет
+        """
+        playlist_id = self.get_playlist_id(playlist_url_or_id)
+        return self.single_flight.join((playlist_id, force_refresh),
+                                       self._promote_load)
+
+    @staticmethod
+    def _promote_load(playlist_id: str, force_refresh: bool,
+                      load: Dict) -> None:
+        """
+        Функция повышения фоновой загрузки до загрузки пользователя:
+            ее резерву квоты становится доступен резерв
+            для загрузок пользователей.
+
+        :param playlist_id: id плейлиста
+        :param force_refresh: загружается ли плейлист заново
+        :param load: состояние загрузки dict(
+                'background' : фоновая ли загрузка,
+                'reservation' : ее резерв квоты (None - еще не создан)
+            )
+        """
+        load['background'] = False
+        reservation = load['reservation']
+        if reservation is not None:
+            reservation.background = False
+
+    def _load_pages(self, playlist_id: str, force_refresh: bool,
+                    load: Dict) -> Iterator[Dict]:
+        """
+        Функция получения всех страниц плейлиста по мере их загрузки
+            (из кэша, если данные свежие).
+        Загруженные страницы сохраняются в кэш после последней страницы.
+
+        :param playlist_id: id плейлиста
+        :param force_refresh: надо ли загрузить плейлист заново,
+            не используя кэш
+        :param load: состояние загрузки (как в _promote_load)
+        :return: итератор страниц (как в _iter_pages)
+        """
+        entry = None
+        if self.cache is not None and not force_refresh:
+            entry = self.cache.get(playlist_id)
+
+        if entry is not None and self.cache.is_fresh(entry):
+            # данные свежие - запросы к API не нужны
+            yield from entry['pages']
+            return
+        # квота резервируется за загрузкой до ее конца
+        with self._load_quota(load) as reservation:
+            if entry is None:
+                # хватит ли квоты на проверку и первую страницу
+                self._check_quota(2, reservation)
+                # проверка доступности плейлиста
+                self._check_playlist(playlist_id, reservation)
+            else:
+                # хватит ли квоты на перепроверку сохраненных страниц
+                self._check_quota(len(entry['pages']), reservation)
+
+            def check_rest(first_page: Dict) -> None:
+                """ Проверка, хватит ли квоты на остальные страницы. """
+                total = first_page['data']['pageInfo']['totalResults']
+                self._check_quota(self._count_pages(total) - 1,
+                                  reservation)
+
+            pages = []
+            for page in self._iter_pages(playlist_id, entry, check_rest,
+                                         reservation):
+                pages.append(page)
+                yield page
+        if self.cache is not None:
+            self.cache.put(playlist_id, pages)
+
+    def _sync_load_pages(self, playlist_id: str, force_refresh: bool,
+                         load: Dict) -> Iterator[Dict]:
+        """
+        Функция - аналог функции _load_pages для дополнения плейлиста:
+            если в плейлист видео добавлялись только в конец,
+            то загружаются только измененные и новые страницы
+            (_sync_pages), иначе - все страницы (_load_pages).
+        Страницы сохраняются в кэш.
+
+        :param playlist_id: id плейлиста
+        :param force_refresh: надо ли загрузить плейлист заново
+            (дополняется только плейлист из кэша)
+        :param load: состояние загрузки (как в _promote_load)
+        :return: итератор страниц (как в _iter_pages)
+        """
+        entry = None
+        if self.cache is not None and not force_refresh:
+            entry = self.cache.get(playlist_id)
+        pages = None
+        if entry is not None and not self.cache.is_fresh(entry):
+            pages = self._sync_pages(playlist_id, entry['pages'], load)
+        if pages is None:  # нечего дополнять или плейлист изменился
+            yield from self._load_pages(playlist_id, force_refresh, load)
+            return
+        self.cache.put(playlist_id, pages)
+        yield from pages
+
+    @contextmanager
+    def _load_quota(self, load: Dict) \
+            -> Iterator[Union[QuotaLedger.Reservation, None]]:
+        """
+        Функция создания резерва квоты для загрузки, которую
+            можно повысить до загрузки пользователя (_promote_load).
+
+        :param load: состояние загрузки (как в _promote_load)
+        :return: QuotaLedger.Reservation
+            (или None, если квота не учитывается)
+        """
+        with self._reserve_quota(load['background']) as reservation:
+            load['reservation'] = reservation
+            # загрузку могли повысить, пока создавался резерв
+            if not load['background'] and reservation is not None:
+                reservation.background = False
+            yield reservation
+
+    # сколько загруженных, но еще не разобранных страниц может быть
+    pipeline_size = 4
+
+    def _iter_pages(self, playlist_id: str,
+                    entry: Union[Dict, None] = None,
+                    check_first_page: Union[Callable, None] = None,
+                    reservation: Union[QuotaLedger.Reservation,
+                                       None] = None) \
+            -> Iterator[Dict]:
+        """
+        Функция получения всех страниц плейлиста по мере их загрузки.
+        Страницы загружаются в отдельном потоке по цепочке nextPageToken
+            и передаются через очередь размера pipeline_size,
+            поэтому следующая страница загружается,
+            пока предыдущая разбирается.
+        Если страницы больше не нужны, то итератор закрывается
+            только после того, как поток закончит загрузку.
+
+        :param playlist_id: id плейлиста
+        :param entry: сохраненные в кэше данные плейлиста (default None)
+        :param check_first_page: функция проверки первой страницы
+            до загрузки следующих, ее ошибка передается дальше
+            (default None)
+        :param reservation: резерв квоты загрузки (default None)
+        :return: итератор страниц dict(
+                'page_token' : "номер" страницы (None - первая страница),
+                'etag' : ETag страницы,
+                'data' : ответ от PlaylistItems
+            )
+        """
+        # сохраненные страницы по их "номерам"
+        stored = dict()
+        if entry is not None:
+            stored = {page['page_token']: page for page in entry['pages']}
+
+        pages = Queue(maxsize=self.pipeline_size)
+        stop = Event()  # страницы больше не нужны
+
+        def put(item) -> bool:
+            """ Передача страницы (False - страницы больше не нужны). """
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def fetch() -> None:
+            """ Загрузка страниц (в конце передается None или ошибка). """
+            try:
+                page_token = None  # первая страница
+                while not stop.is_set():
+                    page = self._get_page(playlist_id, page_token,
+                                          stored.get(page_token),
+                                          reservation)
+                    if page_token is None and check_first_page is not None:
+                        check_first_page(page)
+                    if not put(page):
+                        return
+                    # проход по всем страницами плейлиста
+                    if 'nextPageToken' not in page['data']:
+                        break
+                    # получение номера следующей страницы
+                    page_token = page['data']['nextPageToken']
+            except Exception as error:  # ошибка передается дальше
+                put(error)
+            else:
+                put(None)
+
+        fetcher = Thread(target=fetch, daemon=True)
+        fetcher.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:  # все страницы загружены
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            stop.set()
+            # поток может еще загружать страницу за счет резерва квоты:
+            # резерв возвращается только после его последнего запроса
+            fetcher.join()
+
+    def _sync_pages(self, playlist_id: str, pages: List[Dict],
+                    load: Dict) -> Union[List[Dict], None]:
+        """
+        Функция получения страниц плейлиста,
+            в который видео добавлялись только в конец.
+        Загружаются первая и последняя сохраненные страницы
+            (с перепроверкой по ETag) и все страницы после последней.
+
+        :param playlist_id: id плейлиста
+        :param pages: сохраненные страницы (как в _iter_pages)
+        :param load: состояние загрузки (как в _promote_load)
+        :return: список всех страниц
+            или None, если плейлист изменился не только в конце
+        """
+        with self._load_quota(load) as reservation:
+            # хватит ли квоты на первую и последнюю страницы
+            self._check_quota(min(len(pages), 2), reservation)
+            old_total = pages[0]['data']['pageInfo']['totalResults']
+            first = self._get_page(playlist_id, None, pages[0], reservation)
+            # видео удаляли или изменили в начале плейлиста
+            if first['data']['pageInfo']['totalResults'] < old_total \
+                    or not self._is_prefix(pages[0], first):
+                return None
+            if len(pages) == 1:
+                new_pages = [first]
+            else:
+                last = self._get_page(playlist_id, pages[-1]['page_token'],
+                                      pages[-1], reservation)
+                # видео изменили в конце плейлиста
+                if not self._is_prefix(pages[-1], last):
+                    return None
+                new_pages = [first] + pages[1:-1] + [last]
+
+            # хватит ли квоты на новые страницы
+            new_total = first['data']['pageInfo']['totalResults']
+            self._check_quota(self._count_pages(new_total) - len(pages),
+                              reservation)
+            # проход по новым страницам плейлиста
+            page = new_pages[-1]
+            while 'nextPageToken' in page['data']:
+                page = self._get_page(playlist_id,
+                                      page['data']['nextPageToken'],
+                                      reservation=reservation)
+                new_pages.append(page)
+            return new_pages
+
+    @staticmethod
+    def _count_pages(total_videos: int) -> int:
+        """
+        Функция подсчета страниц плейлиста (по 50 видео).
+
+        :param total_videos: количество видео в плейлисте
+        :return: количество страниц
+        """
+        return max(-(-total_videos // 50), 1)
+
+    def _reserve_quota(self, background=False):
+        """
+        Функция создания резерва квоты для одной загрузки
+            (используется в with, в конце остаток резерва возвращается).
+
+        :param background: фоновая ли загрузка (default False)
+        :return: QuotaLedger.Reservation
+            (или пустой контекст, если квота не учитывается)
+        """
+        if self.quota is None:
+            return nullcontext()
+        return self.quota.reserve(background)
+
+    @staticmethod
+    def _check_quota(cost: int,
+                     reservation: Union[QuotaLedger.Reservation, None]) \
+            -> None:
+        """
+        Функция проверки, что квоты хватит на запросы,
+            и резервирования ее за загрузкой.
+
+        :param cost: сколько запросов потребуется
+        :param reservation: резерв квоты загрузки
+            (None - квота не учитывается)
+        :return: вызывает QuotaLedger.ExceededError, если квоты не хватит
+        """
+        if reservation is not None and cost > 0:
+            reservation.add(cost)
+
+    def _spend_quota(self, endpoint: str,
+                     reservation: Union[QuotaLedger.Reservation,
+                                        None] = None) -> None:
+        """
+        Функция учета сделанного запроса.
+
+        :param endpoint: тип запроса ('playlists' или 'playlistItems')
+        :param reservation: резерв квоты загрузки, который тратит запрос
+            (default None - без резерва)
+        """
+        if reservation is not None:
+            reservation.spend(endpoint)
+        elif self.quota is not None:
+            self.quota.record(endpoint)
+
+    @staticmethod
+    def _is_prefix(old_page: Dict, new_page: Dict) -> bool:
+        """
+        Функция проверки, что в новой версии страницы
+            к старым видео только добавились новые в конце.
+
+        :param old_page: сохраненная страница
+        :param new_page: новая версия страницы
+        :return: True - старые видео не изменились, False - изменились
+        """
+        old_items = old_page['data']['items']
+        return new_page['data']['items'][:len(old_items)] == old_items
+
+    @staticmethod
+    def _count_videos(pages: List[Dict]) -> int:
+        """
+        Функция подсчета видео, доступных для просмотра, на страницах.
+
+        :param pages: список страниц (как в _iter_pages)
+        :return: количество видео
+        """
+        return sum(item['status']['privacyStatus'] in ('public', 'unlisted')
+                   for page in pages for item in page['data']['items'])
+
+    def _get_page(self, playlist_id: str, page_token=None,
+                  stored_page: Union[Dict, None] = None,
+                  reservation: Union[QuotaLedger.Reservation,
+                                     None] = None) -> Dict:
+        """
+        Функция получения одной страницы плейлиста.
+        Если страница есть в кэше, то она перепроверяется по ETag
+            и при ответе 304 Not Modified берется из кэша.
+
+        :param playlist_id: id плейлиста
+        :param page_token: "номер" страницы (default None - первая страница)
+        :param stored_page: сохраненная в кэше страница (default None)
+        :param reservation: резерв квоты загрузки (default None)
+        :return: страница (как в _iter_pages)
+        """
+        etag = stored_page['etag'] if stored_page is not None else None
+        response = self._get_page_response(playlist_id, page_token, etag,
+                                           reservation)
+        # страница не изменилась
+        if response.status_code == 304 and stored_page is not None:
+            return stored_page
+        if response.status_code != 200:  # невозможно получить ответ
+            # плейлист удален или стал приватным
+            if page_token is None and response.status_code in (403, 404):
+                raise self.CannotGetError
             raise self.UndefinedError
-        # получаем таблицу pd.DataFrame
-        return self._info_to_data_frame(info)
+        data = response.json()
+        return {
+            'page_token': page_token,
+            'etag': response.headers.get('ETag', data.get('etag')),
+            'data': data
+        }
 
     def _get_page_response(self, playlist_id: str,
-                           page_token=None) -> 'Response':
+                           page_token=None, etag=None,
+                           reservation: Union[QuotaLedger.Reservation,
+                                              None] = None) -> 'Response':
         """
         Функция получения ответа от PlaylistItems
             - информация о 50 видео на n "странице" плейлиста.
@@ -174,6 +905,9 @@ class YouTubePlaylistsHandler:
 
         :param playlist_id: id плейлиста
         :param page_token: "номер" страницы (default None - первая страница)
+        :param etag: ETag сохраненной страницы для If-None-Match
+            (default None - без перепроверки)
+        :param reservation: резерв квоты загрузки (default None)
         :return: Response от playlistItems с информацией о 50 видео
         """
         url = 'https://www.googleapis.com/youtube/v3/playlistItems'
@@ -185,9 +919,17 @@ class YouTubePlaylistsHandler:
         }
         if page_token is not None:
             params['pageToken'] = page_token
+        headers = dict()
+        if etag is not None:
+            headers['If-None-Match'] = etag
 
         req_url = url + '?' + urlencode(params)  # делаем ссылку
-        return requests.get(req_url)
+        try:
+            response = self.http_client.get(req_url, headers=headers)
+        except requests.RequestException:  # невозможно соединиться
+            raise self.UndefinedError
+        self._spend_quota('playlistItems', reservation)
+        return response
 
     @staticmethod
     def _create_info() -> Dict:
@@ -200,26 +942,22 @@ class YouTubePlaylistsHandler:
         return {
             'curr': 0,  # текущий номер в плейлисте
             'indexes': [],  # номера видео в плейлисте
-            'urls': [],  # ссылки на видео
-            'img_urls': [],  # ссылки на изображения превью видео
+            'video_ids': [],  # id видео
             'titles': [],  # названия видео
             'descriptions': [],  # описания видео
-            'author_urls': [],  # ссылка на автора видео
+            'channel_ids': [],  # id каналов авторов видео
             'authors': []  # ники авторов видео
         }
 
-    def _get_info(self, info, response) -> bool:
+    def _get_info(self, info: Dict, data: Dict) -> None:
         """
         Функция получения основной информации,
             о каждом видео из ответа PlaylistItems.
 
         :param info: словарь, где хранятся списки информации о каждом видео
-        :param response: ответ от PlaylistItems
-        :return: прошло ли все хорошо или произошла ошибка
+        :param data: ответ от PlaylistItems в формате json
         """
-        if response.status_code != 200:  # невозможно получить ответ
-            return False
-        items = response.json()['items']
+        items = data['items']
         for i in range(len(items)):
             # текущий номер в плейлисте
             info['curr'] += 1
@@ -233,7 +971,6 @@ class YouTubePlaylistsHandler:
             item = items[i]['snippet']
             # зполнение словаря с информацией
             self._fill_info(info, item)
-        return True
 
     @staticmethod
     def _fill_info(info: Dict, item: Dict) -> None:
@@ -244,49 +981,40 @@ class YouTubePlaylistsHandler:
         :param item: подробная информация
             об одном видео из ответа PlaylistItems
         """
-        video_id = item['resourceId']['videoId']
-        # ссылка на видео
-        video_url = f'https://www.youtube.com/watch?v={video_id}'
-        info['urls'].append(video_url)
-        # ссылка на изображение превью видео
-        video_img_url = f'https://img.youtube.com/vi/{video_id}/0.jpg'
-        info['img_urls'].append(video_img_url)
+        # id видео (по нему строятся ссылки на видео и превью)
+        info['video_ids'].append(item['resourceId']['videoId'])
         # название видео
         info['titles'].append(item['title'])
         # описание видео
         info['descriptions'].append(item['description'])
-        # ссылка на автора видео
-        author_id = item['videoOwnerChannelId']
-        author_url = f'https://www.youtube.com/channel/{author_id}'
-        info['author_urls'].append(author_url)
+        # id канала автора видео (по нему строится ссылка на автора)
+        info['channel_ids'].append(item['videoOwnerChannelId'])
         # ник автора видео
         info['authors'].append(item['videoOwnerChannelTitle'])
 
-    @staticmethod
-    def _info_to_data_frame(info: Dict):
+    def _info_to_table(self, info: Dict) -> PlaylistTable:
         """
-        Функция создания pd.DataFrame с основной информацией
-            о каждом видео из плейлиста на снове словаря info
+        Функция создания PlaylistTable с основной информацией
+            о каждом видео из плейлиста на основе словаря info
+            (записи о видео берутся из общего хранилища)
         :param info: словарь, где хранятся списки информации о каждом видео
-        :return: pd.DataFrame
-        """
-        return pd.DataFrame(
-            {
-                # номера видео в плейлисте
-                'ind': info['indexes'],
-                # ссылки на видео
-                'url': info['urls'],
-                # ссылки на изображения превью видео
-                'img_url': info['img_urls'],
-                # названия видео
-                'title': info['titles'],
-                # описания видео
-                'description': info['descriptions'],
-                # ссылки на авторов видео
-                'author_url': info['author_urls'],
-                # ники авторов видео
-                'author': info['authors']
-            }
+        :return: PlaylistTable
+        """
+        return PlaylistTable.from_columns(
+            # номера видео в плейлисте
+            info['indexes'],
+            # id видео
+            info['video_ids'],
+            # названия видео
+            info['titles'],
+            # описания видео
+            info['descriptions'],
+            # id каналов авторов видео
+            info['channel_ids'],
+            # ники авторов видео
+            info['authors'],
+            # общее хранилище записей о видео
+            self.video_store
         )
 
     # -----------------------------------------------------------
@@ -304,84 +1032,117 @@ class YouTubePlaylistsHandler:
             ' проверьте, что Вы правильно настроили OAuth' \
             ' и имеете доступ к плейлисту.'
 
-    def _oauth_get_all_data_frame(self, playlist_id: str) -> pd.DataFrame:
+    # сколько классов для работы с запросами OAuth хранится
+    oauth_services_size = 32
+
+    def _oauth_get_all_table(self, playlist_id: str,
+                             credentials: Dict) -> PlaylistTable:
         """
-        Функция - аналог функции _get_all_data_frame, но для работы с OAuth.
+        Функция - аналог функции _get_all_table, но для работы с OAuth.
         Функция получения основной информации
-            о каждом видео из плейлиста в формате pd.DataFrame.
+            о каждом видео из плейлиста в формате PlaylistTable.
+        Каждая страница запрашивается один раз.
 
         :param playlist_id: id плейлиста
-        :return: pd.DataFrame с основной информацией,
+        :param credentials: учетные данные из сеанса пользователя
+            (передаются явно: загрузка идет в фоновой задаче,
+            где сеанса нет)
+        :return: PlaylistTable с основной информацией,
             о каждом видео из плейлиста
         """
-        # Загружаем учетные данные из сеанса.
-        credentials = \
-            google.oauth2.credentials.Credentials(**session['credentials'])
         # Класс для работы с запросами.
-        self.youtube = googleapiclient.discovery.build(
+        youtube, lock = self._oauth_get_service(credentials)
+        # класс не потокобезопасный - запросы пользователя идут по очереди
+        with lock, self._reserve_quota() as reservation:
+            try:
+                # создаем словарь информации
+                info = self._create_info()
+                page_token = None  # первая страница
+                while True:
+                    self._check_quota(1, reservation)
+                    # получение страницы для авторизованного пользователя
+                    data = self._oauth_get_page_response(
+                        youtube, playlist_id, page_token).execute()
+                    self._spend_quota('playlistItems', reservation)
+                    # сбор информации со страницы
+                    self._oauth_get_info(info, data)
+                    # проход по всем страницами плейлиста
+                    if 'nextPageToken' not in data:
+                        break
+                    # получение номера следующей страницы
+                    page_token = data['nextPageToken']
+            # что-то пошло не так
+            except googleapiclient.errors.HttpError:
+                raise self.OAuthUndefinedError
+        # получаем таблицу PlaylistTable
+        return self._info_to_table(info)
+
+    def _oauth_get_service(self, credentials: Dict) -> Tuple:
+        """
+        Функция получения класса для работы с запросами OAuth.
+        Класс создается один раз для учетных данных
+            (по встроенному в библиотеку описанию API, без запроса к нему).
+
+        :param credentials: учетные данные из сеанса
+        :return: (класс для работы с запросами, блокировка для него)
+        """
+        key = tuple(sorted((name, str(value))
+                           for name, value in credentials.items()))
+        with self._oauth_services_lock:
+            if key in self._oauth_services:
+                self._oauth_services.move_to_end(key)
+                return self._oauth_services[key]
+        youtube = googleapiclient.discovery.build(
             'youtube',
             'v3',
-            credentials=credentials)
-        try:
-            # создаем словарь информации
-            info = self._create_info()
-            # получение первой страницы для авторизованного пользователя
-            response = self._oauth_get_page_response(playlist_id)
-            # сбор информации с первой страницы
-            # для авторизованного пользователя
-            self._oauth_get_info(info, response)
-
-            # проход по всем страницами плейлиста
-            while 'nextPageToken' in response.execute():
-                # получение номера следующей страницы
-                page_token = response.execute()['nextPageToken']
-                response = self._oauth_get_page_response(playlist_id,
-                                                         page_token)
-                self._oauth_get_info(info, response)
-        # что-то пошло не так
-        except googleapiclient.errors.HttpError:
-            raise self.OAuthUndefinedError
-        # получаем таблицу pd.DataFrame
-        return self._info_to_data_frame(info)
-
-    def _oauth_get_page_response(self, playlist_id: str,
+            credentials=google.oauth2.credentials.Credentials(**credentials),
+            static_discovery=True)
+        with self._oauth_services_lock:
+            service = self._oauth_services.setdefault(key, (youtube, Lock()))
+            while len(self._oauth_services) > self.oauth_services_size:
+                self._oauth_services.popitem(last=False)
+        return service
+
+    @staticmethod
+    def _oauth_get_page_response(youtube, playlist_id: str,
                                  page_token=None) -> 'HttpRequest':
         """
         Функция - аналог функции _get_page_response, но для работы с OAuth.
-        Функция получения ответа от PlaylistItems
+        Функция получения запроса к PlaylistItems
             - информация о 50 видео на n "странице" плейлиста.
         (API позволяет получить максимально 50 видео,
             храня все в связном списке из страниц)
 
+        :param youtube: класс для работы с запросами OAuth
         :param playlist_id: id плейлиста
         :param page_token: "номер" страницы (default None - первая страница)
-        :return: HttpRequest от playlistItems с информацией о 50 видео
+        :return: HttpRequest к playlistItems с информацией о 50 видео
         """
         if page_token is not None:
-            response = self.youtube.playlistItems().list(
+            response = youtube.playlistItems().list(
                 playlistId=playlist_id,
                 part="snippet",
                 maxResults=50,
                 pageToken=page_token
             )
         else:
-            response = self.youtube.playlistItems().list(
+            response = youtube.playlistItems().list(
                 playlistId=playlist_id,
                 part="snippet",
                 maxResults=50
             )
         return response
 
-    def _oauth_get_info(self, info: Dict, response: 'HttpRequest') -> None:
+    def _oauth_get_info(self, info: Dict, data: Dict) -> None:
         """
         Функция - аналог функции _get_info, но для работы с OAuth.
         Функция получения основной информации,
             о каждом видео из ответа PlaylistItems.
 
         :param info: словарь, где хранятся списки информации о каждом видео
-        :param response: ответ от PlaylistItems в формате HttpRequest
+        :param data: ответ от PlaylistItems в формате json
         """
-        items = response.execute()['items']
+        items = data['items']
         for i in range(len(items)):
             info['curr'] += 1  # текущий номер в плейлисте
             # видео не принадлежит пользователю и имеет приватный доступа
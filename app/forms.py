@@ -5,9 +5,12 @@ from wtforms.validators import DataRequired, Length
 
 # Форма для главной страницы.
 class UrlOrIdForm(FlaskForm):
-    url_or_id = StringField('Ссылка или id плейлиста',
+    url_or_id = StringField('Ссылка или id плейлиста (или канала)',
                             validators=[DataRequired()],
-                            description='Ссылка или id плейлиста')
+                            description='Ссылка или id плейлиста'
+                                        ' (или канала)')
+    force_refresh = BooleanField('Загрузить плейлист заново',
+                                 default=False)
     submit = SubmitField('Искать')
 
 
@@ -33,7 +36,11 @@ class SearchForm(FlaskForm):
                              choices=[('verbatim_search',
                                        'Дословный поиск'),
                                       ('non_verbatim_search',
-                                       'Поиск в любом порядке')],
+                                       'Поиск в любом порядке'),
+                                      ('ranked_search',
+                                       'По релевантности'),
+                                      ('fuzzy_search',
+                                       'С опечатками')],
                              default='verbatim_search')
     show_preview = BooleanField('Показывать превью',
                                 default=False)
@@ -1,18 +1,274 @@
 from main import app
-from config import yt_api_key_file_path, dl_key_file_path, client_secret
-
-from flask import render_template, redirect, url_for
+from config import yt_api_key_file_path, dl_key_file_path, client_secret, \
+    playlist_cache_dir, playlist_cache_ttl, playlist_cache_max_bytes, \
+    searchers_memory_budget, translation_cache_path, translation_cache_ttl, \
+    translation_cache_negative_ttl, \
+    http_timeouts, http_retries, progressive_loading, load_jobs_workers, \
+    youtube_quota_path, youtube_daily_quota, \
+    youtube_quota_background_reserve, \
+    warmup_path, warmup_top, warmup_interval, warmup_concurrency, \
+    ranked_search_top_k, author_facet_top
+
+from flask import render_template, redirect, url_for, \
+    Response, stream_with_context
+from typing import Dict
+import json
 
 from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+from app.clients.HttpClient import HttpClient
+from app.clients.JobManager import JobManager
+from app.clients.PlaylistCache import PlaylistCache
+from app.clients.PlaylistWarmer import PlaylistWarmer
+from app.clients.QuotaLedger import QuotaLedger
 from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.SearcherRegistry import SearcherRegistry
+from app.clients.TextTranslator import TextTranslator
+from app.clients.TranslationCache import TranslationCache
+from app.clients.VideoStore import VideoStore
 from app.forms import UrlOrIdForm, SearchForm
 
+# HTTP клиент для запросов ко всем API (общий пул соединений).
+http_client = HttpClient(timeouts=http_timeouts, retries=http_retries)
+
+# Учет дневной квоты YouTube Data API v3.
+quota = QuotaLedger(youtube_quota_path,
+                    daily_limit=youtube_daily_quota,
+                    background_reserve=youtube_quota_background_reserve)
+
+# Общее хранилище записей о видео: видео, которое есть в нескольких
+# плейлистах, хранится один раз.
+video_store = VideoStore()
+
 # Класс для информации о плейлисте.
 # yt_api_key_file_path - путь к файлу,
 # где лежит api-key для доступа к YouTube Data API v3
+# Загруженные плейлисты хранятся в кэше на диске,
+# запросы к API учитываются в квоте.
 yt_playlists_handler = \
-    YouTubePlaylistsHandler.yt_api_key_from_file(yt_api_key_file_path,
-                                                 client_secret)
+    YouTubePlaylistsHandler.yt_api_key_from_file(
+        yt_api_key_file_path,
+        client_secret,
+        cache=PlaylistCache(playlist_cache_dir,
+                            ttl=playlist_cache_ttl,
+                            max_bytes=playlist_cache_max_bytes),
+        http_client=http_client,
+        quota=quota,
+        video_store=video_store)
+
+# Классы поиска по загруженным плейлистам
+# (общие для всех пользователей, для приватных плейлистов - свои).
+searchers = SearcherRegistry(memory_budget=searchers_memory_budget)
+
+# Фоновые задачи загрузки плейлистов.
+jobs = JobManager(workers=load_jobs_workers)
+
+# Кэш результатов определения языка и перевода (общий для всех плейлистов).
+translation_cache = TranslationCache(
+    translation_cache_path, ttl=translation_cache_ttl,
+    negative_ttl=translation_cache_negative_ttl)
+
+
+def get_searcher(playlist_id: str):
+    """
+    Функция получения класса поиска по плейлисту для текущего пользователя:
+        сначала среди его приватных плейлистов, потом - среди неприватных.
+
+    :param playlist_id: id плейлиста
+    :return: DataFrameSearcher или None, если плейлист не загружен
+    """
+    identity = session.get('oauth_identity')
+    if identity is not None:
+        searcher = searchers.get(playlist_id, identity)
+        if searcher is not None:
+            return searcher
+    return searchers.get(playlist_id)
+
+
+def load_playlist(job: JobManager.Job, playlist_id: str, url_or_id: str,
+                  force_refresh: bool) -> None:
+    """
+    Функция загрузки плейлиста (фоновая задача).
+    Если плейлист уже загружен, то он дополняется новыми видео,
+        иначе - загружается по страницам
+        (при progressive_loading искать можно уже после первой страницы).
+    Фоновым задачам (BACKGROUND) недоступен резерв квоты API.
+
+    :param job: задача, в которой сообщается о прогрессе
+    :param playlist_id: id плейлиста
+    :param url_or_id: ссылка или id плейлиста
+    :param force_refresh: надо ли загрузить плейлист заново,
+        не используя кэш
+    """
+    background = job.priority == JobManager.BACKGROUND
+    if yt_playlists_handler.is_channel(url_or_id):
+        # поиск по всем плейлистам канала
+        load_channel(job, playlist_id, url_or_id, force_refresh, background)
+        return
+    df_searcher = searchers.get(playlist_id)
+    # если плейлист уже загружен, то дополняем его новыми видео
+    if not force_refresh \
+            and df_searcher is not None and not df_searcher.loading \
+            and yt_playlists_handler.update(url_or_id, df_searcher,
+                                            background=background):
+        searchers.put(playlist_id, df_searcher)
+        job.rows = len(df_searcher.table)
+        job.ready = True
+        return
+
+    def progress(pages: int, total_videos: int) -> None:
+        job.pages = pages
+        job.total_pages = max(-(-total_videos // 50), pages)
+
+    # получаем информацию о каждом видео из плейлиста по страницам
+    df_searcher = None
+    try:
+        for table in yt_playlists_handler.stream(
+                url_or_id, force_refresh=force_refresh, progress=progress,
+                background=background):
+            if df_searcher is None:
+                df_searcher = DataFrameSearcher(
+                    table, dl_key_file_path,
+                    translation_cache=translation_cache,
+                    http_client=http_client)
+                df_searcher.loading = True
+                if progressive_loading:
+                    # можно искать по первой странице
+                    searchers.put(playlist_id, df_searcher)
+                    job.ready = True
+            else:
+                df_searcher.append(table)
+            job.rows += len(table)
+    except Exception as error:
+        if df_searcher is None or not job.ready:
+            raise
+        # по уже загруженным видео все равно можно искать
+        df_searcher.finish_loading(
+            getattr(error, 'message', JobManager.default_error))
+        searchers.put(playlist_id, df_searcher)
+        raise
+    df_searcher.finish_loading()
+    # пересчитываем занимаемую память
+    searchers.put(playlist_id, df_searcher)
+    job.ready = True
+
+
+def load_channel(job: JobManager.Job, channel_id: str, url_or_id: str,
+                 force_refresh: bool, background: bool) -> None:
+    """
+    Функция загрузки всех плейлистов канала в один класс поиска.
+
+    :param job: задача, в которой сообщается о прогрессе
+    :param channel_id: id канала
+    :param url_or_id: ссылка или id канала
+    :param force_refresh: надо ли загрузить плейлисты заново,
+        не используя кэш
+    :param background: фоновая ли загрузка
+    """
+    def progress(pages: int, total_pages: int) -> None:
+        job.pages = pages
+        job.total_pages = total_pages
+
+    table = yt_playlists_handler.channel(url_or_id,
+                                         force_refresh=force_refresh,
+                                         progress=progress,
+                                         background=background)
+    df_searcher = DataFrameSearcher(table, dl_key_file_path,
+                                    translation_cache=translation_cache,
+                                    http_client=http_client)
+    searchers.put(channel_id, df_searcher)
+    job.rows = len(table)
+    job.ready = True
+
+
+def load_oauth_playlist(job: JobManager.Job, playlist_id: str,
+                        url_or_id: str, credentials: Dict,
+                        identity: str) -> None:
+    """
+    Функция загрузки плейлиста для авторизованного пользователя
+        (фоновая задача). Плейлист может быть приватным,
+        поэтому класс поиска доступен только этому пользователю.
+    Сеанса в фоновой задаче нет, поэтому учетные данные
+        и идентификатор пользователя передаются из страницы.
+
+    :param job: задача, в которой сообщается о прогрессе
+    :param playlist_id: id плейлиста
+    :param url_or_id: ссылка или id плейлиста
+    :param credentials: учетные данные OAuth из сеанса пользователя
+    :param identity: идентификатор пользователя из сеанса
+    """
+    table = yt_playlists_handler(url_or_id, credentials=credentials)
+    df_searcher = DataFrameSearcher(table, dl_key_file_path,
+                                    translation_cache=translation_cache,
+                                    http_client=http_client)
+    searchers.put(playlist_id, df_searcher, identity=identity)
+    job.rows = len(table)
+    job.ready = True
+
+
+# Фоновая загрузка самых популярных плейлистов
+# (при запуске и далее по расписанию).
+# Запускается в main.py только в процессе, который обслуживает запросы,
+# а не при импорте модуля.
+warmer = PlaylistWarmer(jobs, load_playlist, warmup_path,
+                        top=warmup_top,
+                        interval=warmup_interval,
+                        concurrency=warmup_concurrency)
+
+
+# -----------------------------------------------------------
+# Страница ожидания загрузки плейлиста.
+# job_id - id задачи загрузки
+@app.route("/loading/<job_id>")
+def loading(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return redirect('/')
+    # составной ключ задачи - (плейлист, пользователь или 'refresh')
+    playlist_id = job.key[0] if isinstance(job.key, tuple) else job.key
+    return render_template("loading.html",
+                           job_id=job_id,
+                           search_url=url_for('search',
+                                              playlist_id=playlist_id),
+                           title='Загрузка')
+
+
+# Прогресс задачи загрузки плейлиста (в формате json).
+# job_id - id задачи загрузки
+@app.route("/jobs/<job_id>")
+def job_progress(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return {'error': 'Задача не найдена.'}, 404
+    return job.to_dict()
+
+
+# Статистика загрузок плейлистов (в формате json):
+# сколько загрузок удалось не выполнять, так как такая же уже шла,
+# сколько дневной квоты YouTube Data API потрачено,
+# какие плейлисты загружаются заранее,
+# сколько памяти занимают загруженные плейлисты
+# и сколько видео хранится в общем хранилище.
+@app.route("/metrics")
+def metrics():
+    return {
+        'load_jobs': jobs.metrics(),
+        'playlist_fetches': yt_playlists_handler.single_flight.metrics(),
+        'youtube_quota': quota.usage(),
+        'warmup': warmer.metrics(),
+        'searchers': searchers.metrics(),
+        'videos': video_store.metrics()
+    }
+
+
+def server_sent_event(event: str, data) -> str:
+    """
+    Функция создания сообщения Server-Sent Events.
+
+    :param event: тип сообщения
+    :param data: данные сообщения (переводятся в json)
+    :return: текст сообщения
+    """
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
 
 
 # -----------------------------------------------------------
@@ -27,23 +283,24 @@ def main():
     form = UrlOrIdForm()
     if form.validate_on_submit():
         url_or_id = form.url_or_id.data
-        try:  # получаем информацию о каждом видео из плейлиста
-            data_frame = yt_playlists_handler(url_or_id)
-        # невозможно получить доступ
-        except yt_playlists_handler.CannotGetError:
-            form.url_or_id.errors = \
-                (yt_playlists_handler.CannotGetError.message, '')
-        # что-то пошло не так
-        except yt_playlists_handler.UndefinedError:
-            form.url_or_id.errors = \
-                (yt_playlists_handler.UndefinedError.message, '')
+        if yt_playlists_handler.is_channel(url_or_id):
+            # ищем по всем плейлистам канала
+            playlist_id = yt_playlists_handler.get_channel_id(url_or_id)
         else:
-            yt_playlists_handler.df_searcher = \
-                DataFrameSearcher(data_frame, dl_key_file_path)
-            #  переходим на страницу поиска, если все хорошо
             playlist_id = yt_playlists_handler.get_playlist_id(url_or_id)
-            return redirect(url_for('search',
-                                    playlist_id=playlist_id))
+        # загружаем плейлист в фоне
+        # (если он уже загружается, то ждем ту же загрузку,
+        # но загрузка заново не присоединяется к обычной)
+        force_refresh = form.force_refresh.data
+        key = (playlist_id, 'refresh') if force_refresh else playlist_id
+        job = jobs.submit(key, load_playlist, playlist_id,
+                          url_or_id, force_refresh)
+        # если плейлист уже загружается в фоне (PlaylistWarmer),
+        # то его загрузка становится загрузкой пользователя
+        if not yt_playlists_handler.is_channel(url_or_id):
+            yt_playlists_handler.promote(url_or_id, force_refresh)
+        # переходим на страницу ожидания загрузки
+        return redirect(url_for('loading', job_id=job.id))
     can_OAuth = (yt_playlists_handler.client_secret is not None)
     return render_template("main.html",
                            form=form,
@@ -59,54 +316,166 @@ def main():
 @app.route("/search/<playlist_id>", methods=['GET', 'POST'])
 def search(playlist_id):
     # проверка, что мы можем работать с плейлистом с данным playlist_id
-    if yt_playlists_handler.df_searcher is None \
-            or yt_playlists_handler.work_playlist_id is None \
-            or yt_playlists_handler.work_playlist_id != playlist_id:
+    df_searcher = get_searcher(playlist_id)
+    if df_searcher is None:
         return redirect('/')
 
     playlist_url = f'https://www.youtube.com/playlist?list={playlist_id}'
+    if yt_playlists_handler.is_channel(playlist_id):  # поиск по каналу
+        playlist_url = \
+            f'https://www.youtube.com/channel/{playlist_id}/playlists'
     form = SearchForm()
     results = dict()
     translation = None
     nothing_error = None
+    # плейлист еще загружается
+    loading = df_searcher.loading
+    # параметры для получения новых результатов по мере загрузки
+    stream_args = {'rows': len(df_searcher.table)}
     if form.validate_on_submit():
+        # учитываем поиск по неприватному плейлисту
+        if searchers.get(playlist_id) is df_searcher:
+            warmer.hit(playlist_id)
         try:  # производим поиск
             verbatim_search = form.search_type.data == "verbatim_search"
+            ranked = form.search_type.data == "ranked_search"
+            fuzzy = form.search_type.data == "fuzzy_search"
             results = \
-                yt_playlists_handler.df_searcher(
+                df_searcher(
                     code_words=form.code_words.data,
                     author_name=form.author.data,
                     search_by_description=form.search_by_description.data,
                     verbatim_search=verbatim_search,
-                    bilingual_search=form.bilingual_search.data)
-            if results['data_frame'].empty:  # ничего не нашли
-                raise yt_playlists_handler.df_searcher.NothingError
+                    bilingual_search=form.bilingual_search.data,
+                    ranked=ranked,
+                    top_k=ranked_search_top_k,
+                    fuzzy=fuzzy)
+            if form.search_by_description.data:
+                # для поиска по описанию могли построиться новые индексы
+                searchers.resize(df_searcher)
+            stream_args = {
+                'rows': results['rows'],
+                'code_words': form.code_words.data,
+                'author': form.author.data,
+                'search_by_description': int(form.search_by_description.data),
+                'verbatim_search': int(verbatim_search),
+                'bilingual_search': int(form.bilingual_search.data),
+                'ranked': int(ranked),
+                'fuzzy': int(fuzzy),
+                'show_preview': int(form.show_preview.data)
+            }
+            # ничего не нашли (и уже не найдем)
+            if results['table'].empty and not loading:
+                raise DataFrameSearcher.NothingError
         # ничего не нашли
-        except yt_playlists_handler.df_searcher.NothingError:
-            nothing_error = \
-                yt_playlists_handler.df_searcher.NothingError.message
+        except DataFrameSearcher.NothingError:
+            nothing_error = DataFrameSearcher.NothingError.message
         # что-то пошло не так с API при переводе
-        except yt_playlists_handler.df_searcher.text_translator.UndefinedError:
+        except TextTranslator.UndefinedError:
             form.bilingual_search.errors = \
-                (yt_playlists_handler.df_searcher.text_translator.
-                 UndefinedError.message, '')
+                (TextTranslator.UndefinedError.message, '')
         # невозможно перевести текст
-        except yt_playlists_handler.df_searcher.text_translator.NothingError:
+        except TextTranslator.NothingError:
             form.bilingual_search.errors = \
-                (yt_playlists_handler.df_searcher.text_translator.
-                 NothingError.message, '')
+                (TextTranslator.NothingError.message, '')
         if results:
             translation = results['translation']
-            results = results['data_frame'].to_dict('index')
+            results = results['table'].to_dict()
+    stream_url = None
+    nothing_message = DataFrameSearcher.NothingError.message
+    if loading:
+        stream_url = url_for('search_stream', playlist_id=playlist_id,
+                             **stream_args)
     return render_template("search.html",
                            form=form,
                            playlist_url=playlist_url,
                            results=results,
                            translation=translation,
                            nothing_error=nothing_error,
+                           # сколько видео уже загружено
+                           rows=stream_args['rows'],
+                           # авторы с наибольшим количеством видео
+                           authors=df_searcher.author_facet()
+                           [:author_facet_top],
+                           # был ли поиск
+                           searched='code_words' in stream_args,
+                           loading=loading,
+                           # почему плейлист загружен не полностью
+                           load_error=df_searcher.load_error,
+                           stream_url=stream_url,
+                           nothing_message=nothing_message,
                            title='Поиск')
 
 
+# Новые результаты поиска по мере загрузки плейлиста (Server-Sent Events).
+# playlist_id - id плейлиста, по которому производится поиск
+@app.route("/search/<playlist_id>/stream")
+def search_stream(playlist_id):
+    df_searcher = get_searcher(playlist_id)
+    if df_searcher is None:
+        return Response(status=404)
+
+    args = request.args
+    rows = args.get('rows', 0, type=int)  # по скольким видео уже искали
+    show_preview = bool(args.get('show_preview', 0, type=int))
+    search_args = None  # поиска не было - сообщаем только о загрузке
+    if 'code_words' in args:
+        search_args = {
+            'code_words': args.get('code_words', ''),
+            'author_name': args.get('author', ''),
+            'search_by_description':
+                bool(args.get('search_by_description', 0, type=int)),
+            'verbatim_search': bool(args.get('verbatim_search', 1, type=int)),
+            'bilingual_search':
+                bool(args.get('bilingual_search', 0, type=int)),
+            'ranked': bool(args.get('ranked', 0, type=int)),
+            'fuzzy': bool(args.get('fuzzy', 0, type=int)),
+            'top_k': ranked_search_top_k
+        }
+
+    def events():
+        nonlocal rows, search_args
+        while True:
+            # если загрузка закончена, то этот поиск - последний
+            loading = df_searcher.loading
+            if search_args is not None and len(df_searcher.table) > rows:
+                try:
+                    results = df_searcher(**search_args)
+                except (TextTranslator.UndefinedError,
+                        TextTranslator.NothingError):
+                    search_args = None
+                else:
+                    table = results['table']
+                    # лучшие видео могли измениться - заменяем все,
+                    # иначе - только видео, которых еще не было
+                    replace = search_args['ranked']
+                    if not replace:
+                        table = table.take(table.index >= rows)
+                    rows = results['rows']
+                    if not table.empty:
+                        html = render_template(
+                            "result_rows.html",
+                            results=table.to_dict(),
+                            show_preview=show_preview)
+                        yield server_sent_event(
+                            'results', {'html': html,
+                                        'found': len(table),
+                                        'replace': replace})
+            if search_args is None:
+                rows = len(df_searcher.table)
+            yield server_sent_event(
+                'progress', {'rows': rows,
+                             'complete': not loading,
+                             'error': df_searcher.load_error})
+            if not loading:
+                return
+            df_searcher.wait_for_update(rows, timeout=15)
+
+    return Response(stream_with_context(events()),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
 # -----------------------------------------------------------
 # Главная страница, но для авторизованных пользователей с помощью OAuth.
 # -----------------------------------------------------------
@@ -125,21 +494,17 @@ def oauth_main():
     form = UrlOrIdForm()
     if form.validate_on_submit():
         url_or_id = form.url_or_id.data
-        # получаем информацию о каждом видео из плейлиста,
-        # учитывая, что пользователь авторизован
-        try:
-            data_frame = yt_playlists_handler(url_or_id, oauth=True)
-        # что-то пошло не так (не получилось получить доступ)
-        except yt_playlists_handler.OAuthUndefinedError:
-            form.url_or_id.errors = \
-                (yt_playlists_handler.OAuthUndefinedError.message, '')
-        else:
-            yt_playlists_handler.df_searcher = \
-                DataFrameSearcher(data_frame, dl_key_file_path)
-            #  переходим на страницу поиска, если все хорошо
-            playlist_id = yt_playlists_handler.get_playlist_id(url_or_id)
-            return redirect(url_for('search',
-                                    playlist_id=playlist_id))
+        playlist_id = yt_playlists_handler.get_playlist_id(url_or_id)
+        identity = session.setdefault('oauth_identity',
+                                      secrets.token_hex(16))
+        # загружаем плейлист в фоне, учитывая, что пользователь
+        # авторизован (приватный плейлист доступен только ему,
+        # поэтому задачи разных пользователей не объединяются)
+        job = jobs.submit((playlist_id, identity), load_oauth_playlist,
+                          playlist_id, url_or_id,
+                          dict(session['credentials']), identity)
+        # переходим на страницу ожидания загрузки
+        return redirect(url_for('loading', job_id=job.id))
     return render_template("main.html",
                            form=form,
                            # пользователь авторизован
@@ -158,6 +523,7 @@ def oauth_main():
 
 from flask import session, request
 import google_auth_oauthlib.flow
+import secrets
 
 # Возможности авторизации (аккаунт доступен только для чтения).
 scopes = ["https://www.googleapis.com/auth/youtube.readonly"]
@@ -172,6 +538,7 @@ def oauth_authorize():
     # если уже авторизован, то выйти из аккаунта и авторизоваться заново
     if 'credentials' in session:
         del session['credentials']
+        session.pop('oauth_identity', None)
 
     # создаем flow для работы с OAuth
     flow = google_auth_oauthlib.flow.Flow.from_client_secrets_file(
@@ -232,6 +599,8 @@ def oauth_callback():
                               'client_id': credentials.client_id,
                               'client_secret': credentials.client_secret,
                               'scopes': credentials.scopes}
+    # идентификатор пользователя для его приватных плейлистов
+    session['oauth_identity'] = secrets.token_hex(16)
 
     # отправляем пользователя на главну страницу
     # для авторизованных пользователей
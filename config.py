@@ -28,3 +28,68 @@ dl_key_file_path = './files/detectlanguage-api-key.txt'
 # Путь к OAuth информации (!!!)
 # (https://developers.google.com/youtube/v3/guides/auth/server-side-web-apps)
 client_secret = './files/client_secret.json'
+
+# Кэш загруженных плейлистов.
+# Путь к папке, где хранится кэш.
+playlist_cache_dir = './files/playlist-cache'
+# Сколько секунд данные плейлиста используются без перепроверки.
+playlist_cache_ttl = 60 * 60
+# Максимальный размер кэша в байтах.
+playlist_cache_max_bytes = 256 * 1024 * 1024
+
+# Кэш результатов определения языка и перевода.
+# Путь к файлу базы SQLite.
+translation_cache_path = './files/translation-cache.sqlite3'
+# Сколько секунд хранится результат.
+translation_cache_ttl = 7 * 24 * 60 * 60
+# Сколько секунд хранится отрицательный результат
+# (невозможно определить язык или сделать перевод).
+translation_cache_negative_ttl = 60 * 60
+
+# Запросы к API.
+# Таймауты (на соединение, на ответ) в секундах для каждого сервиса.
+http_timeouts = {
+    'www.googleapis.com': (3.05, 15),
+    'ws.detectlanguage.com': (3.05, 5),
+    'api.mymemory.translated.net': (3.05, 5)
+}
+# Сколько раз повторять запрос при ответах 429 и 5xx или обрыве соединения.
+http_retries = 3
+
+# Переходить к поиску после загрузки первой страницы плейлиста
+# (остальные страницы загружаются в фоне, результаты дополняются).
+progressive_loading = True
+
+# Сколько плейлистов может загружаться в фоне одновременно.
+load_jobs_workers = 4
+
+# Учет дневной квоты YouTube Data API v3.
+# Путь к файлу, где хранится расход квоты за текущий день.
+youtube_quota_path = './files/youtube-quota.json'
+# Сколько единиц квоты доступно в день.
+youtube_daily_quota = 10000
+# Сколько единиц квоты не тратится на фоновые загрузки
+# (остаются для загрузок пользователей).
+youtube_quota_background_reserve = 2000
+
+# Заранее загружаемые популярные плейлисты.
+# Путь к файлу, где хранится, сколько раз искали по каждому плейлисту.
+warmup_path = './files/popular-playlists.json'
+# Сколько самых популярных плейлистов загружать.
+warmup_top = 10
+# Раз в сколько секунд обновлять эти плейлисты.
+warmup_interval = 30 * 60
+# Сколько из них может загружаться одновременно
+# (меньше load_jobs_workers, чтобы не мешать загрузкам пользователей).
+warmup_concurrency = 2
+
+# Сколько лучших видео показывать при поиске по релевантности.
+ranked_search_top_k = 20
+
+# Сколько авторов с наибольшим количеством видео показывать
+# на странице поиска.
+author_facet_top = 10
+
+# Сколько байт могут занимать все загруженные в память плейлисты
+# (при превышении удаляются те, к которым дольше всего не обращались).
+searchers_memory_budget = 512 * 1024 * 1024
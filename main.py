@@ -5,4 +5,10 @@ import os
 # запускаем приложение на http://host:port/ с отладкой или без
 if __name__ == '__main__':
     os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
+    # при отладке приложение работает во втором процессе (первый только
+    # перезапускает его при изменении кода), поэтому популярные
+    # плейлисты загружаются заранее только в том, где обслуживаются запросы
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from app.views import warmer
+        warmer.start()
     app.run(host=host, port=port, debug=debug)
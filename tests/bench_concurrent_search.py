@@ -0,0 +1,68 @@
+from itertools import product
+from threading import Thread
+import sys
+import time
+
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# Замер пропускной способности поиска из нескольких потоков
+# по одному DataFrameSearcher: одни и те же запросы делятся
+# между потоками, результат каждого сравнивается с поиском
+# в одном потоке.
+# Запуск: python tests/bench_concurrent_search.py [размер плейлиста]
+# -----------------------------------------------------------
+
+SIZE = 5000  # сколько видео в плейлисте
+THREADS = [1, 2, 4, 8]
+ROUNDS = 8  # сколько раз повторяются все запросы
+
+# (ключевые слова, автор, по описанию, дословно)
+QUERIES = list(product(['лекция семинар', 'ml', 'c++', 'python анализ',
+                        'ия###ле', 'введение'],
+                       [None, 'шад', 'mit'],
+                       [False, True],
+                       [False, True]))
+
+
+def search(searcher: DataFrameSearcher, query: tuple) -> list:
+    """ Индексы найденных видео. """
+    code_words, author, description, verbatim = query
+    result = searcher(code_words=code_words,
+                      author_name=author,
+                      search_by_description=description,
+                      verbatim_search=verbatim)
+    return list(result['table'].index)
+
+
+def main(size: int) -> None:
+    searcher = DataFrameSearcher(
+        PlaylistTable.from_columns(*make_columns(size)), DL_KEY_PATH)
+    expected = {query: search(searcher, query) for query in QUERIES}
+    queries = QUERIES * ROUNDS
+    for threads in THREADS:
+        errors = []
+
+        def run(shift: int):
+            for query in queries[shift::threads]:
+                if search(searcher, query) != expected[query]:
+                    errors.append(query)
+
+        workers = [Thread(target=run, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print('threads %d: %d queries, %.0f q/s, %s' % (
+            threads, len(queries), len(queries) / elapsed,
+            'all results correct' if not errors
+            else '%d wrong results' % len(errors)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
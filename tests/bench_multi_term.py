@@ -0,0 +1,86 @@
+import random
+import re
+import sys
+
+import numpy as np
+
+from conftest import WORDS, best_time
+from app.clients.MultiTermMatcher import MultiTermMatcher
+
+
+# -----------------------------------------------------------
+# Замер поиска слов запроса и его перевода в любом порядке
+# по длинным описаниям: MultiTermMatcher в сравнении
+# с отдельной проверкой каждого слова каждой группы (как до него)
+# и с поиском всех слов за один проход регулярным выражением
+# (как автомат Ахо-Корасик). Все способы дают одну маску.
+# Запуск: python tests/bench_multi_term.py [количество текстов]
+# -----------------------------------------------------------
+
+SIZE = 5000  # сколько текстов
+TEXT_WORDS = 300  # сколько слов в тексте (около 2200 символов)
+# (ключевые слова, перевод)
+QUERIES = [
+    ('лекция семинар python', 'lecture seminar python'),
+    ('введение в анализ данных', 'introduction to data analysis'),
+    ('теория вероятностей и статистика анализ данных',
+     'probability theory and statistics data analysis')
+]
+
+
+def make_texts(size: int) -> list:
+    """ Случайные тексты в нижнем регистре. """
+    rand = random.Random(0)
+    words = [word.lower() for word in WORDS] + \
+        ['слово%d' % i for i in range(500)]
+    return [' '.join(rand.choice(words) for _ in range(TEXT_WORDS))
+            for _ in range(size)]
+
+
+def per_word(groups: list, texts: list) -> np.ndarray:
+    """ Отдельная проверка каждого слова каждой группы. """
+    mask = np.zeros(len(texts), dtype=bool)
+    for words in groups:
+        found = np.ones(len(texts), dtype=bool)
+        for word in words:
+            found &= np.array([word in text for text in texts], dtype=bool)
+        mask |= found
+    return mask
+
+
+def single_pass(groups: list, texts: list) -> np.ndarray:
+    """ Поиск всех слов за один проход по тексту. """
+    terms = sorted({word for words in groups for word in words},
+                   key=len, reverse=True)
+    pattern = re.compile('(?=(%s))' % '|'.join(map(re.escape, terms)))
+    mask = np.zeros(len(texts), dtype=bool)
+    for i, text in enumerate(texts):
+        found = {match.group(1) for match in pattern.finditer(text)}
+        # более короткое слово внутри найденного длинного
+        found |= {term for term in terms
+                  if any(term in other for other in found)}
+        mask[i] = any(all(word in found for word in words)
+                      for words in groups)
+    return mask
+
+
+def main(size: int) -> None:
+    texts = make_texts(size)
+    print('%6s %11s %11s %11s' % ('terms', 'matcher ms', 'per-word ms',
+                                  'one pass ms'))
+    for code_words, translation in QUERIES:
+        matcher = MultiTermMatcher.from_query(code_words, translation)
+        groups = [code_words.split(), translation.split()]
+        expected = matcher.mask(texts)
+        assert (per_word(groups, texts) == expected).all()
+        assert (single_pass(groups, texts) == expected).all()
+        print('%6d %11.1f %11.1f %11.1f' % (
+            sum(map(len, groups)),
+            best_time(lambda: MultiTermMatcher.from_query(
+                code_words, translation).mask(texts)) * 1000,
+            best_time(lambda: per_word(groups, texts)) * 1000,
+            best_time(lambda: single_pass(groups, texts), repeat=1) * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZE)
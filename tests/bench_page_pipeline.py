@@ -0,0 +1,54 @@
+import sys
+import time
+
+from conftest import YouTubeStub, best_time, make_item
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Замер загрузки плейлиста по страницам, когда следующие страницы
+# загружаются, пока разбирается текущая: время загрузки
+# всего плейлиста, время только запросов к заглушке API
+# (нижняя граница загрузки) и время до первой страницы.
+# Запуск: python tests/bench_page_pipeline.py [количества страниц]
+# -----------------------------------------------------------
+
+PAGES = [20, 100, 200]  # сколько страниц по 50 видео
+DELAYS = [0.0, 0.02]  # задержка ответа API в секундах
+
+
+def fetch_only(stub: YouTubeStub, pages: int) -> None:
+    """ Запросы всех страниц подряд без разбора ответов. """
+    for page in range(pages):
+        url = ('https://www.googleapis.com/youtube/v3/playlistItems'
+               '?playlistId=PLbench')
+        if page > 0:
+            url += '&pageToken=%d' % (page * 50)
+        stub.get(url).json()
+
+
+def first_page(handler: YouTubePlaylistsHandler) -> None:
+    """ Ожидание первой страницы плейлиста. """
+    tables = handler.stream('PLbench')
+    next(tables)
+    tables.close()
+
+
+def main(pages_list: list) -> None:
+    print('%6s %9s %9s %10s %12s' % ('pages', 'delay ms', 'load s',
+                                     'fetch s', 'first page s'))
+    for pages in pages_list:
+        items = [make_item(i) for i in range(pages * 50)]
+        for delay in DELAYS:
+            stub = YouTubeStub({'PLbench': items}, delay=delay)
+            handler = YouTubePlaylistsHandler('key', http_client=stub)
+            assert len(handler('PLbench')) == len(items)
+            print('%6d %9.0f %9.3f %10.3f %12.3f' % (
+                pages, delay * 1000,
+                best_time(lambda: handler('PLbench')),
+                best_time(lambda: fetch_only(stub, pages)),
+                best_time(lambda: first_page(handler))))
+
+
+if __name__ == '__main__':
+    main([int(pages) for pages in sys.argv[1:]] or PAGES)
@@ -0,0 +1,61 @@
+import sys
+import time
+
+from conftest import DL_KEY_PATH, best_time, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# Замер времени одного поиска по индексам разными способами:
+# дословно, в любом порядке, по релевантности (BM25, лучшие top_k)
+# и с опечатками, по названиям и по названиям с описаниями,
+# а также времени построения индексов и первого поиска с опечатками
+# (он строит индекс частей слов).
+# Запуск: python tests/bench_search_modes.py [размеры плейлистов]
+# -----------------------------------------------------------
+
+SIZES = [5000, 20000]  # сколько видео в плейлисте
+QUERIES = ['лекция семинар', 'python анализ', 'c++ data', 'введение',
+           'ml group', 'матан алгебра']
+MODES = {
+    'verbatim': dict(verbatim_search=True),
+    'any order': dict(verbatim_search=False),
+    'ranked': dict(ranked=True),
+    'fuzzy': dict(fuzzy=True)
+}
+
+
+def mean_time(searcher: DataFrameSearcher, description: bool,
+              mode: dict) -> float:
+    """ Среднее по запросам время поиска в секундах. """
+    return sum(best_time(lambda: searcher(code_words=code_words,
+                                          search_by_description=description,
+                                          **mode))
+               for code_words in QUERIES) / len(QUERIES)
+
+
+def main(sizes: list) -> None:
+    print('%7s %-7s %8s  %s  %11s' % (
+        'videos', 'corpus', 'build s',
+        '  '.join('%9s' % mode for mode in MODES), 'first fuzzy'))
+    for size in sizes:
+        table = PlaylistTable.from_columns(*make_columns(size))
+        start = time.perf_counter()
+        searcher = DataFrameSearcher(table, DL_KEY_PATH)
+        build = time.perf_counter() - start
+        for description in (False, True):
+            start = time.perf_counter()
+            searcher(code_words=QUERIES[0],
+                     search_by_description=description, fuzzy=True)
+            first_fuzzy = time.perf_counter() - start
+            print('%7d %-7s %8.2f  %s  %8.2f ms' % (
+                size, '+desc' if description else 'titles', build,
+                '  '.join('%6.2f ms' % (mean_time(searcher, description,
+                                                  mode) * 1000)
+                          for mode in MODES.values()),
+                first_fuzzy * 1000))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
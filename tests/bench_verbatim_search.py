@@ -0,0 +1,58 @@
+import sys
+import time
+import tracemalloc
+
+from conftest import best_time, make_columns
+from app.clients.TrigramIndex import TrigramIndex
+
+
+# -----------------------------------------------------------
+# Замер дословного поиска по индексу триграмм (TrigramIndex)
+# в сравнении с проверкой 'phrase in text' для каждого текста:
+# время и пиковая память построения индекса, его размер
+# и время одного поиска по названиям и по названиям с описаниями.
+# Запуск: python tests/bench_verbatim_search.py [размеры плейлистов]
+# -----------------------------------------------------------
+
+SIZES = [1000, 10000]  # сколько видео в плейлисте
+PHRASES = ['лекция семинар', 'python анализ', 'c++ data', 'введение в']
+
+
+def scan(texts: list, phrase: str) -> list:
+    """ Поиск фразы проверкой каждого текста. """
+    return [i for i, text in enumerate(texts) if phrase in text]
+
+
+def main(sizes: list) -> None:
+    print('%7s %-10s %9s %9s %9s %9s %9s' % (
+        'videos', 'corpus', 'build ms', 'index MiB', 'peak MiB',
+        'index ms', 'scan ms'))
+    for size in sizes:
+        columns = make_columns(size)
+        titles = [title.lower() for title in columns[2]]
+        corpora = {
+            'title': titles,
+            'title+desc': [title + '###' + description.lower()
+                           for title, description
+                           in zip(titles, columns[3])]
+        }
+        for corpus, texts in corpora.items():
+            tracemalloc.start()
+            start = time.perf_counter()
+            index = TrigramIndex(texts)
+            build = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            for phrase in PHRASES:
+                assert list(index.search(phrase)) == scan(texts, phrase)
+            indexed = sum(best_time(lambda: index.search(phrase))
+                          for phrase in PHRASES) / len(PHRASES)
+            scanned = sum(best_time(lambda: scan(texts, phrase))
+                          for phrase in PHRASES) / len(PHRASES)
+            print('%7d %-10s %9.1f %9.2f %9.1f %9.2f %9.2f' % (
+                size, corpus, build * 1000, index.memory_usage() / 2 ** 20,
+                peak / 2 ** 20, indexed * 1000, scanned * 1000))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or SIZES)
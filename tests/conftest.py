@@ -0,0 +1,186 @@
+from threading import Lock
+from typing import Dict, List, Union
+from urllib.parse import parse_qs, urlparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pytest
+
+
+# -----------------------------------------------------------
+# Общие настройки тестов:
+# > приложение импортируется из временной папки с ключами API
+# (app/views.py при импорте читает ключи и создает файлы в ./files),
+# чтобы тесты не зависели от настоящих ключей и не трогали файлы проекта
+# > make_columns - случайный плейлист для проверок поиска
+# > YouTubeStub - заглушка YouTube Data API v3 (Playlists
+# и PlaylistItems), которая передается в YouTubePlaylistsHandler
+# вместо HttpClient и считает запросы
+# > best_time - время выполнения для замеров в bench_*.py
+# (их pytest не запускает: python tests/bench_<имя>.py).
+# -----------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix='yt-search-tests-')
+os.makedirs(os.path.join(_workdir, 'files'))
+for _name in ('youtube-api-key.txt', 'detectlanguage-api-key.txt'):
+    with open(os.path.join(_workdir, 'files', _name), 'w') as _f:
+        _f.write('test-key')
+os.chdir(_workdir)
+
+# путь к ключу Detect Language API для DataFrameSearcher
+DL_KEY_PATH = os.path.join(_workdir, 'files', 'detectlanguage-api-key.txt')
+
+
+class StubResponse:
+    """ Класс ответа заглушки (как requests.Response). """
+
+    def __init__(self, status_code: int, data: Union[Dict, None] = None,
+                 headers: Union[Dict, None] = None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers if headers is not None else dict()
+
+    def json(self) -> Dict:
+        # каждый раз новый объект, как при разборе настоящего ответа
+        return json.loads(json.dumps(self._data))
+
+
+def make_item(number: int, private=False) -> Dict:
+    """
+    Функция создания видео из ответа PlaylistItems.
+
+    :param number: номер видео (по нему строятся id, название и автор)
+    :param private: приватное ли видео (default False)
+    :return: словарь как в items ответа PlaylistItems
+    """
+    return {
+        'status': {'privacyStatus': 'private' if private else 'public'},
+        'snippet': {
+            'resourceId': {'videoId': 'v%010d' % number},
+            'title': 'Лекция %d lecture' % number,
+            'description': 'Описание %d description' % number,
+            'videoOwnerChannelId': 'UC%d' % (number % 3),
+            'videoOwnerChannelTitle': 'Канал %d' % (number % 3)
+        }
+    }
+
+
+# слова названий и описаний и авторы видео в make_columns
+WORDS = ['лекция', 'семинар', 'python', 'Алгебра', 'анализ', 'Lecture',
+         'seminar', 'group', 'группа', '1', '2', 'c++', 'data', 'дата',
+         'матан', 'intro', 'введение', 'ML']
+CHANNELS = ['Лекторий ФПМИ', 'MIT OpenCourseWare', 'Stanford', 'ШАД',
+            'Computer Science Center']
+
+
+def make_columns(size: int, seed=0) -> list:
+    """
+    Функция создания случайного плейлиста.
+
+    :param size: сколько видео
+    :param seed: начальное значение генератора
+    :return: колонки для PlaylistTable.from_columns
+    """
+    rand = random.Random(seed)
+    columns = [[] for _ in range(6)]
+    for i in range(size):
+        channel = rand.randint(0, 20)
+        row = (i + 1,
+               '%011d' % i,
+               ' '.join(rand.choice(WORDS)
+                        for _ in range(rand.randint(1, 6))),
+               ' '.join(rand.choice(WORDS)
+                        for _ in range(rand.randint(0, 30))),
+               'UC%d' % channel,
+               rand.choice(CHANNELS) + str(channel % 3))
+        for column, value in zip(columns, row):
+            column.append(value)
+    return columns
+
+
+def best_time(function, repeat=3) -> float:
+    """
+    Функция замера времени выполнения (лучшее из нескольких).
+
+    :param function: функция без аргументов
+    :param repeat: сколько раз выполнять (default 3)
+    :return: время в секундах
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class YouTubeStub:
+    """ Класс заглушки YouTube Data API v3 с подсчетом запросов. """
+
+    # коды ответов, при которых HttpClient повторяет запрос
+    retry_statuses = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, playlists: Dict[str, List[Dict]], delay=0.0):
+        """
+        :param playlists: id плейлиста -> видео (как в make_item)
+        :param delay: задержка ответа PlaylistItems в секундах
+            (default 0)
+        """
+        self.playlists = playlists
+        self.delay = delay
+        self.calls = []  # (запрос, id, "номер" страницы)
+        self._lock = Lock()
+
+    def get(self, url: str, headers: Union[Dict, None] = None) \
+            -> StubResponse:
+        path = urlparse(url).path.rsplit('/', 1)[-1]
+        query = {key: values[0]
+                 for key, values in parse_qs(urlparse(url).query).items()}
+        key = query.get('playlistId', query.get('id',
+                                                query.get('channelId')))
+        with self._lock:
+            self.calls.append((path, key, query.get('pageToken')))
+        if path == 'playlists' and 'channelId' in query:
+            return StubResponse(200, {'items': [
+                {'id': playlist_id,
+                 'snippet': {'title': 'Курс ' + playlist_id},
+                 'contentDetails': {'itemCount': len(items)}}
+                for playlist_id, items in self.playlists.items()]})
+        if path == 'playlists':
+            found = int(query['id'] in self.playlists)
+            return StubResponse(200, {'pageInfo': {'totalResults': found}})
+        time.sleep(self.delay)
+        items = self.playlists[query['playlistId']]
+        start = int(query.get('pageToken', '0'))
+        data = {
+            'etag': 'e%d' % start,
+            'pageInfo': {'totalResults': len(items)},
+            'items': items[start:start + 50]
+        }
+        if start + 50 < len(items):
+            data['nextPageToken'] = str(start + 50)
+        return StubResponse(200, data, {'ETag': data['etag']})
+
+    def page_requests(self) -> List:
+        """
+        Функция получения запросов страниц плейлистов.
+
+        :return: список (id плейлиста, "номер" страницы)
+        """
+        with self._lock:
+            return [(key, token) for path, key, token in self.calls
+                    if path == 'playlistItems']
+
+
+@pytest.fixture
+def youtube_stub():
+    """ Заглушка API с одним плейлистом из 600 видео (12 страниц). """
+    return YouTubeStub({'PLshared': [make_item(i) for i in range(600)]},
+                       delay=0.02)
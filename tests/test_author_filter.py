@@ -0,0 +1,59 @@
+from collections import Counter
+
+from conftest import CHANNELS, DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# Авторы хранятся кодами в таблице различных каналов:
+# поиск по автору проверяет только различные каналы
+# и находит те же видео, что и проверка каждой строки,
+# а facet авторов считает видео каждого ника
+# (ник нескольких каналов считается один раз).
+# -----------------------------------------------------------
+
+AUTHORS = ['', 'лекторий', 'mit', 'ШАД', 'center1', 'stanford2', 'нет']
+
+
+def test_author_mask_same_as_rows():
+    columns = make_columns(300)
+    table = PlaylistTable.from_columns(*columns)
+    # каналов меньше, чем видео
+    assert len(table.channels) < len(table)
+    for author in AUTHORS:
+        assert list(table.author_mask(author.lower())) \
+            == [author.lower() in name.lower() for name in columns[5]], \
+            author
+
+
+def test_vectorized_author_search_same_as_rows():
+    table = PlaylistTable.from_columns(*make_columns(300))
+    vectorized = DataFrameSearcher(table, DL_KEY_PATH)
+    by_rows = DataFrameSearcher(table, DL_KEY_PATH, vectorized=False,
+                                indexed=False)
+    for author in AUTHORS:
+        for code_words in ('', 'лекция'):
+            found = [list(searcher(code_words, author_name=author,
+                                   verbatim_search=False)['table'].ind)
+                     for searcher in (vectorized, by_rows)]
+            assert found[0] == found[1], (author, code_words)
+
+
+def test_author_facet_counts():
+    columns = make_columns(300)
+    table = PlaylistTable.from_columns(*columns)
+    counts = Counter(columns[5])
+    facet = table.author_facet()
+
+    assert dict(facet) == counts
+    assert [count for _, count in facet] \
+        == sorted(counts.values(), reverse=True)
+    # у ника несколько каналов
+    assert len(table.channels) > len(counts) >= len(CHANNELS)
+    # в выборке считаются только ее видео
+    part = table.take(table.author_mask('mit'))
+    assert [author for author, _ in part.author_facet()] \
+        == [author for author, _ in facet if 'MIT' in author]
+    assert DataFrameSearcher(table, DL_KEY_PATH).author_facet() == facet
+    assert PlaylistTable.create_empty().author_facet() == []
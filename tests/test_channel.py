@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import StubResponse, YouTubeStub, make_item
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Плейлисты канала загружаются параллельно и объединяются
+# в одну таблицу: видео из нескольких плейлистов остается
+# в первом из них и помнит все, а если плейлист не загрузился,
+# то еще не начатые загрузки отменяются.
+# -----------------------------------------------------------
+
+CHANNEL_ID = 'UC' + 'x' * 22
+
+
+class FailingStub(YouTubeStub):
+    """ Класс заглушки API, которая на запросы видео плейлиста
+        failing_id отвечает ошибкой 500. """
+
+    def __init__(self, *args, failing_id: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failing_id = failing_id
+
+    def get(self, url, headers=None):
+        if 'playlistItems' in url and 'playlistId=%s&' % self.failing_id \
+                in url + '&':
+            return StubResponse(500, {'error': 'backendError'})
+        return super().get(url, headers)
+
+
+def test_channel_playlists_merged():
+    stub = YouTubeStub({
+        'PLa': [make_item(i) for i in range(120)],
+        'PLempty': [],
+        'PLb': [make_item(i) for i in range(100, 180)],
+    }, delay=0.01)
+    progress = []
+    table = YouTubePlaylistsHandler('key', http_client=stub).channel(
+        'https://www.youtube.com/channel/%s?view=0' % CHANNEL_ID,
+        progress=lambda pages, total: progress.append((pages, total)))
+
+    assert [video.video_id for video in table.videos] == \
+        ['v%010d' % i for i in range(180)]
+    assert list(table.extra['playlist_id']) == ['PLa'] * 120 + ['PLb'] * 60
+    # номер видео - в первом плейлисте с ним
+    assert list(table.ind) == list(range(1, 121)) + list(range(21, 81))
+    assert table.extra['sources'][0] == [('PLa', 'Курс PLa', 1)]
+    assert table.extra['sources'][110] == [('PLa', 'Курс PLa', 111),
+                                           ('PLb', 'Курс PLb', 11)]
+    # пустой плейлист - тоже одна страница
+    assert len(progress) == 3 and max(progress) == (6, 6)
+    # каждая страница загружалась один раз
+    requests = stub.page_requests()
+    assert len(requests) == len(set(requests)) == 6
+
+
+def test_failed_playlist_cancels_channel(monkeypatch):
+    monkeypatch.setattr(YouTubePlaylistsHandler, 'channel_workers', 1)
+    stub = FailingStub({'PL%d' % i: [make_item(i)] for i in range(5)},
+                       failing_id='PL0')
+    handler = YouTubePlaylistsHandler('key', http_client=stub)
+
+    with pytest.raises(YouTubePlaylistsHandler.UndefinedError):
+        handler.channel(CHANNEL_ID)
+    # после ошибки остальные плейлисты не загружались
+    assert {playlist_id for playlist_id, token in stub.page_requests()} \
+        <= {'PL0', 'PL1'}
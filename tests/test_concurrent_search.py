@@ -0,0 +1,115 @@
+from itertools import product
+from threading import Event, Lock, Thread
+import time
+
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# Поиск можно вызывать из нескольких потоков, пока плейлист
+# дополняется (append): каждый поиск идет по одному снимку данных,
+# поэтому его результат совпадает с результатом поиска
+# в одном потоке по первым result['rows'] видео плейлиста,
+# а result['rows'] - граница одной из добавленных страниц.
+# -----------------------------------------------------------
+
+SIZE = 400  # сколько видео в плейлисте
+PAGE = 50  # сколько видео на странице
+SEARCH_THREADS = 4
+
+# (ключевые слова, автор, по описанию, дословно, ранжировать, с опечатками)
+QUERIES = list(product(['лекция семинар', 'ml', 'ия###ле', 'c++', ''],
+                       [None, 'шад'],
+                       [False, True],
+                       [False, True],
+                       [False],
+                       [False])) + [
+    ('лекция python', None, True, False, True, False),
+    ('лекцыя семинр', None, False, False, False, True),
+    ('анализ', 'mit', True, True, True, False)
+]
+
+
+def search(searcher: DataFrameSearcher, query: tuple) -> tuple:
+    """
+    Функция поиска.
+
+    :param searcher: класс поиска
+    :param query: параметры поиска (как в QUERIES)
+    :return: (среди скольких видео шел поиск, индексы найденных видео)
+    """
+    code_words, author, description, verbatim, ranked, fuzzy = query
+    result = searcher(code_words=code_words,
+                      author_name=author,
+                      search_by_description=description,
+                      verbatim_search=verbatim,
+                      ranked=ranked,
+                      fuzzy=fuzzy)
+    return result['rows'], list(result['table'].index)
+
+
+def pages(columns: list) -> list:
+    """ Страницы плейлиста (таблицы по PAGE видео). """
+    return [PlaylistTable.from_columns(*(column[begin:begin + PAGE]
+                                         for column in columns))
+            for begin in range(0, SIZE, PAGE)]
+
+
+def test_search_while_appending():
+    columns = make_columns(SIZE, seed=1)
+    # результаты поиска в одном потоке по первым rows видео
+    expected = dict()
+    for rows in range(PAGE, SIZE + 1, PAGE):
+        prefix = DataFrameSearcher(
+            PlaylistTable.from_columns(*(column[:rows]
+                                         for column in columns)),
+            DL_KEY_PATH)
+        for query in QUERIES:
+            expected[query, rows] = search(prefix, query)[1]
+
+    first, *rest = pages(columns)
+    searcher = DataFrameSearcher(first, DL_KEY_PATH)
+    appended = Event()
+    results = []
+    lock = Lock()
+    errors = []
+
+    def append():
+        for table in rest:
+            time.sleep(0.005)
+            searcher.append(table)
+        appended.set()
+
+    def run(shift: int):
+        try:
+            found = []
+            i = shift
+            # ищем, пока плейлист дополняется
+            while not appended.is_set():
+                query = QUERIES[i % len(QUERIES)]
+                found.append((query,) + tuple(search(searcher, query)))
+                i += 1
+            # и еще раз по всему плейлисту
+            for query in QUERIES:
+                found.append((query,) + tuple(search(searcher, query)))
+            with lock:
+                results.extend(found)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [Thread(target=append)] + [
+        Thread(target=run, args=(i * 7,)) for i in range(SEARCH_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for query, rows, indexes in results:
+        assert (query, rows) in expected, rows
+        assert indexes == expected[query, rows], (query, rows)
+    # поиски шли по разным снимкам, в том числе по всему плейлисту
+    seen = {rows for query, rows, indexes in results}
+    assert len(seen) > 1 and SIZE in seen
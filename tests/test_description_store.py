@@ -0,0 +1,87 @@
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.DescriptionStore import DescriptionStore
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# DescriptionStore возвращает те же описания, что были сохранены
+# (в том числе дополненные через extended), распаковывает только
+# блоки с нужными описаниями, а поиск только по названию
+# не распаковывает описания совсем.
+# -----------------------------------------------------------
+
+def descriptions(size: int, seed=0) -> list:
+    """ Случайные описания (и пустые, и с суррогатами). """
+    result = make_columns(size, seed)[3]
+    result[1] = ''
+    result[2] = 'эмодзи \U0001f600 и \ud800 суррогат'
+    return result
+
+
+class Unpacked:
+    """ Класс подсчета распакованных блоков хранилищ. """
+
+    def __init__(self, monkeypatch):
+        self.blocks = []
+        unpack = DescriptionStore._block
+
+        def block(store: DescriptionStore, number: int) -> list:
+            self.blocks.append(number)
+            return unpack(store, number)
+
+        monkeypatch.setattr(DescriptionStore, '_block', block)
+
+
+def test_round_trip():
+    texts = descriptions(100)
+    store = DescriptionStore(texts)
+
+    assert len(store) == 100 and list(store) == texts
+    assert [store[i] for i in (0, 2, 31, 32, 99)] \
+        == [texts[i] for i in (0, 2, 31, 32, 99)]
+    assert store.take([99, 2, 40, 2]) == [texts[i] for i in (99, 2, 40, 2)]
+    assert len(DescriptionStore()) == 0 and list(DescriptionStore()) == []
+    # повторяющиеся слова сжимаются
+    assert store.memory_usage() < sum(len(text.encode('utf-8', 'replace'))
+                                      for text in texts) / 2
+
+
+def test_only_needed_blocks_unpacked(monkeypatch):
+    store = DescriptionStore(descriptions(100))
+    unpacked = Unpacked(monkeypatch)
+    store.take([3, 40, 5, 35])
+
+    assert sorted(unpacked.blocks) == [0, 1]
+
+
+def test_extended_shares_full_blocks():
+    first, second = descriptions(70), descriptions(50, seed=1)
+    store = DescriptionStore(first)
+    extended = store.extended(second[:10]).extended(second[10:])
+
+    assert list(extended) == first + second
+    assert list(store) == first and len(store) == 70
+    # полные блоки общие, неполный последний сжат заново
+    assert extended.blocks[:2] == store.blocks[:2]
+    assert all(new is old for new, old in zip(extended.blocks[:2],
+                                                store.blocks[:2]))
+    assert [len(bounds) - 1 for bounds in extended.bounds] == [32, 32, 32,
+                                                                24]
+    assert list(DescriptionStore().extended(first)) == first
+
+
+def test_title_search_without_descriptions(monkeypatch):
+    searcher = DataFrameSearcher(
+        PlaylistTable.from_columns(*make_columns(200)), DL_KEY_PATH)
+    unpacked = Unpacked(monkeypatch)
+    for verbatim_search in (True, False):
+        searcher('лекция', verbatim_search=verbatim_search)
+    searcher('лекция', ranked=True)
+    searcher('лекция', fuzzy=True)
+    assert unpacked.blocks == []
+
+    # показываемые видео - только блоки с их описаниями
+    table = searcher('лекция', ranked=True, top_k=3)['table']
+    table.to_dict()
+    assert len(unpacked.blocks) <= 3
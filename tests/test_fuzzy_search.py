@@ -0,0 +1,75 @@
+from threading import Barrier, Thread
+import time
+
+from app.clients import TokenIndex as token_index_module
+from app.clients.TokenIndex import TokenIndex
+from app.clients.TrigramIndex import TrigramIndex
+
+
+# -----------------------------------------------------------
+# Поиск с опечатками по обратному индексу: слово совпадает
+# со словами словаря, часть которых отличается от него
+# не больше чем на typos(слово) правок. Индекс по триграммам
+# частей слов строится один раз, даже при одновременных поисках,
+# и дополняется вместе с индексом (extended).
+# -----------------------------------------------------------
+
+TEXTS = ['лекция по алгебре', 'семинар по анализу', 'machine-learning',
+         'лекционный зал', 'кот']
+
+
+def test_typos_found():
+    index = TokenIndex(TEXTS)
+
+    assert list(index.mask_all(['лекцыя'])) == [False] * 5
+    assert list(index.mask_all(['лекцыя'], fuzzy=True)) \
+        == [True, False, False, False, False]
+    # часть слова между знаками препинания
+    assert list(index.search_all(['lerning'], fuzzy=True)) == [2]
+    # по опечатке в двух словах
+    assert list(index.search_all(['семенар', 'аналезу'], fuzzy=True)) \
+        == [1]
+    # в коротких словах опечатки не допускаются
+    assert list(index.search_all(['кит'], fuzzy=True)) == []
+    # подстрока находится и без опечаток
+    assert list(index.search_all(['лекци'], fuzzy=True)) == [0, 3]
+
+
+def test_extended_index_finds_new_words():
+    index = TokenIndex(TEXTS)
+    index.fuzzy_tokens('лекцыя')  # индекс по триграммам построен
+    extended = index.extended(['практикум по статистике'])
+
+    # две опечатки в длинном слове
+    assert list(extended.search_all(['статистеке'], fuzzy=True)) == [5]
+    # старый индекс не изменился
+    assert list(index.search_all(['статистеке'], fuzzy=True)) == []
+
+
+def test_fuzzy_index_built_once(monkeypatch):
+    built = []
+
+    class SlowTrigramIndex(TrigramIndex):
+        def __init__(self, texts):
+            built.append(True)
+            time.sleep(0.05)
+            super().__init__(texts)
+
+    monkeypatch.setattr(token_index_module, 'TrigramIndex',
+                        SlowTrigramIndex)
+    index = TokenIndex(TEXTS)
+    barrier = Barrier(8)
+    results = []
+
+    def search():
+        barrier.wait()
+        results.append(list(index.search_all(['лекцыя'], fuzzy=True)))
+
+    threads = [Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert built == [True]
+    assert results == [[0]] * 8
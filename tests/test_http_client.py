@@ -0,0 +1,183 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import json
+import time
+
+import pytest
+
+from conftest import YouTubeStub, make_item
+from app.clients.HttpClient import HttpClient
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# HttpClient проверяется на локальном сервере, который отвечает
+# как YouTube Data API (YouTubeStub) и может отвечать 503
+# заданное количество раз: соединение переиспользуется,
+# запрос повторяется с задержкой, а если повторы закончились,
+# то YouTubePlaylistsHandler вызывает UndefinedError.
+# Плейлист из 100 страниц загружается по одному соединению,
+# а 99-й перцентиль времени запроса записывается в отчет теста.
+# -----------------------------------------------------------
+
+BIG_SIZE = 5000  # 100 страниц по 50 видео
+
+class LocalServer:
+    """ Класс локального сервера API (HTTP/1.1 с keep-alive). """
+
+    def __init__(self, stub: YouTubeStub):
+        """
+        :param stub: заглушка API, которая формирует ответы
+        """
+        self.stub = stub
+        self.failures = 0  # сколько следующих запросов ответить 503
+        self.requests = []  # (порт клиента, путь, код ответа)
+        self._lock = Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, data = server.respond(self.path)
+                with server._lock:
+                    server.requests.append((self.client_address[1],
+                                            self.path, status))
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d' % self.httpd.server_port
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def respond(self, path: str) -> tuple:
+        """
+        Функция получения ответа на запрос.
+
+        :param path: путь запроса
+        :return: (код ответа, данные ответа)
+        """
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                return 503, {'error': 'backendError'}
+        response = self.stub.get('https://www.googleapis.com' + path)
+        return response.status_code, response.json()
+
+    def ports(self) -> set:
+        """ Порты клиента (разные порты - разные соединения). """
+        with self._lock:
+            return {port for port, path, status in self.requests}
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LocalHttpClient(HttpClient):
+    """
+    Класс HttpClient, отправляющий запросы к API на локальный сервер
+        и запоминающий задержки перед повторами.
+    """
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.delays = []
+        self.latencies = []  # время каждого запроса в секундах
+
+    def request(self, method: str, url: str, **kwargs):
+        url = url.replace('https://www.googleapis.com', self.url)
+        start = time.perf_counter()
+        response = super().request(method, url, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+    def _delay(self, attempt: int, retry_after=None) -> float:
+        delay = super()._delay(attempt, retry_after)
+        self.delays.append(delay)
+        return delay
+
+
+@pytest.fixture
+def server():
+    stub = YouTubeStub({'PLlocal': [make_item(i) for i in range(120)]})
+    local = LocalServer(stub)
+    yield local
+    local.close()
+
+
+@pytest.fixture
+def big_server():
+    stub = YouTubeStub({'PLbig': [make_item(i) for i in range(BIG_SIZE)]})
+    local = LocalServer(stub)
+    yield local
+    local.close()
+
+
+def test_connection_reused(server):
+    client = HttpClient()
+    for _ in range(5):
+        response = client.get(server.url + '/youtube/v3/playlists?id=PLlocal')
+        assert response.status_code == 200
+    assert len(server.requests) == 5
+    assert len(server.ports()) == 1
+
+
+def test_retry_after_503(server):
+    client = LocalHttpClient(server.url, retries=3, backoff=0.05)
+    server.failures = 2
+
+    response = client.get(server.url + '/youtube/v3/playlists?id=PLlocal')
+
+    assert response.status_code == 200
+    assert [status for port, path, status in server.requests] \
+        == [503, 503, 200]
+    # задержка растет: не больше backoff * 2^attempt
+    assert len(client.delays) == 2
+    assert 0 <= client.delays[0] <= 0.05 and 0 <= client.delays[1] <= 0.1
+    # повторы идут по тому же соединению
+    assert len(server.ports()) == 1
+
+
+def test_handler_loads_through_retries(server):
+    client = LocalHttpClient(server.url, retries=2, backoff=0.05)
+    handler = YouTubePlaylistsHandler('key', http_client=client)
+    server.failures = 2
+
+    assert len(handler('PLlocal')) == 120
+    assert len(client.delays) == 2
+
+
+def test_undefined_error_after_retries(server):
+    client = LocalHttpClient(server.url, retries=2, backoff=0.05)
+    handler = YouTubePlaylistsHandler('key', http_client=client)
+    server.failures = 100
+
+    with pytest.raises(YouTubePlaylistsHandler.UndefinedError):
+        handler('PLlocal')
+    # первый запрос и два повтора
+    assert len(server.requests) == 3
+    assert len(client.delays) == 2
+
+
+def test_big_playlist_one_connection(big_server, record_property):
+    client = LocalHttpClient(big_server.url)
+    handler = YouTubePlaylistsHandler('key', http_client=client)
+
+    assert len(handler('PLbig')) == BIG_SIZE
+
+    # информация о плейлисте и 100 страниц
+    assert len(big_server.requests) == 101
+    assert len(big_server.ports()) == 1
+    latencies = sorted(client.latencies)
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    record_property('p99_fetch_latency', p99)
+    assert p99 < 1
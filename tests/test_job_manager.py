@@ -0,0 +1,137 @@
+from threading import Event, Lock
+import time
+
+from app.clients.JobManager import JobManager
+
+
+# -----------------------------------------------------------
+# JobManager выполняет задачи в фоне: задача с ключом уже
+# незаконченной задачи не запускается второй раз, задачи
+# пользователей выполняются раньше фоновых, а приоритет
+# ждущей или выполняющейся фоновой задачи повышается,
+# если такую же задачу запускает пользователь.
+# -----------------------------------------------------------
+
+def wait(job: JobManager.Job, timeout=5.0) -> None:
+    """ Ожидание окончания задачи. """
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def settle(jobs: JobManager, timeout=5.0) -> None:
+    """
+    Ожидание, пока не останется незаконченных задач
+        (задача удаляется после того, как отмечена законченной).
+    """
+    deadline = time.time() + timeout
+    while jobs.metrics()['active'] > 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert jobs.metrics()['active'] == 0
+
+
+class Recorder:
+    """ Класс функции задачи, запоминающей порядок выполнения. """
+
+    def __init__(self):
+        self.order = []
+        self.lock = Lock()
+
+    def __call__(self, job: JobManager.Job, name: str,
+                 gate: Event = None) -> None:
+        if gate is not None:
+            assert gate.wait(5)
+        with self.lock:
+            self.order.append((name, job.priority))
+        job.rows = len(name)
+
+
+def test_same_key_attached():
+    jobs = JobManager(workers=2)
+    gate = Event()
+    recorder = Recorder()
+    first = jobs.submit('PL1', recorder, 'PL1', gate)
+    second = jobs.submit('PL1', recorder, 'PL1', gate)
+    assert second is first
+    gate.set()
+    wait(first)
+    settle(jobs)
+
+    assert first.status == 'done' and first.rows == 3
+    assert recorder.order == [('PL1', JobManager.INTERACTIVE)]
+    assert jobs.metrics() == {'submitted': 1, 'attached': 1, 'active': 0}
+    # законченная задача запускается заново
+    assert jobs.submit('PL1', recorder, 'PL1') is not first
+
+
+def test_interactive_before_background():
+    jobs = JobManager(workers=1)
+    gate = Event()
+    recorder = Recorder()
+    blocker = jobs.submit('blocker', recorder, 'blocker', gate)
+    background = [jobs.submit(name, recorder, name,
+                              priority=JobManager.BACKGROUND)
+                  for name in ('bg1', 'bg2')]
+    user = jobs.submit('user', recorder, 'user')
+    # фоновая задача, которую запустил пользователь, - тоже задача
+    # пользователя (после уже ждущей задачи пользователя)
+    promoted = jobs.submit('bg2', recorder, 'ignored')
+    assert promoted is background[1]
+    gate.set()
+    for job in [blocker, user] + background:
+        wait(job)
+
+    assert recorder.order == [('blocker', JobManager.INTERACTIVE),
+                              ('user', JobManager.INTERACTIVE),
+                              ('bg2', JobManager.INTERACTIVE),
+                              ('bg1', JobManager.BACKGROUND)]
+
+
+def test_running_job_promoted():
+    jobs = JobManager(workers=1)
+    started, gate = Event(), Event()
+    priorities = []
+
+    def task(job: JobManager.Job) -> None:
+        priorities.append(job.priority)
+        started.set()
+        assert gate.wait(5)
+        priorities.append(job.priority)
+
+    job = jobs.submit('PL1', task, priority=JobManager.BACKGROUND)
+    assert started.wait(5)
+    assert jobs.submit('PL1', task) is job
+    gate.set()
+    wait(job)
+
+    assert priorities == [JobManager.BACKGROUND, JobManager.INTERACTIVE]
+
+
+def test_error_message_reported():
+    class MessageError(Exception):
+        message = 'Плейлист недоступен.'
+
+    def failing(job: JobManager.Job, error: Exception) -> None:
+        raise error
+
+    jobs = JobManager(workers=1)
+    with_message = jobs.submit('PL1', failing, MessageError())
+    without_message = jobs.submit('PL2', failing, ValueError())
+    wait(with_message)
+    wait(without_message)
+
+    assert with_message.status == 'failed'
+    assert with_message.to_dict()['error'] == MessageError.message
+    assert without_message.error == JobManager.default_error
+    assert with_message.eta() == 0.0
+
+
+def test_old_finished_jobs_forgotten():
+    jobs = JobManager(workers=1, keep=2)
+    done = [jobs.submit(i, lambda job: None) for i in range(4)]
+    for job in done:
+        wait(job)
+    settle(jobs)
+
+    assert [jobs.get(job.id) for job in done] == [None, None] + done[2:]
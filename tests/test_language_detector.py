@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import StubResponse
+from app.clients.LanguageDetector import LanguageDetector
+from app.clients.TextTranslator import TextTranslator
+
+
+# -----------------------------------------------------------
+# Язык запроса определяется без запросов к API по буквам
+# и служебным словам, а Detect Language API вызывается,
+# только если язык определить нельзя.
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize('text, language', [
+    ('Лекция по алгебре', 'ru'),
+    ('Машинное обучение ML', 'ru'),
+    ('Introduction to machine learning', 'en'),
+    ('the лекция of алгебра', 'en'),
+    ('лекции по python и machine learning', 'ru'),
+    ('Python лекция', None),  # смешанный текст без служебных слов
+    ('Лекція з алгебри', None),  # украинские буквы
+    ('café crème', None),  # буквы с диакритикой
+    ('12345 ###', None),  # нет букв
+])
+def test_detected_language(text, language):
+    assert LanguageDetector()(text) == language
+
+
+class DetectStub:
+    """ Класс заглушки API с подсчетом запросов определения языка. """
+
+    def __init__(self):
+        self.detections = 0
+
+    def post(self, url: str, json=None, headers=None) -> StubResponse:
+        self.detections += 1
+        return StubResponse(200, {'data': {'detections': [
+            {'language': 'en'}]}})
+
+    def get(self, url: str, headers=None) -> StubResponse:
+        return StubResponse(200, {'responseStatus': 200,
+                                  'responseData': {'translatedText': 'x'},
+                                  'matches': [{'translation': 'x'}]})
+
+
+def test_api_only_when_undetected():
+    stub = DetectStub()
+    translator = TextTranslator('key', http_client=stub)
+
+    translator('лекция по алгебре')
+    translator('introduction to algebra')
+    assert stub.detections == 0
+    translator('Python лекция')
+    assert stub.detections == 1
+
+
+def test_offline_detection_disabled():
+    stub = DetectStub()
+    translator = TextTranslator('key', offline_detection=False,
+                                http_client=stub)
+    translator('лекция по алгебре')
+    assert stub.detections == 1
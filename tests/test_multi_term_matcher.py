@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from conftest import WORDS, make_columns
+from app.clients.MultiTermMatcher import MultiTermMatcher
+
+
+# -----------------------------------------------------------
+# MultiTermMatcher находит те же тексты, что и проверка
+# 'word in text' каждого слова каждой группы, в том числе
+# когда слово повторяется в группах или содержится
+# в другом слове группы.
+# -----------------------------------------------------------
+
+def brute_force(texts: list, groups: list) -> list:
+    """ Тексты, в которых есть все слова хотя бы одной группы. """
+    return [any(all(word in text for word in group) for group in groups)
+            for text in texts]
+
+
+def random_groups(rand: random.Random) -> list:
+    """ Случайные группы из слов, их частей и повторов. """
+    words = [word.lower() for word in WORDS] + ['zzz']
+    groups = []
+    for _ in range(rand.randint(1, 3)):
+        group = []
+        for _ in range(rand.randint(1, 4)):
+            word = rand.choice(words + [word for group in groups
+                                        for word in group])
+            begin = rand.randint(0, len(word) - 1)
+            group.append(word[begin:rand.randint(begin + 1, len(word))])
+        groups.append(group)
+    return groups
+
+
+def test_same_as_brute_force():
+    columns = make_columns(300)
+    texts = [(title + '###' + description).lower()
+             for title, description in zip(columns[2], columns[3])]
+    rand = random.Random(0)
+    for _ in range(300):
+        groups = random_groups(rand)
+        assert list(MultiTermMatcher(groups).mask(texts)) \
+            == brute_force(texts, groups), groups
+
+
+def test_shared_and_contained_terms():
+    matcher = MultiTermMatcher([['лекция', 'лек', 'ция', 'лекция'],
+                                ['lecture', 'лекция', 'zzz'], []])
+    # слова, которые содержатся в других словах группы, не ищутся,
+    # а одинаковые слова групп ищутся один раз
+    assert matcher.terms == ['лекция', 'lecture', 'zzz']
+    assert matcher.groups == [(0,), (1, 0, 2), ()]
+
+    texts = ['лекция', 'lecture лекция zzz', '']
+    assert list(MultiTermMatcher([['лекция', 'лек']]).mask(texts)) \
+        == [True, True, False]
+    # пустая группа подходит под любой текст
+    assert matcher.mask(texts).all()
+    assert MultiTermMatcher.from_query('Лекция LECTURE', 'лек zzz')(
+        'lecture лекции') is False
+    assert not np.any(MultiTermMatcher([]).mask(texts))
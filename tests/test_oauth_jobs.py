@@ -0,0 +1,83 @@
+import time
+
+from conftest import YouTubeStub, make_item
+from app import app
+from app import views
+from app.clients.JobManager import JobManager
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Загрузка плейлиста авторизованного пользователя идет
+# в фоновой задаче: учетные данные и идентификатор пользователя
+# берутся из сеанса на странице и передаются в задачу.
+# -----------------------------------------------------------
+
+CREDENTIALS = {'token': 'token', 'refresh_token': 'refresh',
+               'token_uri': 'https://oauth2.googleapis.com/token',
+               'client_id': 'client', 'client_secret': 'secret',
+               'scopes': ['https://www.googleapis.com/auth/youtube']}
+
+
+def wait(job: JobManager.Job, timeout=5.0) -> None:
+    """ Ожидание окончания задачи. """
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def test_oauth_main_loads_in_job(monkeypatch):
+    stub = YouTubeStub({'PLprivate': [make_item(i) for i in range(120)]})
+    table = YouTubePlaylistsHandler('key', http_client=stub)('PLprivate')
+    loads = []
+
+    def oauth_get_all_table(playlist_id, credentials):
+        loads.append((playlist_id, credentials))
+        return table
+
+    handler = views.yt_playlists_handler
+    monkeypatch.setattr(handler, 'client_secret', 'client_secret.json')
+    monkeypatch.setattr(handler, '_oauth_get_all_table',
+                        oauth_get_all_table)
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['credentials'] = dict(CREDENTIALS)
+        session['oauth_identity'] = 'user'
+    response = client.post('/oauth_main', data={'url_or_id': 'PLprivate'})
+
+    assert response.status_code == 302
+    job_id = response.location.rsplit('/', 1)[-1]
+    job = views.jobs.get(job_id)
+    assert job.key == ('PLprivate', 'user')
+    wait(job)
+    assert job.status == 'done' and job.rows == 120
+    assert loads == [('PLprivate', CREDENTIALS)]
+    # класс поиска доступен только этому пользователю
+    assert views.searchers.get('PLprivate', 'user') is not None
+    assert views.searchers.get('PLprivate') is None
+    page = client.get(response.location).get_data(as_text=True)
+    assert '/search/PLprivate' in page
+
+
+def test_oauth_error_reported_by_job(monkeypatch):
+    def oauth_get_all_table(playlist_id, credentials):
+        raise YouTubePlaylistsHandler.OAuthUndefinedError
+
+    handler = views.yt_playlists_handler
+    monkeypatch.setattr(handler, 'client_secret', 'client_secret.json')
+    monkeypatch.setattr(handler, '_oauth_get_all_table',
+                        oauth_get_all_table)
+    monkeypatch.setitem(app.config, 'WTF_CSRF_ENABLED', False)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['credentials'] = dict(CREDENTIALS)
+    response = client.post('/oauth_main', data={'url_or_id': 'PLbroken'})
+
+    job = views.jobs.get(response.location.rsplit('/', 1)[-1])
+    wait(job)
+    assert job.status == 'failed'
+    assert job.error == YouTubePlaylistsHandler.OAuthUndefinedError.message
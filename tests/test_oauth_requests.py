@@ -0,0 +1,68 @@
+import googleapiclient.discovery
+import googleapiclient.http
+
+from conftest import YouTubeStub, make_item
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Загрузка плейлиста через OAuth: каждая страница запрашивается
+# один раз (HttpRequest.execute), а класс для работы с запросами
+# создается один раз для учетных данных (discovery.build).
+# Запросы к API заменены заглушкой YouTubeStub.
+# -----------------------------------------------------------
+
+CREDENTIALS = {'token': 'token', 'refresh_token': 'refresh',
+               'token_uri': 'https://oauth2.googleapis.com/token',
+               'client_id': 'client', 'client_secret': 'secret'}
+
+
+def stub_google_api(monkeypatch, stub: YouTubeStub) -> list:
+    """
+    Функция замены запросов библиотеки Google API на заглушку.
+
+    :param monkeypatch: фикстура pytest
+    :param stub: заглушка API
+    :return: список, куда записываются учетные данные
+        при каждом создании класса для работы с запросами
+    """
+    builds = []
+    build = googleapiclient.discovery.build
+
+    def counted_build(*args, **kwargs):
+        builds.append(kwargs['credentials'].token)
+        return build(*args, **kwargs)
+
+    def execute(request, *args, **kwargs):
+        return stub.get(request.uri).json()
+
+    monkeypatch.setattr(googleapiclient.discovery, 'build', counted_build)
+    monkeypatch.setattr(googleapiclient.http.HttpRequest, 'execute',
+                        execute)
+    return builds
+
+
+def test_one_execute_per_page(monkeypatch):
+    stub = YouTubeStub({'PLprivate': [make_item(i) for i in range(120)]})
+    stub_google_api(monkeypatch, stub)
+    handler = YouTubePlaylistsHandler('key', http_client=stub)
+
+    table = handler._oauth_get_all_table('PLprivate', CREDENTIALS)
+
+    assert len(table) == 120
+    assert stub.page_requests() == [('PLprivate', None),
+                                    ('PLprivate', '50'),
+                                    ('PLprivate', '100')]
+
+
+def test_one_build_per_credentials(monkeypatch):
+    stub = YouTubeStub({'PLprivate': [make_item(i) for i in range(120)]})
+    builds = stub_google_api(monkeypatch, stub)
+    handler = YouTubePlaylistsHandler('key', http_client=stub)
+    other = dict(CREDENTIALS, token='other')
+
+    for credentials in (CREDENTIALS, CREDENTIALS, other, CREDENTIALS):
+        assert len(handler('PLprivate', credentials=credentials)) == 120
+
+    assert builds == ['token', 'other']
+    assert len(stub.page_requests()) == 4 * 3
@@ -0,0 +1,54 @@
+import time
+
+from conftest import YouTubeStub, make_item
+from app.clients.QuotaLedger import QuotaLedger
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Страницы плейлиста загружаются в отдельном потоке, пока
+# предыдущие разбираются: порядок страниц сохраняется,
+# а если страницы больше не нужны, то поток заканчивается
+# до возврата резерва квоты загрузки.
+# -----------------------------------------------------------
+
+def test_pages_in_order(youtube_stub):
+    handler = YouTubePlaylistsHandler('key', http_client=youtube_stub)
+
+    tables = list(handler.stream('PLshared'))
+
+    assert [len(table) for table in tables] == [50] * 12
+    numbers = [number for table in tables for number in table.ind]
+    assert numbers == list(range(1, 601))
+
+
+def test_fetch_overlaps_parsing():
+    stub = YouTubeStub({'PLslow': [make_item(i) for i in range(500)]},
+                       delay=0.05)
+    handler = YouTubePlaylistsHandler('key', http_client=stub)
+
+    started = time.monotonic()
+    for table in handler.stream('PLslow'):
+        time.sleep(0.05)  # "разбор" страницы
+    elapsed = time.monotonic() - started
+
+    # без конвейера было бы 10 * (0.05 + 0.05) секунд
+    assert elapsed < 0.85
+
+
+def test_early_exit_settles_quota(youtube_stub):
+    quota = QuotaLedger()
+    handler = YouTubePlaylistsHandler('key', http_client=youtube_stub,
+                                      quota=quota)
+
+    for table in handler.stream('PLshared'):
+        break
+    # сразу после закрытия итератора все запросы учтены,
+    # а весь резерв возвращен
+    requests = len(youtube_stub.calls)
+    usage = quota.usage()
+    assert usage['reserved'] == 0
+    assert usage['used'] == requests
+    # и запросов больше нет
+    time.sleep(0.1)
+    assert len(youtube_stub.calls) == requests
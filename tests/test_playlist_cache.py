@@ -0,0 +1,110 @@
+from hashlib import sha1
+import json
+import os
+
+from conftest import StubResponse, YouTubeStub, make_item
+from app.clients.PlaylistCache import PlaylistCache
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Загруженные страницы плейлиста хранятся в PlaylistCache:
+# свежие используются без запросов к API, устаревшие
+# перепроверяются по ETag (ответ 304 - страница из кэша),
+# а при превышении размера удаляются плейлисты,
+# к которым дольше всего не обращались.
+# -----------------------------------------------------------
+
+class RevalidatingStub(YouTubeStub):
+    """
+    Класс заглушки API, у страниц которой ETag зависит от видео
+        и которая отвечает 304, если страница не изменилась.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.not_modified = 0  # сколько было ответов 304
+        self.revalidated = 0  # сколько запросов с If-None-Match
+
+    def get(self, url, headers=None):
+        response = super().get(url, headers)
+        if 'ETag' not in response.headers:
+            return response
+        data = response.json()
+        etag = sha1(json.dumps(data['items']).encode()).hexdigest()
+        data['etag'] = etag
+        if headers and 'If-None-Match' in headers:
+            self.revalidated += 1
+            if headers['If-None-Match'] == etag:
+                self.not_modified += 1
+                return StubResponse(304, None, {'ETag': etag})
+        return StubResponse(200, data, {'ETag': etag})
+
+
+def titles(table) -> list:
+    """ Названия видео таблицы. """
+    return [video.title for video in table.videos]
+
+
+def handler_with_cache(tmp_path, ttl=60) -> tuple:
+    """ Заглушка API, кэш и класс загрузки с этим кэшем. """
+    stub = RevalidatingStub({'PLc': [make_item(i) for i in range(120)]})
+    cache = PlaylistCache(str(tmp_path), ttl=ttl)
+    handler = YouTubePlaylistsHandler('key', http_client=stub, cache=cache)
+    return stub, cache, handler
+
+
+def test_fresh_cache_without_requests(tmp_path):
+    stub, cache, handler = handler_with_cache(tmp_path)
+    first = handler('PLc')
+    calls = len(stub.calls)
+
+    assert titles(handler('PLc')) == titles(first)
+    assert len(stub.calls) == calls
+
+
+def test_stale_pages_revalidated_by_etag(tmp_path):
+    stub, cache, handler = handler_with_cache(tmp_path, ttl=0)
+    first = handler('PLc')
+    stub.calls.clear()
+    stub.playlists['PLc'][60] = make_item(1000)
+
+    second = handler('PLc')
+
+    # проверка доступности не нужна, все страницы перепроверены
+    assert [path for path, key, token in stub.calls] \
+        == ['playlistItems'] * 3
+    assert stub.revalidated == 3 and stub.not_modified == 2
+    assert titles(second)[60] == 'Лекция 1000 lecture'
+    assert titles(second)[:60] == titles(first)[:60]
+    page = cache.get('PLc')['pages'][1]
+    assert page['data']['items'][10] == make_item(1000)
+
+
+def test_force_refresh_skips_cache(tmp_path):
+    stub, cache, handler = handler_with_cache(tmp_path, ttl=0)
+    handler('PLc')
+    stub.calls.clear()
+
+    handler('PLc', force_refresh=True)
+
+    assert stub.revalidated == 0
+    assert [path for path, key, token in stub.calls] \
+        == ['playlists'] + ['playlistItems'] * 3
+
+
+def test_least_recently_used_evicted(tmp_path):
+    pages = [{'page_token': None, 'etag': 'e',
+              'data': {'items': [make_item(i) for i in range(50)]}}]
+    cache = PlaylistCache(str(tmp_path))
+    cache.put('PL1', pages)
+    cache.max_bytes = int(os.path.getsize(cache._path('PL1')) * 2.5)
+    cache.put('PL2', pages)
+    # к PL2 обращались раньше, чем к PL1
+    os.utime(cache._path('PL2'), (1, 1))
+    os.utime(cache._path('PL1'), (2, 2))
+    cache.put('PL3', pages)
+
+    assert cache.get('PL2') is None
+    assert cache.get('PL1')['pages'] == pages
+    assert cache.get('PL3') is not None
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_columns
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.VideoStore import VideoStore
+
+
+# -----------------------------------------------------------
+# PlaylistTable хранит только id, тексты и коды авторов,
+# а строки (row, rows, to_dict) совпадают со строками прежней
+# таблицы pandas со ссылками; выборка сохраняет номера строк,
+# а объединение нумерует строки заново и пересчитывает коды авторов.
+# -----------------------------------------------------------
+
+def expected_rows(columns: list) -> list:
+    """ Строки таблицы со ссылками, построенные по колонкам. """
+    return [{
+        'ind': ind,
+        'url': 'https://www.youtube.com/watch?v=' + video_id,
+        'img_url': 'https://img.youtube.com/vi/%s/0.jpg' % video_id,
+        'title': title,
+        'description': description,
+        'author_url': 'https://www.youtube.com/channel/' + channel_id,
+        'author': author
+    } for ind, video_id, title, description, channel_id, author
+        in zip(*columns)]
+
+
+def test_rows_same_as_columns():
+    columns = make_columns(200)
+    table = PlaylistTable.from_columns(*columns)
+    rows = expected_rows(columns)
+
+    assert list(table.rows()) == rows
+    assert table.row(17) == rows[17]
+    assert table.to_dict() == dict(enumerate(rows))
+    assert [row['description'] for row in table.rows(descriptions=False)] \
+        == [None] * 200
+    # таблица меньше таблицы pandas с теми же строками
+    frame = pd.DataFrame(rows)
+    assert table.memory_usage() < frame.memory_usage(deep=True).sum()
+
+
+def test_take_keeps_row_numbers():
+    columns = make_columns(200)
+    table = PlaylistTable.from_columns(*columns)
+    rows = expected_rows(columns)
+    part = table.take(np.array([150, 3, 77]))
+
+    assert list(part.index) == [150, 3, 77]
+    assert part.to_dict() == {i: rows[i] for i in (150, 3, 77)}
+    mask = np.zeros(200, dtype=bool)
+    mask[[5, 6]] = True
+    assert list(table.take(mask).rows()) == rows[5:7]
+    assert not part.is_whole() and table.is_whole()
+
+
+def test_concat_renumbers_rows():
+    first, second = make_columns(120), make_columns(80, seed=1)
+    second[0] = [ind + 120 for ind in second[0]]
+    store = VideoStore()
+    tables = [PlaylistTable.from_columns(*first, store=store),
+              PlaylistTable.from_columns(*second, store=store)]
+    marked = tables[1].with_column('playlist_id', ['PL1'] * 80)
+    merged = PlaylistTable.concat([tables[0], marked.take(
+        np.arange(80)[::-1])])
+
+    assert 'playlist_id' not in tables[1].extra
+    assert list(merged.index) == list(range(200))
+    assert list(merged.rows()) == [
+        dict(row, playlist_id=None) for row in expected_rows(first)] + [
+        dict(row, playlist_id='PL1')
+        for row in expected_rows(second)[::-1]]
+    # каналы обоих плейлистов хранятся один раз
+    assert len(merged.channels) == len(set(tables[0].channels)
+                                       | set(tables[1].channels))
+    # коды авторов пересчитаны (порядок равных в facet может отличаться)
+    assert dict(merged.take(np.arange(120, 200)).author_facet()) \
+        == dict(tables[1].author_facet())
+
+
+def test_empty_table():
+    table = PlaylistTable.create_empty()
+    assert table.empty and list(table.rows()) == [] \
+        and table.to_dict() == {}
+    assert len(PlaylistTable.concat([table, PlaylistTable.from_columns(
+        *make_columns(3))])) == 3
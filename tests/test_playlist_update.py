@@ -0,0 +1,89 @@
+from threading import Barrier, Thread
+
+from conftest import DL_KEY_PATH, YouTubeStub, make_item
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistCache import PlaylistCache
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Плейлист, в который видео добавлялись только в конец, дополняется
+# (update) загрузкой первой, последней сохраненной и новых страниц;
+# дополнение - общая загрузка плейлиста, поэтому одновременные
+# загрузки этого плейлиста не загружают страницы еще раз.
+# -----------------------------------------------------------
+
+def loaded(tmp_path, delay=0.0) -> tuple:
+    """
+    Функция загрузки плейлиста из 120 видео в кэш
+        (данные в кэше сразу устаревают).
+
+    :param tmp_path: папка для кэша
+    :param delay: задержка ответа API в секундах (default 0)
+    :return: (заглушка API, класс загрузки, кэш, класс поиска)
+    """
+    stub = YouTubeStub({'PLgrow': [make_item(i) for i in range(120)]},
+                       delay=delay)
+    cache = PlaylistCache(str(tmp_path), ttl=0)
+    handler = YouTubePlaylistsHandler('key', http_client=stub, cache=cache)
+    searcher = DataFrameSearcher(handler('PLgrow'), DL_KEY_PATH)
+    stub.calls.clear()
+    return stub, handler, cache, searcher
+
+
+def test_update_loads_only_new_pages(tmp_path):
+    stub, handler, cache, searcher = loaded(tmp_path)
+    stub.playlists['PLgrow'] += [make_item(i) for i in range(120, 180)]
+
+    assert handler.update('PLgrow', searcher)
+
+    assert len(searcher.table) == 180
+    assert list(searcher.table.ind) == list(range(1, 181))
+    # первая, последняя сохраненная и новая страницы
+    assert stub.page_requests() == [('PLgrow', None), ('PLgrow', '100'),
+                                    ('PLgrow', '150')]
+    assert len(cache.get('PLgrow')['pages']) == 4
+
+
+def test_changed_playlist_reloaded_into_cache(tmp_path):
+    stub, handler, cache, searcher = loaded(tmp_path)
+    stub.playlists['PLgrow'][0] = make_item(1000)
+
+    assert not handler.update('PLgrow', searcher)
+
+    pages = cache.get('PLgrow')['pages']
+    assert pages[0]['data']['items'][0] == make_item(1000)
+    assert len(stub.page_requests()) == 1 + 3
+
+
+def test_update_and_load_share_pages(tmp_path):
+    stub, handler, cache, searcher = loaded(tmp_path, delay=0.02)
+    stub.playlists['PLgrow'] += [make_item(i) for i in range(120, 180)]
+    writes = []
+    put = cache.put
+    cache.put = lambda *args: writes.append(args[0]) or put(*args)
+    results = [None, None]
+    barrier = Barrier(2)
+
+    def update():
+        barrier.wait()
+        results[0] = handler.update('PLgrow', searcher)
+
+    def stream():
+        barrier.wait()
+        results[1] = sum(len(table) for table in handler.stream('PLgrow'))
+
+    threads = [Thread(target=update), Thread(target=stream)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True, 180]
+    assert len(searcher.table) == 180
+    # страницы загружены одной загрузкой (дополнением или загрузкой
+    # с перепроверкой всех страниц) и сохранены в кэш один раз
+    assert handler.single_flight.metrics()['executions'] == 1 + 1
+    pages = stub.page_requests()
+    assert len(pages) == len(set(pages)) <= 4
+    assert writes == ['PLgrow']
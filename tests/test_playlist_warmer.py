@@ -0,0 +1,86 @@
+from threading import Lock
+import time
+
+from app.clients.JobManager import JobManager
+from app.clients.PlaylistWarmer import PlaylistWarmer
+
+
+# -----------------------------------------------------------
+# PlaylistWarmer считает поиски по плейлистам (счетчики сохраняются
+# в файл) и загружает самые популярные плейлисты фоновыми задачами,
+# не больше concurrency одновременно.
+# -----------------------------------------------------------
+
+class Loads:
+    """ Класс функции загрузки, запоминающей загрузки плейлистов. """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.loaded = []  # (id плейлиста, приоритет задачи)
+        self.running = 0  # сколько загрузок идет сейчас
+        self.max_running = 0  # сколько загрузок шло одновременно
+        self.lock = Lock()
+
+    def __call__(self, job: JobManager.Job, playlist_id: str,
+                 url_or_id: str, force_refresh: bool) -> None:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+            self.loaded.append((playlist_id, job.priority))
+
+
+def hits(warmer: PlaylistWarmer, counts: dict) -> None:
+    """ Учет поисков: id плейлиста -> сколько раз искали. """
+    for playlist_id, count in counts.items():
+        for _ in range(count):
+            warmer.hit(playlist_id)
+
+
+def test_popular_playlists_loaded_in_background():
+    loads = Loads()
+    warmer = PlaylistWarmer(JobManager(workers=4), loads, top=4,
+                            concurrency=2)
+    hits(warmer, {'PL%d' % i: i for i in range(1, 7)})
+    assert warmer.popular() == ['PL6', 'PL5', 'PL4', 'PL3']
+
+    warmer.refresh()
+    deadline = time.time() + 5
+    while len(loads.loaded) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert sorted(loads.loaded) == [('PL%d' % i, JobManager.BACKGROUND)
+                                    for i in range(3, 7)]
+    assert loads.max_running == 2
+    assert warmer.metrics() == {'popular': ['PL6', 'PL5', 'PL4', 'PL3'],
+                                'rounds': 1, 'refreshes': 4}
+
+
+def test_counts_saved_and_loaded(tmp_path):
+    path = str(tmp_path / 'warmup.json')
+    warmer = PlaylistWarmer(JobManager(), Loads(), path, top=2)
+    hits(warmer, {'PLa': 1, 'PLb': 3, 'PLc': 2})
+    warmer._save()
+
+    assert PlaylistWarmer(JobManager(), Loads(), path, top=2).popular() \
+        == ['PLb', 'PLc']
+
+
+def test_least_popular_forgotten():
+    warmer = PlaylistWarmer(JobManager(), Loads(), top=100, max_tracked=4)
+    hits(warmer, {'PL1': 5, 'PL2': 4, 'PL3': 3, 'PL4': 2, 'PL5': 1})
+
+    assert warmer.popular() == ['PL1', 'PL2']
+
+
+def test_stop_interrupts_refresh():
+    loads = Loads(delay=0.3)
+    warmer = PlaylistWarmer(JobManager(workers=4), loads, top=5,
+                            concurrency=1)
+    hits(warmer, {'PL%d' % i: i for i in range(5)})
+    warmer.stop()
+    warmer.refresh()
+
+    assert warmer.refreshes == 0
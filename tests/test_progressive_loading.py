@@ -0,0 +1,123 @@
+from threading import Event, Thread
+import json
+import time
+
+from conftest import DL_KEY_PATH, StubResponse, YouTubeStub, make_item
+from app import app
+from app import views
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.JobManager import JobManager
+from app.clients.SearcherRegistry import SearcherRegistry
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Искать по плейлисту можно уже после первой страницы:
+# задача загрузки сохраняет класс поиска, пока остальные страницы
+# загружаются, поток результатов (/search/<id>/stream) присылает
+# найденные видео с новых страниц, а если загрузка прервалась,
+# то по загруженным видео все равно можно искать.
+# -----------------------------------------------------------
+
+class GatedStub(YouTubeStub):
+    """
+    Класс заглушки API, которая отвечает на запросы страниц
+        после первой, только когда открыт gate, а на запрос страницы
+        failing_token - ошибкой 500.
+    """
+
+    def __init__(self, *args, failing_token=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = Event()
+        self.failing_token = failing_token
+
+    def get(self, url, headers=None):
+        if 'pageToken=' in url:
+            assert self.gate.wait(5)
+            if 'pageToken=%s&' % self.failing_token in url + '&':
+                return StubResponse(500, {'error': 'backendError'})
+        return super().get(url, headers)
+
+
+def wait(condition, timeout=5.0) -> None:
+    """ Ожидание выполнения условия. """
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def start_load(monkeypatch, stub: GatedStub) -> JobManager.Job:
+    """ Запуск задачи загрузки плейлиста PLprog через заглушку API. """
+    monkeypatch.setattr(views, 'yt_playlists_handler',
+                        YouTubePlaylistsHandler('key', http_client=stub))
+    monkeypatch.setattr(views, 'searchers', SearcherRegistry())
+    job = JobManager(workers=1).submit('PLprog', views.load_playlist,
+                                       'PLprog', 'PLprog', False)
+    wait(lambda: job.ready or job.finished)
+    return job
+
+
+def found(searcher: DataFrameSearcher) -> list:
+    """ Номера видео, найденных по запросу '1'. """
+    return list(searcher('1', verbatim_search=False)['table'].ind)
+
+
+def events(body: str) -> list:
+    """ Сообщения Server-Sent Events: список (тип, данные). """
+    result = []
+    for message in body.strip().split('\n\n'):
+        event, data = message.split('\n')
+        result.append((event[len('event: '):],
+                       json.loads(data[len('data: '):])))
+    return result
+
+
+def test_search_while_loading(monkeypatch):
+    items = [make_item(i) for i in range(300)]
+    stub = GatedStub({'PLprog': items})
+    job = start_load(monkeypatch, stub)
+
+    searcher = views.searchers.get('PLprog')
+    assert job.ready and not job.finished
+    assert searcher.loading and len(searcher.table) == 50
+    assert searcher('1', verbatim_search=False)['rows'] == 50
+
+    client = app.test_client()
+    body = []
+    reader = Thread(target=lambda: body.append(client.get(
+        '/search/PLprog/stream?rows=0&code_words=1&verbatim_search=0'
+    ).get_data(as_text=True)))
+    reader.start()
+    stub.gate.set()
+    reader.join(10)
+    wait(lambda: job.finished)
+
+    assert job.status == 'done' and job.rows == 300
+    assert not searcher.loading and searcher.load_error is None
+    complete = DataFrameSearcher(
+        YouTubePlaylistsHandler('key', http_client=YouTubeStub(
+            {'PLprog': items}))('PLprog'), DL_KEY_PATH)
+    assert found(searcher) == found(complete)
+    # поток прислал все найденные видео и закончился
+    messages = events(body[0])
+    assert sum(data['found'] for event, data in messages
+               if event == 'results') == len(found(complete))
+    assert messages[-1] == ('progress', {'rows': 300, 'complete': True,
+                                         'error': None})
+
+
+def test_loaded_rows_searchable_after_error(monkeypatch):
+    stub = GatedStub({'PLprog': [make_item(i) for i in range(300)]},
+                     failing_token='150')
+    job = start_load(monkeypatch, stub)
+    stub.gate.set()
+    wait(lambda: job.finished)
+
+    searcher = views.searchers.get('PLprog')
+    assert job.status == 'failed'
+    assert job.error == YouTubePlaylistsHandler.UndefinedError.message
+    assert not searcher.loading
+    assert searcher.load_error == job.error
+    assert len(searcher.table) == 150
+    assert found(searcher) == [i + 1 for i in range(150) if '1' in str(i)]
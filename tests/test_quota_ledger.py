@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.clients.QuotaLedger import QuotaLedger
+
+
+# -----------------------------------------------------------
+# QuotaLedger резервирует квоту за загрузками, не отдает фоновым
+# загрузкам резерв пользователей, возвращает неиспользованный резерв,
+# сохраняет расход в файл и обнуляет его в полночь
+# по тихоокеанскому времени (с учетом летнего времени).
+# -----------------------------------------------------------
+
+def test_reservation_released():
+    ledger = QuotaLedger(daily_limit=100, background_reserve=0)
+    with ledger.reserve() as reservation:
+        reservation.add(10)
+        assert ledger.remaining() == 90
+        for _ in range(3):
+            reservation.spend('playlistItems')
+        assert ledger.usage()['reserved'] == 7
+    usage = ledger.usage()
+    assert usage['used'] == 3 and usage['reserved'] == 0
+    assert usage['by_endpoint'] == {'playlistItems': 3}
+    assert ledger.remaining() == 97
+
+
+def test_concurrent_reservations_cannot_exceed_limit():
+    ledger = QuotaLedger(daily_limit=20, background_reserve=0)
+    first = ledger.reserve()
+    first.add(15)
+    with pytest.raises(QuotaLedger.ExceededError):
+        ledger.reserve().add(6)
+    first.release()
+    ledger.reserve().add(20)
+
+
+def test_background_reserve():
+    ledger = QuotaLedger(daily_limit=20, background_reserve=15)
+    with pytest.raises(QuotaLedger.ExceededError):
+        ledger.reserve(background=True).add(6)
+    with pytest.raises(QuotaLedger.ExceededError):
+        ledger.check(6, background=True)
+    ledger.check(20)
+    ledger.reserve(background=True).add(5)
+    ledger.reserve().add(15)
+
+
+def test_day_rollover(monkeypatch):
+    ledger = QuotaLedger(daily_limit=100)
+    monkeypatch.setattr(ledger, '_today', lambda: '2026-03-07')
+    ledger.record('playlists', 5)
+    assert ledger.usage()['used'] == 5
+    monkeypatch.setattr(ledger, '_today', lambda: '2026-03-08')
+    usage = ledger.usage()
+    assert usage['day'] == '2026-03-08' and usage['used'] == 0
+
+
+def test_saved_for_current_day(tmp_path, monkeypatch):
+    path = str(tmp_path / 'quota.json')
+    ledger = QuotaLedger(path, daily_limit=100)
+    ledger.record('playlistItems', 4)
+    ledger.record('playlists')
+    ledger.flush()
+
+    assert QuotaLedger(path, daily_limit=100).usage()['by_endpoint'] \
+        == {'playlistItems': 4, 'playlists': 1}
+    # расход прошлого дня не загружается
+    monkeypatch.setattr(QuotaLedger, '_today', lambda self: '2000-01-01')
+    assert QuotaLedger(path, daily_limit=100).usage()['used'] == 0
+
+
+@pytest.mark.parametrize('utc, day', [
+    # зимой полночь в Лос-Анджелесе - 08:00 UTC
+    (datetime(2026, 1, 15, 7, 30), '2026-01-14'),
+    (datetime(2026, 1, 15, 8, 30), '2026-01-15'),
+    # летом - 07:00 UTC
+    (datetime(2026, 7, 1, 6, 30), '2026-06-30'),
+    (datetime(2026, 7, 1, 7, 30), '2026-07-01')
+])
+def test_quota_day_follows_daylight_saving(utc, day):
+    now = utc.replace(tzinfo=timezone.utc)
+    assert now.astimezone(QuotaLedger.quota_timezone).strftime('%Y-%m-%d') \
+        == day
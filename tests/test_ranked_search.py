@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.TokenIndex import TokenIndex
+
+
+# -----------------------------------------------------------
+# Оценки BM25 по обратному индексу совпадают с оценками,
+# посчитанными по каждой строке (слово запроса совпадает
+# со всеми словами, которые его содержат), а поиск
+# по релевантности возвращает top_k лучших видео в том же порядке,
+# что и сортировка всех оценок (при равных - по порядку в плейлисте).
+# -----------------------------------------------------------
+
+QUERIES = [['лекция'], ['python', 'анализ'], ['ия'], ['c++', 'ml', 'ml'],
+           ['семинар', 'zzz'], ['zzz']]
+
+
+def brute_force(texts: list, words: list) -> list:
+    """ Оценки BM25 каждой строки. """
+    lengths = [len(text.split()) for text in texts]
+    mean = max(sum(lengths) / len(texts), 1)
+    k1, b = TokenIndex.bm25_k1, TokenIndex.bm25_b
+    scores = [0.0] * len(texts)
+    for word in set(words):
+        frequencies = [sum(word in token for token in text.split())
+                       for text in texts]
+        found = sum(frequency > 0 for frequency in frequencies)
+        idf = math.log(1 + (len(texts) - found + 0.5) / (found + 0.5))
+        for i, frequency in enumerate(frequencies):
+            scores[i] += idf * frequency * (k1 + 1) / (
+                frequency + k1 * (1 - b + b * lengths[i] / mean))
+    return scores
+
+
+def best(scores: list, top_k: int) -> list:
+    """ Номера строк top_k лучших оценок после сортировки всех. """
+    found = [i for i, score in enumerate(scores) if score > 0]
+    return sorted(found, key=lambda i: (-scores[i], i))[:top_k]
+
+
+def test_bm25_same_as_brute_force():
+    columns = make_columns(300)
+    texts = [(title + ' ' + description).lower()
+             for title, description in zip(columns[2], columns[3])]
+    index = TokenIndex(texts[:200]).extended(texts[200:])
+    for words in QUERIES:
+        assert np.allclose(index.bm25(words), brute_force(texts, words)), \
+            words
+
+
+def test_top_k_same_as_full_sort():
+    columns = make_columns(300)
+    titles = [title.lower() for title in columns[2]]
+    searcher = DataFrameSearcher(PlaylistTable.from_columns(*columns),
+                                 DL_KEY_PATH)
+    for words in QUERIES:
+        scores = brute_force(titles, words)
+        for top_k in (1, 20, 300):
+            table = searcher(' '.join(words), ranked=True,
+                             top_k=top_k)['table']
+            assert [ind - 1 for ind in table.ind] == best(scores, top_k), \
+                (words, top_k)
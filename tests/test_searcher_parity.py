@@ -0,0 +1,65 @@
+from itertools import product
+
+import pytest
+
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+
+
+# -----------------------------------------------------------
+# Все способы поиска должны находить одни и те же видео:
+# построчный поиск (vectorized=False) - эталон, с ним сравниваются
+# поиск по колонкам без индексов (indexed=False), поиск с индексами
+# и поиск с индексами по плейлисту, загруженному по страницам (append).
+# -----------------------------------------------------------
+
+QUERIES = ['лекция семинар', 'семинар лекция', 'ml ml', 'ция\x00',
+           'ии###ссс', 'ия###ле', 'ion c++', '', 'лекция', 'Лекция семинар',
+           'python анализ', 'ML', 'c++', 'a', 'на', 'лекция###', '###',
+           'e s', 'ия', 'zzz', 'Group 1']
+AUTHORS = [None, '', 'шад', 'mit', 'Stanford1', 'xx']
+# перевод запроса (None - без двуязычного поиска)
+TRANSLATIONS = [None, 'seminar group', 'Intro']
+
+SIZE = 400  # сколько видео в плейлисте
+PAGE = 50  # сколько видео на странице
+
+
+@pytest.fixture(scope='module')
+def searchers() -> list:
+    """ Эталонный поиск и поиски, которые с ним сравниваются. """
+    columns = make_columns(SIZE)
+    table = PlaylistTable.from_columns(*columns)
+    paged = None
+    for begin in range(0, SIZE, PAGE):
+        page = PlaylistTable.from_columns(*(column[begin:begin + PAGE]
+                                            for column in columns))
+        if paged is None:
+            paged = DataFrameSearcher(page, DL_KEY_PATH)
+        else:
+            paged.append(page)
+    return [DataFrameSearcher(table, DL_KEY_PATH, vectorized=False),
+            DataFrameSearcher(table, DL_KEY_PATH, indexed=False),
+            DataFrameSearcher(table, DL_KEY_PATH),
+            paged]
+
+
+@pytest.mark.parametrize('code_words', QUERIES)
+def test_same_results(searchers, code_words):
+    reference, *others = searchers
+    for author_name, description, verbatim, translation in product(
+            AUTHORS, [False, True], [False, True], TRANSLATIONS):
+        for searcher in searchers:
+            searcher.text_translator = lambda text: translation
+        arguments = dict(code_words=code_words,
+                         author_name=author_name,
+                         search_by_description=description,
+                         verbatim_search=verbatim,
+                         bilingual_search=translation is not None)
+        expected = reference(**arguments)
+        for searcher in others:
+            result = searcher(**arguments)
+            assert list(result['table'].index) \
+                == list(expected['table'].index), arguments
+            assert result['translation'] == expected['translation']
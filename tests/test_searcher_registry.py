@@ -0,0 +1,90 @@
+from conftest import DL_KEY_PATH, make_columns
+from app.clients.DataFrameSearcher import DataFrameSearcher
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.SearcherRegistry import SearcherRegistry
+
+
+# -----------------------------------------------------------
+# SearcherRegistry хранит классы поиска по плейлисту
+# и пользователю, а при превышении бюджета памяти удаляет те,
+# к которым дольше всего не обращались.
+# -----------------------------------------------------------
+
+class FakeSearcher:
+    """ Класс поиска с заданной памятью и количеством видео. """
+
+    def __init__(self, memory: int, videos=10):
+        self.memory = memory
+        self.table = [None] * videos
+
+    def memory_usage(self) -> int:
+        return self.memory
+
+
+def test_least_recently_used_evicted():
+    registry = SearcherRegistry(memory_budget=250)
+    first, second, third = FakeSearcher(100), FakeSearcher(100), \
+        FakeSearcher(100)
+    registry.put('PL1', first)
+    registry.put('PL2', second)
+    assert registry.get('PL1') is first  # PL2 - дольше всего без обращений
+    registry.put('PL3', third)
+
+    assert registry.get('PL2') is None
+    assert registry.get('PL1') is first and registry.get('PL3') is third
+    assert registry.metrics() == {'playlists': 2, 'videos': 20,
+                                  'memory': 200, 'bytes_per_video': 10}
+
+
+def test_users_stored_separately():
+    registry = SearcherRegistry()
+    public, private = FakeSearcher(10), FakeSearcher(10)
+    registry.put('PL1', public)
+    registry.put('PL1', private, identity='user')
+
+    assert registry.get('PL1') is public
+    assert registry.get('PL1', 'user') is private
+    assert registry.get('PL1', 'other') is None
+
+
+def test_last_searcher_kept_over_budget():
+    registry = SearcherRegistry(memory_budget=100)
+    registry.put('PL1', FakeSearcher(50))
+    big = FakeSearcher(500)
+    registry.put('PL2', big)
+
+    assert registry.get('PL1') is None
+    assert registry.get('PL2') is big
+    assert registry.metrics()['memory'] == 500
+
+
+def test_resize_and_put_again_recount_memory():
+    registry = SearcherRegistry(memory_budget=250)
+    first, second = FakeSearcher(100), FakeSearcher(100)
+    registry.put('PL1', first)
+    registry.put('PL2', second)
+
+    # класс поиска дополнен и сохранен заново
+    second.memory = 120
+    registry.put('PL2', second)
+    assert registry.metrics()['memory'] == 220
+
+    # после поиска по описанию построены новые индексы
+    second.memory = 200
+    registry.resize(second)
+    assert registry.get('PL1') is None
+    assert registry.metrics()['memory'] == 200
+
+
+def test_budget_counts_playlist_memory():
+    searchers = [DataFrameSearcher(
+        PlaylistTable.from_columns(*make_columns(200, seed)), DL_KEY_PATH)
+        for seed in range(2)]
+    memory = searchers[0].memory_usage()
+    assert memory > 0
+    registry = SearcherRegistry(memory_budget=int(memory * 1.5))
+    registry.put('PL0', searchers[0])
+    registry.put('PL1', searchers[1])
+
+    assert registry.get('PL0') is None
+    assert registry.metrics()['videos'] == 200
@@ -0,0 +1,172 @@
+from threading import Barrier, Thread
+
+import pytest
+
+from conftest import YouTubeStub, make_item
+from app.clients.QuotaLedger import QuotaLedger
+from app.clients.SingleFlight import SingleFlight
+from app.clients.YouTubePlaylistsHandler import YouTubePlaylistsHandler
+
+
+# -----------------------------------------------------------
+# Одновременные загрузки одного плейлиста (stream, __call__,
+# плейлисты канала) должны загружать каждую страницу один раз.
+# -----------------------------------------------------------
+
+def run_parallel(functions) -> list:
+    """ Запуск функций одновременно (результаты - по порядку). """
+    results = [None] * len(functions)
+    barrier = Barrier(len(functions))
+
+    def run(i):
+        barrier.wait()
+        results[i] = functions[i]()
+
+    threads = [Thread(target=run, args=(i,)) for i in range(len(functions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_parallel_loads_crawl_once(youtube_stub):
+    handler = YouTubePlaylistsHandler('key', http_client=youtube_stub)
+
+    def stream():
+        return sum(len(table) for table in handler.stream('PLshared'))
+
+    def call():
+        return len(handler('PLshared'))
+
+    results = run_parallel([stream, call] * 4)
+
+    assert results == [600] * 8
+    pages = youtube_stub.page_requests()
+    assert len(pages) == 12 and len(set(pages)) == 12
+    assert handler.single_flight.metrics() == \
+        {'calls': 8, 'executions': 1, 'saved': 7}
+
+
+def test_channel_and_direct_load_share_pages():
+    stub = YouTubeStub({'PL0': [make_item(i) for i in range(300)],
+                        'PL1': [make_item(i) for i in range(200, 500)]},
+                       delay=0.02)
+    handler = YouTubePlaylistsHandler('key', http_client=stub)
+
+    def channel():
+        return len(handler.channel('UCabcdefghijklmnopqrstuv'))
+
+    def direct():
+        return len(handler('PL0'))
+
+    results = run_parallel([channel, direct, direct])
+
+    assert results == [500, 300, 300]
+    pages = stub.page_requests()
+    assert len(pages) == len(set(pages)) == 12
+
+
+def test_abandoned_consumer_does_not_stop_others(youtube_stub):
+    handler = YouTubePlaylistsHandler('key', http_client=youtube_stub)
+
+    def first_page():
+        for table in handler.stream('PLshared'):
+            return len(table)
+
+    def whole():
+        return sum(len(table) for table in handler.stream('PLshared'))
+
+    assert run_parallel([first_page, whole, first_page]) == [50, 600, 50]
+    assert len(youtube_stub.page_requests()) == 12
+
+
+def test_iterator_closed_when_all_consumers_leave():
+    closed = []
+
+    def numbers():
+        try:
+            yield from range(10)
+        finally:
+            closed.append(True)
+
+    single_flight = SingleFlight()
+    first = single_flight.stream('key', numbers)
+    assert next(first) == 0
+    first.close()
+    assert closed == [True]
+    # следующий вызов начинает перебор заново
+    assert list(single_flight.stream('key', numbers)) == list(range(10))
+    assert single_flight.metrics()['executions'] == 2
+
+
+def test_error_reaches_every_consumer():
+    def failing():
+        yield 1
+        raise YouTubePlaylistsHandler.UndefinedError
+
+    single_flight = SingleFlight()
+    first = single_flight.stream('key', failing)
+    second = single_flight.stream('key', failing)
+    for consumer in (first, second):
+        assert next(consumer) == 1
+    for consumer in (first, second):
+        try:
+            next(consumer)
+        except YouTubePlaylistsHandler.UndefinedError:
+            pass
+        else:
+            raise AssertionError('ошибка не передана')
+
+
+def test_unstarted_consumer_released():
+    started = []
+
+    def numbers():
+        started.append(True)
+        yield from range(3)
+
+    single_flight = SingleFlight()
+    # вызов закрыт до первого элемента
+    single_flight.stream('key', numbers).close()
+    # вызов удален, так и не начав перебор
+    consumer = single_flight.stream('key', numbers)
+    del consumer
+    assert started == []
+    assert list(single_flight.stream('key', numbers)) == [0, 1, 2]
+    assert single_flight.metrics()['executions'] == 3
+
+
+def test_force_refresh_does_not_join_cached_load(youtube_stub):
+    handler = YouTubePlaylistsHandler('key', http_client=youtube_stub)
+
+    def cached():
+        return len(handler('PLshared'))
+
+    def forced():
+        return len(handler('PLshared', force_refresh=True))
+
+    assert run_parallel([cached, forced, cached, forced]) == [600] * 4
+    assert len(youtube_stub.page_requests()) == 2 * 12
+    assert handler.single_flight.metrics()['executions'] == 2
+
+
+def test_user_load_promotes_background_load(youtube_stub):
+    def handler():
+        # фоновой загрузке доступно 5 единиц, а нужно 13
+        quota = QuotaLedger(daily_limit=20, background_reserve=15)
+        return YouTubePlaylistsHandler('key', http_client=youtube_stub,
+                                       quota=quota)
+
+    with pytest.raises(QuotaLedger.ExceededError):
+        list(handler()._shared_pages('PLshared', background=True))
+
+    promoted = handler()
+    background = promoted._shared_pages('PLshared', background=True)
+    user = promoted._shared_pages('PLshared')
+    assert len(list(background)) == len(list(user)) == 12
+
+    waited = handler()
+    background = waited._shared_pages('PLshared', background=True)
+    assert waited.promote('PLshared')
+    assert len(list(background)) == 12
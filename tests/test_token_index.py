@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+
+from conftest import WORDS, make_columns
+from app.clients.TokenIndex import TokenIndex
+
+
+# -----------------------------------------------------------
+# Поиск слов в любом порядке по обратному индексу находит те же
+# строки, что и проверка 'word in text' каждого слова,
+# в том числе по дополненному индексу (extended).
+# -----------------------------------------------------------
+
+def texts(size: int, seed=0) -> list:
+    """ Названия с описаниями в нижнем регистре. """
+    columns = make_columns(size, seed)
+    return [(title + '###' + description).lower()
+            for title, description in zip(columns[2], columns[3])]
+
+
+def brute_force(texts: list, words: list) -> list:
+    """ Строки, содержащие все слова. """
+    return [i for i, text in enumerate(texts)
+            if all(word in text for word in words)]
+
+
+def queries(count: int) -> list:
+    """ Случайные запросы из слов и их частей. """
+    rand = random.Random(0)
+    words = [word.lower() for word in WORDS]
+    result = []
+    for _ in range(count):
+        query = []
+        for _ in range(rand.randint(1, 3)):
+            word = rand.choice(words)
+            begin = rand.randint(0, len(word) - 1)
+            query.append(word[begin:rand.randint(begin + 1, len(word))])
+        result.append(query)
+    return result + [['ия###ле'], ['zzz'], ['лекция', 'zzz']]
+
+
+def test_same_as_substring_search():
+    rows = texts(300)
+    index = TokenIndex(rows)
+    for words in queries(200):
+        assert list(index.search_all(words)) == brute_force(rows, words), \
+            words
+        assert list(np.flatnonzero(index.mask_all(words))) \
+            == brute_force(rows, words)
+
+
+def test_extended_same_as_rebuilt():
+    first, second = texts(200), texts(100, seed=1)
+    index = TokenIndex(first)
+    extended = index.extended(second[:50]).extended(second[50:])
+    rebuilt = TokenIndex(first + second)
+    for words in queries(100):
+        assert list(extended.search_all(words)) \
+            == list(rebuilt.search_all(words)), words
+    # старый индекс не изменился
+    assert index.size == 200
+    assert list(index.search_all(['лекция'])) \
+        == brute_force(first, ['лекция'])
+
+
+def test_empty_query_matches_every_row():
+    index = TokenIndex(['a b', 'c', ''])
+    assert list(index.search_all([])) == [0, 1, 2]
+    assert list(index.search_all(['a', 'c'])) == []
@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+from conftest import StubResponse
+from app.clients.TextTranslator import TextTranslator
+from app.clients.TranslationCache import TranslationCache
+
+
+# -----------------------------------------------------------
+# Результаты перевода хранятся в TranslationCache:
+# переводы - ttl секунд, отрицательные результаты - negative_ttl
+# секунд, а ошибки API (в том числе ответы MyMemory с кодом 200,
+# но с ошибкой в responseStatus) не сохраняются.
+# -----------------------------------------------------------
+
+class TranslationStub:
+    """ Класс заглушки MyMemory API с подсчетом запросов. """
+
+    def __init__(self, *responses: StubResponse):
+        """
+        :param responses: ответы по порядку (последний - для остальных)
+        """
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url: str, headers=None) -> StubResponse:
+        self.calls += 1
+        if len(self.responses) > 1:
+            return self.responses.pop(0)
+        return self.responses[0]
+
+
+def translation(text: str, status=200) -> StubResponse:
+    """ Ответ MyMemory API с переводом (или с ошибкой в responseStatus). """
+    return StubResponse(200, {'responseStatus': status,
+                              'responseData': {'translatedText': text},
+                              'matches': [{'translation': text}]})
+
+
+NOTHING = StubResponse(200, {'responseStatus': 200, 'matches': []})
+LIMIT = translation('MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE'
+                    ' TRANSLATIONS FOR TODAY.', status=429)
+
+
+def translator(stub: TranslationStub, cache: TranslationCache) \
+        -> TextTranslator:
+    """ Переводчик с заглушкой API и кэшем. """
+    return TextTranslator('key', cache=cache, http_client=stub)
+
+
+def test_translation_cached():
+    stub = TranslationStub(translation('lecture'))
+    text_translator = translator(stub, TranslationCache())
+
+    assert text_translator('Лекция') == 'lecture'
+    assert text_translator('  лекция ') == 'lecture'
+    assert stub.calls == 1
+
+
+def test_quota_warning_not_cached():
+    stub = TranslationStub(LIMIT, translation('lecture'))
+    text_translator = translator(stub, TranslationCache())
+
+    with pytest.raises(TextTranslator.UndefinedError):
+        text_translator('лекция')
+    assert text_translator('лекция') == 'lecture'
+    assert stub.calls == 2
+
+
+def test_negative_result_expires():
+    stub = TranslationStub(NOTHING, translation('lecture'))
+    cache = TranslationCache(negative_ttl=0.05)
+    text_translator = translator(stub, cache)
+
+    for _ in range(2):
+        with pytest.raises(TextTranslator.NothingError):
+            text_translator('лекция')
+    assert stub.calls == 1
+    time.sleep(0.06)
+    assert text_translator('лекция') == 'lecture'
+    assert stub.calls == 2
+
+
+def test_results_persist(tmp_path):
+    path = os.path.join(tmp_path, 'cache.sqlite3')
+    TranslationCache(path).put('translate:ru|en', 'Лекция', 'lecture')
+    TranslationCache(path).put('translate:ru|en', 'семинар', None)
+
+    cache = TranslationCache(path)
+    assert cache.get('translate:ru|en', 'лекция') == 'lecture'
+    assert cache.get('translate:ru|en', 'семинар') is None
+    assert cache.get('translate:en|ru', 'лекция') is cache.MISS
+    # устаревший отрицательный результат не используется
+    expired = TranslationCache(path, negative_ttl=0)
+    assert expired.get('translate:ru|en', 'семинар') is cache.MISS
+    assert expired.get('translate:ru|en', 'лекция') == 'lecture'
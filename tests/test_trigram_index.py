@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+
+from conftest import make_columns
+from app.clients.TrigramIndex import TrigramIndex, _TrigramSegment
+
+
+# -----------------------------------------------------------
+# Поиск фразы по индексу триграмм находит те же строки,
+# что и проверка 'phrase in text', в том числе по дополненному
+# индексу из нескольких частей и по текстам с одиночными
+# суррогатами; короткие фразы по индексу не ищутся.
+# -----------------------------------------------------------
+
+def texts(size: int, seed=0) -> list:
+    """ Названия с описаниями в нижнем регистре. """
+    columns = make_columns(size, seed)
+    return [(title + '###' + description).lower()
+            for title, description in zip(columns[2], columns[3])]
+
+
+def phrases(rows: list, count: int) -> list:
+    """ Случайные подстроки текстов и фразы, которых нет. """
+    rand = random.Random(0)
+    result = []
+    for _ in range(count):
+        text = rand.choice([text for text in rows if len(text) > 3])
+        begin = rand.randint(0, len(text) - 3)
+        result.append(text[begin:begin + rand.randint(3, 20)])
+    return result + ['zzz', 'лекция  лекция', 'ия###ле']
+
+
+def brute_force(rows: list, phrase: str) -> list:
+    """ Строки, содержащие фразу. """
+    return [i for i, text in enumerate(rows) if phrase in text]
+
+
+def test_same_as_substring_search():
+    rows = texts(300)
+    index = TrigramIndex(rows)
+    for phrase in phrases(rows, 200):
+        assert list(index.search(phrase)) == brute_force(rows, phrase), \
+            phrase
+        assert list(np.flatnonzero(index.mask(phrase))) \
+            == brute_force(rows, phrase)
+
+
+def test_short_phrases_not_indexed():
+    index = TrigramIndex(['лекция', 'ml'])
+    assert index.search('ml') is None
+    assert index.mask('ия') is None
+    assert index.search('a' + _TrigramSegment.separator + 'b') is None
+
+
+def test_extended_same_as_rebuilt(monkeypatch):
+    # маленькие блоки, чтобы построение шло по нескольким блокам
+    monkeypatch.setattr(_TrigramSegment, 'chunk_chars', 500)
+    rows = texts(400, seed=2)
+    index = TrigramIndex(rows[:100])
+    segments = []
+    for begin in range(100, 400, 25):
+        index = index.extended(rows[begin:begin + 25])
+        segments.append(len(index.segments))
+    # маленькие части объединяются
+    assert max(segments) > 1 and max(segments) <= 4
+    assert index.size == 400
+    for phrase in phrases(rows, 100):
+        assert list(index.search(phrase)) == brute_force(rows, phrase), \
+            phrase
+
+
+def test_lone_surrogates():
+    rows = ['лекция \ud83d конец', 'обычный текст', '\udc00\udc00\udc00']
+    index = TrigramIndex(rows)
+    assert list(index.search('\ud83d к')) == [0]
+    assert list(index.search('\udc00\udc00\udc00')) == [2]
+    assert list(index.search('текст')) == [1]
+
+
+def test_similar_counts_shared_trigrams():
+    index = TrigramIndex([' лекция ', ' лекцыя ', ' кот '])
+    # у ' лекция ' 6 триграмм, у ' лекцыя ' из них 3
+    assert list(index.similar(' лекция ', 6)) == [0]
+    assert list(index.similar(' лекция ', 3)) == [0, 1]
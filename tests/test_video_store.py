@@ -0,0 +1,71 @@
+import gc
+
+from app.clients.PlaylistTable import PlaylistTable
+from app.clients.VideoStore import VideoStore
+
+
+# -----------------------------------------------------------
+# Таблицы плейлистов с одними видео ссылаются на одну запись
+# VideoStore, пока название и описание видео не изменились;
+# запись удаляется, когда видео нет ни в одной таблице.
+# -----------------------------------------------------------
+
+class CollidingText(str):
+    """ Строка с одинаковым для всех строк hash(). """
+
+    def __hash__(self):
+        return 1
+
+
+def columns(numbers, description='описание') -> list:
+    """ Колонки плейлиста из видео с данными номерами. """
+    return [list(range(1, len(numbers) + 1)),
+            ['v%d' % number for number in numbers],
+            ['Лекция %d' % number for number in numbers],
+            ['%s %d' % (description, number) for number in numbers],
+            ['UC0'] * len(numbers),
+            ['Канал'] * len(numbers)]
+
+
+def test_shared_videos_reused():
+    store = VideoStore()
+    first = PlaylistTable.from_columns(*columns(range(10)), store=store)
+    second = PlaylistTable.from_columns(*columns(range(5, 15)), store=store)
+
+    assert all(a is b for a, b in zip(first.videos[5:], second.videos))
+    assert len(store) == 15
+    metrics = store.metrics()
+    assert metrics['created'] == 15 and metrics['reused'] == 5
+
+
+def test_changed_description_creates_record():
+    store = VideoStore()
+    old = store.videos(['v1'], ['Лекция'], ['старое описание'])[0]
+    new = store.videos(['v1'], ['Лекция'], ['новое описание'])[0]
+    assert new is not old
+    assert store.videos(['v1'], ['Лекция'], ['новое описание'])[0] is new
+
+
+def test_equal_hash_different_description():
+    store = VideoStore()
+    old = store.videos(['v1'], ['Лекция'], [CollidingText('первое')])[0]
+    assert hash(CollidingText('первое')) == hash(CollidingText('второе'))
+    new = store.videos(['v1'], ['Лекция'], [CollidingText('второе')])[0]
+    assert new is not old
+    assert store.metrics()['reused'] == 0
+
+
+def test_surrogate_description():
+    store = VideoStore()
+    video = store.videos(['v1'], ['Лекция'], ['\ud83d'])[0]
+    assert video.same('Лекция', '\ud83d')
+    assert not video.same('Лекция', '\ud83e')
+
+
+def test_record_dropped_with_last_table():
+    store = VideoStore()
+    table = PlaylistTable.from_columns(*columns(range(3)), store=store)
+    assert len(store) == 3
+    del table
+    gc.collect()
+    assert len(store) == 0